@@ -0,0 +1,142 @@
+"""
+Stateful alert notifications.
+
+Each run used to post one Telegram message per device whose latest reading
+was 🔴, so a device stuck in alert was re-announced every run. Now the last
+status and last send time of every device are persisted (alert_state.json)
+and a notification is queued only when:
+  - a device enters alert, or its alert changes (e.g. High Temp -> High Temp | High AQI)
+  - a device recovers (alert -> ✅ Normal)
+  - a device is still in the same alert after `cooldown_s` since it was last sent
+All queued notifications of a run go out as one message over a reused
+requests.Session with connect/read timeouts and retry with backoff.
+State is only advanced for devices whose message was actually delivered, so
+a failed send is retried on the next run.
+"""
+
+import json
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+STATE_FILE = "alert_state.json"
+COOLDOWN_S = 24 * 3600          # re-send an unchanged alert at most once a day
+NORMAL_TEXT = "✅ Normal"
+MAX_MESSAGE_CHARS = 4096        # Telegram sendMessage limit
+
+
+def load_state(path=STATE_FILE):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# ========================
+# TRANSITIONS
+# ========================
+def plan_notifications(state, statuses, now=None, cooldown_s=COOLDOWN_S):
+    """Lines to send for {device: Alert_Status}; returns [(device, line)].
+
+    `state` is not modified — call mark_sent() for the delivered devices.
+    """
+    now = time.time() if now is None else now
+    out = []
+    for device, status in statuses.items():
+        prev = state.get(device, {})
+        prev_status = prev.get("status", NORMAL_TEXT)
+        alerting = status != NORMAL_TEXT
+        if alerting and status != prev_status:
+            out.append((device, f"🔴 {device}: {status}"))
+        elif alerting and now - prev.get("last_sent", 0) >= cooldown_s:
+            out.append((device, f"⏰ {device}: still {status}"))
+        elif not alerting and prev_status != NORMAL_TEXT:
+            out.append((device, f"✅ {device}: back to normal (was {prev_status})"))
+    return out
+
+
+def mark_sent(state, statuses, devices, now=None):
+    """Record the current status of the devices whose notification was delivered."""
+    now = time.time() if now is None else now
+    for device in devices:
+        state[device] = {"status": statuses[device], "last_sent": now}
+    return state
+
+
+def batch_message(planned, header="⚠️ IoT alerts", limit=MAX_MESSAGE_CHARS):
+    """Pack [(device, line)] into as few messages as fit; returns [(text, devices)]."""
+    messages = []
+    text, devices = header, []
+    for device, line in planned:
+        if devices and len(text) + 1 + len(line) > limit:
+            messages.append((text, devices))
+            text, devices = header, []
+        text = f"{text}\n{line}"
+        devices.append(device)
+    if devices:
+        messages.append((text, devices))
+    return messages
+
+
+# ========================
+# TELEGRAM
+# ========================
+class TelegramNotifier:
+    def __init__(self, token, chat_id, api_url="https://api.telegram.org",
+                 timeout=(3.05, 10), retries=3, backoff=0.5):
+        self.url = f"{api_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            read=0,     # a read timeout may mean it was delivered: don't post twice
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        )
+        self.session.mount("https://", HTTPAdapter(max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(max_retries=retry))
+        self.sent = 0
+
+    def send(self, text):
+        """True if Telegram accepted the message."""
+        try:
+            r = self.session.post(self.url, data={"chat_id": self.chat_id, "text": text}, timeout=self.timeout)
+        except requests.RequestException as e:
+            # Not str(e): the URL in it contains the bot token
+            print(f"⚠️ Telegram alert failed: {type(e).__name__}")
+            return False
+        self.sent += 1
+        if r.status_code != 200:
+            print(f"⚠️ Telegram alert failed ({r.status_code}): {r.text[:200]}")
+            return False
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+def notify(notifier, state, statuses, now=None, cooldown_s=COOLDOWN_S):
+    """Send one batched message for this run's transitions; returns the lines sent."""
+    now = time.time() if now is None else now
+    planned = plan_notifications(state, statuses, now, cooldown_s)
+    delivered = set()
+    if notifier is not None:
+        # Each message is all-or-nothing; only delivered devices advance their state
+        for text, devices in batch_message(planned):
+            if notifier.send(text):
+                delivered.update(devices)
+    mark_sent(state, statuses, delivered, now)
+    return [line for device, line in planned if device in delivered]
@@ -0,0 +1,150 @@
+"""Server-side downsampling for chart series.
+
+Two modes, both computed over the typed DataStore arrays:
+  - bucket: min/mean/max/last per fixed time bucket (e.g. 5min, 1h, 1d)
+  - lttb:   Largest-Triangle-Three-Buckets, at most N visually faithful points
+"""
+
+import re
+
+import numpy as np
+
+from store import NAT, format_ts
+
+_UNITS_NS = {
+    "s": 1_000_000_000,
+    "min": 60 * 1_000_000_000,
+    "m": 60 * 1_000_000_000,
+    "h": 3600 * 1_000_000_000,
+    "d": 86400 * 1_000_000_000,
+}
+_RESOLUTION_RE = re.compile(r"^\s*(\d+)?\s*(s|min|m|h|d)\s*$", re.IGNORECASE)
+
+
+def parse_resolution(text):
+    """'5min' / '1h' / '1d' -> bucket width in ns (ValueError if invalid)."""
+    m = _RESOLUTION_RE.match(text or "")
+    if not m:
+        raise ValueError(f"Invalid resolution '{text}' (use e.g. 30s, 5min, 1h, 1d)")
+    width = int(m.group(1) or 1) * _UNITS_NS[m.group(2).lower()]
+    if width <= 0:
+        raise ValueError(f"Invalid resolution '{text}'")
+    return width
+
+
+def _json_floats(arr):
+    out = np.round(arr.astype(np.float64), 5)
+    return [None if v != v else v for v in out.tolist()]
+
+
+def _selection(store, device_ids, start_ns, end_ns):
+    """Row indices in range, sorted by device then time."""
+    lo_ns = NAT + 1 if start_ns is None else start_ns  # never aggregate unparseable rows
+    parts = []
+    for device in device_ids:
+        sl = store.query(device, lo_ns, end_ns)
+        if sl.stop > sl.start:
+            parts.append(np.arange(sl.start, sl.stop))
+    if not parts:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(parts)
+
+
+def bucket_aggregate(store, device_ids, columns, width_ns, start_ns=None, end_ns=None):
+    """min/mean/max/last per bucket, per column, per device.
+
+    Rows are already sorted by (device, time), so (device, bucket) keys are
+    monotonic and every bucket is a contiguous run: one `reduceat` per
+    statistic covers all devices at once.
+    """
+    index = _selection(store, device_ids, start_ns, end_ns)
+    if len(index) == 0:
+        return {}
+
+    ts = store.ts[index]
+    codes = store.device_codes[index].astype(np.int64)
+    bucket = ts // width_ns
+    key_change = (np.diff(codes) != 0) | (np.diff(bucket) != 0)
+    starts = np.concatenate(([0], np.flatnonzero(key_change) + 1))
+    ends = np.concatenate((starts[1:], [len(index)]))
+
+    bucket_codes = codes[starts]
+    bucket_time = format_ts(bucket[starts] * width_ns)
+    counts = ends - starts
+
+    stats = {}
+    for col in columns:
+        v = store.data[col][index].astype(np.float64)
+        valid = ~np.isnan(v)
+        n = np.add.reduceat(valid.astype(np.int64), starts)
+        total = np.add.reduceat(np.where(valid, v, 0.0), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, total / n, np.nan)
+        stats[col] = {
+            "min": np.fmin.reduceat(v, starts),
+            "mean": mean,
+            "max": np.fmax.reduceat(v, starts),
+            "last": v[ends - 1],
+        }
+
+    result = {}
+    code_bounds = np.flatnonzero(np.diff(bucket_codes)) + 1
+    for lo, hi in zip(np.concatenate(([0], code_bounds)), np.concatenate((code_bounds, [len(starts)]))):
+        device = store.devices[bucket_codes[lo]]
+        result[device] = {
+            "time": bucket_time[lo:hi],
+            "count": counts[lo:hi].tolist(),
+            "series": {
+                col: {name: _json_floats(arr[lo:hi]) for name, arr in s.items()}
+                for col, s in stats.items()
+            },
+        }
+    return result
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = (x - x[0]).astype(np.float64)
+    y = y.astype(np.float64)
+    # Bucket edges over the interior points (first and last are always kept)
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        # Triangle area (x2) between the previous pick, each candidate and the average
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    keep[-1] = n - 1
+    return keep
+
+
+def lttb_downsample(store, device_ids, columns, points, start_ns=None, end_ns=None):
+    """At most `points` points per column per device, chosen by LTTB."""
+    result = {}
+    lo_ns = NAT + 1 if start_ns is None else start_ns
+    for device in device_ids:
+        sl = store.query(device, lo_ns, end_ns)
+        if sl.stop <= sl.start:
+            continue
+        ts = store.ts[sl]
+        series = {}
+        for col in columns:
+            v = store.data[col][sl].astype(np.float64)
+            valid = np.flatnonzero(~np.isnan(v))
+            keep = valid[lttb_indices(ts[valid], v[valid], points)]
+            series[col] = {"time": format_ts(ts[keep]), "value": _json_floats(v[keep])}
+        result[store.devices[store.device_codes[sl.start]]] = {"series": series}
+    return result
@@ -0,0 +1,245 @@
+"""Declarative alert rules evaluated with vectorized NumPy masks.
+
+A rule describes one metric:
+
+    {
+      "metric": "temperature",        # name used in overrides / results
+      "column": "temperature",        # column keyword (case/underscore-insensitive)
+      "op": ">",                      # >, >=, <, <=
+      "threshold": 30.0,              # 🔴 alert level
+      "warn_ratio": 0.8,              # 🟠 band starts at threshold * warn_ratio
+      "clear": 29.0,                  # optional hysteresis: stay 🔴 until this is crossed back
+      "min_readings": 1,              # optional: consecutive breaching readings before 🔴
+      "min_duration_s": 0,            # optional: breach must also last this long
+      "label": "🌡️ High Temp"
+    }
+
+Per-device overrides replace the levels of a rule for one device
+(threshold, warn, warn_ratio, clear); any other key is rejected:
+
+    {"rules": [...], "overrides": {"indoor-farm-02": {"temperature": {"threshold": 32}}}}
+
+Whole columns are evaluated at once; hysteresis and minimum duration are
+computed per device over time-ordered rows with cumulative max tricks
+instead of a Python loop.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from store import normalize_device
+
+OK, WARN, ALERT = 0, 1, 2
+NORMAL_TEXT = "✅ Normal"
+
+# ALERT_TEMP / ALERT_AQI with the README's 🔴 rule (value >= threshold). The original
+# Alert_Status used "> ALERT_TEMP", so exactly 30.0 °C now counts as High Temp as well.
+DEFAULT_RULES = [
+    {"metric": "temperature", "column": "temperature", "op": ">=", "threshold": 30.0,
+     "warn_ratio": 0.8, "label": "🌡️ High Temp"},
+    {"metric": "aqi", "column": "aqi value", "op": ">=", "threshold": 600.0,
+     "warn_ratio": 0.8, "label": "🌫️ High AQI"},
+]
+
+OVERRIDE_KEYS = {"threshold", "warn", "warn_ratio", "clear"}
+
+_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+
+def load_rules(path="alert_rules.json", defaults=None):
+    """(rules, overrides) from a JSON file, or the defaults if it is missing."""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            config = json.load(f)
+        return config.get("rules", defaults or DEFAULT_RULES), config.get("overrides", {})
+    return defaults or DEFAULT_RULES, {}
+
+
+def find_column(columns, keyword):
+    key = keyword.lower().replace("_", " ")
+    return next((c for c in columns if key in str(c).lower().replace("_", " ")), None)
+
+
+def _numeric(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "fiu":
+        return values.astype(np.float64)
+    return pd.to_numeric(values, errors="coerce").astype(np.float64)
+
+
+def _check_overrides(rules, overrides):
+    """ValueError for overrides of unknown metrics or of fields that are per rule only."""
+    metrics = {r["metric"] for r in rules}
+    for device, per_metric in overrides.items():
+        for metric, o in per_metric.items():
+            if metric not in metrics:
+                raise ValueError(f"Override for '{device}' names unknown metric '{metric}'")
+            unsupported = sorted(set(o) - OVERRIDE_KEYS)
+            if unsupported:
+                raise ValueError(f"Override '{device}'/'{metric}' sets {unsupported}; "
+                                 f"only {sorted(OVERRIDE_KEYS)} can differ per device")
+
+
+def _param_arrays(rule, overrides, device_keys, n):
+    """Per-row threshold/warn/clear arrays honouring per-device overrides."""
+    threshold = np.full(n, float(rule["threshold"]))
+    warn = np.full(n, _warn_level(rule))
+    clear = np.full(n, float(rule.get("clear", rule["threshold"])))
+    for device, per_metric in overrides.items():
+        o = per_metric.get(rule["metric"])
+        if not o:
+            continue
+        merged = {**rule, **o}
+        if "clear" not in o and "threshold" in o and "clear" not in rule:
+            merged["clear"] = merged["threshold"]
+        mask = device_keys == normalize_device(device)
+        threshold[mask] = float(merged["threshold"])
+        warn[mask] = _warn_level(merged)
+        clear[mask] = float(merged.get("clear", merged["threshold"]))
+    return threshold, warn, clear
+
+
+def _warn_level(rule):
+    if "warn" in rule:
+        return float(rule["warn"])
+    ratio = float(rule.get("warn_ratio", 0.8))
+    t = float(rule["threshold"])
+    # For "below" rules the band sits above the threshold
+    return t * ratio if rule["op"] in (">", ">=") else t / ratio
+
+
+def _warn_op(op):
+    return np.greater_equal if op in (">", ">=") else np.less_equal
+
+
+def _group_starts(codes):
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = codes[1:] != codes[:-1]
+    return starts
+
+
+def _hysteresis(enter, stay, starts):
+    """Latch per device: on at `enter`, off where `stay` is False."""
+    pos = np.arange(len(enter))
+    event = enter | ~stay | starts
+    last = np.maximum.accumulate(np.where(event, pos, 0))
+    return enter[last]
+
+
+def _run_start(active, starts):
+    """Index where the current run of True values began (per device)."""
+    n = len(active)
+    pos = np.arange(n)
+    prev = np.zeros(n, dtype=bool)
+    prev[1:] = active[:-1]
+    begin = active & (starts | ~prev)
+    return np.maximum.accumulate(np.where(begin, pos, 0))
+
+
+class AlertResult:
+    def __init__(self, levels, status, rules):
+        self.levels = levels      # metric -> int8 array (OK / WARN / ALERT), input row order
+        self.status = status      # object array of "🌡️ High Temp | 🌫️ High AQI" / "✅ Normal"
+        self.rules = rules
+
+
+def evaluate(frame, rules=None, overrides=None, device_col=None, ts=None):
+    """Evaluate alert rules over a whole DataFrame (or dict of columns).
+
+    `ts` (int64 epoch ns or datetime64) is needed only for min_duration_s;
+    rows are otherwise ordered per device as given when ts is None.
+    """
+    rules = rules or DEFAULT_RULES
+    overrides = overrides or {}
+    _check_overrides(rules, overrides)
+    columns = list(frame.keys()) if isinstance(frame, dict) else list(frame.columns)
+    n = len(frame[columns[0]]) if columns else 0
+
+    if device_col and device_col in columns:
+        # Normalize each distinct id once, not every row
+        raw_codes, raw_uniq = pd.factorize(np.asarray(frame[device_col], dtype=object), use_na_sentinel=False)
+        uniq, remap = np.unique(np.array([normalize_device(d) for d in raw_uniq], dtype=object), return_inverse=True)
+        codes = remap[raw_codes]
+        keys = uniq[codes]
+    else:
+        keys = np.full(n, "", dtype=object)
+        codes = np.zeros(n, dtype=np.int64)
+
+    if ts is not None:
+        ts = np.asarray(ts)
+        ts = ts.view(np.int64) if ts.dtype.kind == "M" else ts.astype(np.int64)
+        order = np.lexsort((ts, codes))
+    else:
+        order = np.argsort(codes, kind="stable")
+    codes_sorted = codes[order]
+    starts = _group_starts(codes_sorted)
+    keys_sorted = keys[order]
+    ts_sorted = ts[order] if ts is not None else None
+
+    levels = {}
+    firing = np.zeros((n, len(rules)), dtype=bool)     # row -> which rules are 🔴
+    for i, rule in enumerate(rules):
+        col = find_column(columns, rule["column"])
+        level = np.zeros(n, dtype=np.int8)
+        if col is None:
+            levels[rule["metric"]] = level
+            continue
+        v = _numeric(frame[col])[order]
+        threshold, warn, clear = _param_arrays(rule, overrides, keys_sorted, n)
+        cmp = _OPS[rule["op"]]
+        with np.errstate(invalid="ignore"):
+            breach = cmp(v, threshold)          # NaN compares False -> never alerts
+            warn_band = _warn_op(rule["op"])(v, warn)
+            still = cmp(v, clear)
+
+        active = breach
+        if "clear" in rule or any("clear" in o.get(rule["metric"], {}) for o in overrides.values()):
+            active = _hysteresis(breach, still & ~np.isnan(v), starts)
+
+        min_readings = int(rule.get("min_readings", 1))
+        min_duration = float(rule.get("min_duration_s", 0))
+        if min_readings > 1 or (min_duration > 0 and ts_sorted is not None):
+            begin = _run_start(active, starts)
+            pos = np.arange(n)
+            ok = pos - begin + 1 >= min_readings
+            if min_duration > 0 and ts_sorted is not None:
+                ok &= (ts_sorted - ts_sorted[begin]) >= int(min_duration * 1e9)
+            active = active & ok
+
+        level[warn_band] = WARN
+        level[active] = ALERT
+        out = np.empty(n, dtype=np.int8)
+        out[order] = level
+        levels[rule["metric"]] = out
+        firing[order[active], i] = True
+
+    # One string per combination of firing rules that actually occurs
+    combos, inverse = np.unique(firing, axis=0, return_inverse=True)
+    table = np.empty(len(combos), dtype=object)
+    for k, combo in enumerate(combos):
+        labels = [r["label"] for r, on in zip(rules, combo) if on]
+        table[k] = " | ".join(labels) if labels else NORMAL_TEXT
+    return AlertResult(levels, table[inverse.reshape(-1)], rules)
+
+
+def indicator(value, level, unit=""):
+    """Markdown cell for one reading: 🔴 **v** / 🟠 v / 🟢 v, 🔸 if not numeric."""
+    try:
+        val = float(value)
+    except Exception:
+        return f"🔸 {value}{unit}"
+    if val != val:
+        return f"🔸 {value}{unit}"
+    if level == ALERT:
+        return f"🔴 **{val}{unit}**"
+    if level == WARN:
+        return f"🟠 {val}{unit}"
+    return f"🟢 {val}{unit}"
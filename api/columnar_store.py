@@ -0,0 +1,499 @@
+"""Partitioned, memory-mapped columnar storage for the sensor dataset.
+
+Layout (one directory per generation, swapped atomically via the manifest):
+
+    data_store/
+      manifest.json
+      gen-000003/
+        device=indoor-farm-01-3f2a9c1e/month=2025-11/ts.npy
+        device=indoor-farm-01-3f2a9c1e/month=2025-11/Temperature (°C).npy
+        ...
+
+Partition directories carry a checksum of the raw device name, so names
+that sanitize alike ("farm 01", "farm/01") never share one; the manifest
+maps every device to its directory.
+
+Every column is a plain .npy file, opened with mmap_mode="r" so only the
+projected columns (and for scan(), the matching partitions) are read.
+open_store() concatenates the partitions into one array per column; only a
+single-partition read is served straight from the mapping. Numeric columns keep
+their DataStore dtype (float32/int32/...), low-cardinality text columns are
+dictionary-encoded (int32 codes, categories in the manifest) and free text
+such as Timestamp is stored fixed-width.
+
+Migrate an existing CSV:
+    python api/columnar_store.py migrate live_data.csv data_store
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from metrics import stage
+from store import NAT, DataStore, normalize_device
+
+STORE_VERSION = 1
+MANIFEST = "manifest.json"
+TS_FILE = "ts.npy"
+
+
+def _safe_name(value):
+    return re.sub(r"[^a-zA-Z0-9_\-]", "_", str(value))
+
+
+def _device_dir(device):
+    """Partition directory of a device: readable, and unique per raw name."""
+    return f"device={_safe_name(device)}-{zlib.crc32(str(device).encode('utf-8')):08x}"
+
+
+def _column_file(col):
+    # Column names contain spaces, %, (°C)... keep them readable but path-safe
+    return re.sub(r'[\\/:*?"<>|]', "_", col) + ".npy"
+
+
+def _encode(values):
+    """(array, meta) ready to be written, for one full column."""
+    if values.dtype != object:
+        return values, {"kind": "plain", "dtype": values.dtype.str}
+
+    import pandas as pd
+
+    # Hash once, then stringify and sort only the distinct values (missing -> "")
+    codes, uniques = pd.factorize(values)
+    missing = codes < 0
+    text = [str(v) for v in uniques] + ([""] if missing.any() else [])
+    categories, inverse = np.unique(np.array(text, dtype=object), return_inverse=True)
+    codes = inverse[codes]
+    if len(categories) <= max(256, len(values) // 2):
+        codes = codes.astype(np.int32)
+        codes[missing] = -1
+        return codes, {"kind": "dict", "categories": categories.tolist()}
+    return categories.astype(str)[codes], {"kind": "text"}
+
+
+def _decode(arr, meta):
+    if meta["kind"] == "dict":
+        categories = np.array(meta["categories"] + [None], dtype=object)
+        return categories[arr]      # code -1 -> trailing None
+    return arr     # plain / fixed-width text: served straight from the mapping
+
+
+def read_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ========================
+# WRITE
+# ========================
+def write_store(store, root, keep_previous=True):
+    """Write a DataStore as a new generation and atomically publish it.
+
+    `keep_previous=False` drops the previous generation too (no reader has it
+    mapped, e.g. in the ingest job that commits the store).
+    """
+    os.makedirs(root, exist_ok=True)
+    old = read_manifest(root)
+    generation, gen_name, gen_dir = _new_generation(root, old)
+
+    names = [c for c in store.columns if c in store.data and c != store.device_col]
+    encoded = {c: _encode(store.data[c]) for c in names}
+
+    month_labels = _month_labels(store.ts)
+
+    bounds = np.searchsorted(store.device_codes, np.arange(len(store.devices) + 1))
+    partitions = []
+    for code, device in enumerate(store.devices):
+        lo, hi = int(bounds[code]), int(bounds[code + 1])
+        if hi <= lo:
+            continue
+        labels = month_labels[lo:hi]
+        cuts = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        for a, b in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [hi - lo]))):
+            a, b = lo + int(a), lo + int(b)
+            rel = os.path.join(_device_dir(device), f"month={month_labels[a]}")
+            part_dir = os.path.join(gen_dir, rel)
+            os.makedirs(part_dir, exist_ok=True)
+            np.save(os.path.join(part_dir, TS_FILE), store.ts[a:b])
+            for col in names:
+                np.save(os.path.join(part_dir, _column_file(col)), encoded[col][0][a:b])
+            partitions.append(_partition_meta(device, month_labels[a], rel, store.ts[a:b]))
+
+    manifest = {
+        "version": STORE_VERSION,
+        "generation": generation,
+        "dir": gen_name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": store.rows,
+        "device_col": store.device_col,
+        "columns": store.columns,
+        "encoding": {c: encoded[c][1] for c in names},
+        "devices": {p["device"]: os.path.dirname(p["path"]) for p in partitions},
+        "partitions": partitions,
+    }
+    return _publish(root, manifest, old, keep_previous)
+
+
+def _publish(root, manifest, old, keep_previous=True):
+    tmp = os.path.join(root, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(root, MANIFEST))
+
+    # Keep the previous generation for readers that still have it mapped
+    keep = (manifest["dir"], (old and old.get("dir")) if keep_previous else None)
+    for name in os.listdir(root):
+        if name.startswith("gen-") and name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return manifest
+
+
+def _new_generation(root, old):
+    generation = (old["generation"] + 1) if old else 1
+    gen_name = f"gen-{generation:06d}"
+    gen_dir = os.path.join(root, gen_name)
+    if os.path.exists(gen_dir):
+        shutil.rmtree(gen_dir)
+    return generation, gen_name, gen_dir
+
+
+def _month_labels(ts):
+    months = ts.view("datetime64[ns]").astype("datetime64[M]")
+    return np.where(ts == NAT, "unknown", np.datetime_as_string(months, unit="M"))
+
+
+def _partition_meta(device, month, rel, ts):
+    valid = ts[ts != NAT]
+    return {
+        "device": device,
+        "month": str(month),
+        "path": rel,
+        "rows": len(ts),
+        "min_ts": int(valid[0]) if len(valid) else None,
+        "max_ts": int(valid[-1]) if len(valid) else None,
+    }
+
+
+def _encode_like(values, meta):
+    """Encode new rows with an existing column's encoding (None if they don't fit).
+
+    Dictionary categories only ever grow at the end, so codes already on
+    disk stay valid; `meta` is updated in place.
+    """
+    kind = meta["kind"]
+    if kind == "plain":
+        dtype = np.dtype(meta["dtype"])
+        if values.dtype == object:
+            return None
+        if dtype.kind in "iu" and values.dtype.kind == "f":
+            info = np.iinfo(dtype)
+            if not (np.isfinite(values).all() and (values == np.round(values)).all()
+                    and (values >= info.min).all() and (values <= info.max).all()):
+                return None
+        return values.astype(dtype)
+
+    missing = np.array([v is None or (isinstance(v, float) and v != v) for v in values], dtype=bool)
+    filled = ["" if m else str(v) for v, m in zip(values, missing)]
+    if kind == "text":
+        return np.array(filled, dtype=str)
+    index = {c: i for i, c in enumerate(meta["categories"])}
+    codes = np.empty(len(filled), dtype=np.int32)
+    for i, (v, m) in enumerate(zip(filled, missing)):
+        if m:
+            codes[i] = -1
+            continue
+        code = index.get(v)
+        if code is None:
+            code = index[v] = len(meta["categories"])
+            meta["categories"].append(v)
+        codes[i] = code
+    return codes
+
+
+def _empty_like(n, meta):
+    """Column of `n` missing values in an existing encoding (None if it has no missing value)."""
+    if meta["kind"] == "dict":
+        return np.full(n, -1, dtype=np.int32)
+    if meta["kind"] == "text":
+        return np.full(n, "", dtype=str)
+    dtype = np.dtype(meta["dtype"])
+    return np.full(n, np.nan, dtype=dtype) if dtype.kind == "f" else None
+
+
+def _link_partition(src, dst):
+    """Carry an untouched partition into a new generation without copying it."""
+    os.makedirs(dst, exist_ok=True)
+    for name in os.listdir(src):
+        try:
+            os.link(os.path.join(src, name), os.path.join(dst, name))
+        except OSError:
+            shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+
+
+def append_store(store, root, keep_previous=True):
+    """Merge new rows into the current generation, rewriting only touched partitions.
+
+    Rows of `store` are added to their (device, month) partition; a row with
+    the same device and timestamp as a stored one replaces it. All other
+    partitions are hard-linked into the new generation. Returns the manifest,
+    or None when the rows don't fit the stored schema (new columns,
+    incompatible dtypes) and the caller has to rewrite the store instead.
+    """
+    old = read_manifest(root)
+    if old is None or old["device_col"] != store.device_col:
+        return None
+    encoding = json.loads(json.dumps(old["encoding"]))     # categories may grow
+    names = [c for c in store.columns if c in store.data and c != store.device_col]
+    if any(c not in encoding for c in names):
+        return None
+    encoded = {}
+    for col, meta in encoding.items():
+        arr = _encode_like(store.data[col], meta) if col in store.data else _empty_like(store.rows, meta)
+        if arr is None:
+            return None
+        encoded[col] = arr
+
+    generation, gen_name, gen_dir = _new_generation(root, old)
+    old_dir = os.path.join(root, old["dir"])
+    existing = {(p["device"], p["month"]): p for p in old["partitions"]}
+    device_dirs = old.get("devices") or {p["device"]: os.path.dirname(p["path"]) for p in old["partitions"]}
+    # Match the stored spelling of each device so its partitions are reused
+    spelled = {(normalize_device(d), m): (d, m) for d, m in existing}
+    month_labels = _month_labels(store.ts)
+    bounds = np.searchsorted(store.device_codes, np.arange(len(store.devices) + 1))
+
+    touched = {}
+    for code, device in enumerate(store.devices):
+        lo, hi = int(bounds[code]), int(bounds[code + 1])
+        labels = month_labels[lo:hi]
+        cuts = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        for a, b in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [hi - lo]))):
+            a, b = lo + int(a), lo + int(b)
+            if b <= a:
+                continue
+            month = str(month_labels[a])
+            key = spelled.get((normalize_device(device), month), (device, month))
+            part = existing.get(key)
+            if part:
+                rel = part["path"]
+            else:
+                rel = os.path.join(device_dirs.get(key[0]) or _device_dir(key[0]), f"month={month}")
+            ts = store.ts[a:b]
+            cols = {c: encoded[c][a:b] for c in encoded}
+            if part:
+                src = os.path.join(old_dir, rel)
+                ts = np.concatenate([np.load(os.path.join(src, TS_FILE)), ts])
+                cols = {c: np.concatenate([np.load(os.path.join(src, _column_file(c))), v]) for c, v in cols.items()}
+                # Stored rows first, so for equal timestamps the new row sorts last and is kept
+                order = np.argsort(ts, kind="stable")
+                ts = ts[order]
+                keep = np.ones(len(ts), dtype=bool)
+                keep[:-1] = (ts[1:] != ts[:-1]) | (ts[:-1] == NAT)
+                ts = ts[keep]
+                cols = {c: v[order][keep] for c, v in cols.items()}
+            part_dir = os.path.join(gen_dir, rel)
+            os.makedirs(part_dir, exist_ok=True)
+            np.save(os.path.join(part_dir, TS_FILE), ts)
+            for col, arr in cols.items():
+                np.save(os.path.join(part_dir, _column_file(col)), arr)
+            touched[key] = _partition_meta(key[0], month, rel, ts)
+
+    partitions = []
+    for key, part in existing.items():
+        if key in touched:
+            partitions.append(touched.pop(key))
+        else:
+            _link_partition(os.path.join(old_dir, part["path"]), os.path.join(gen_dir, part["path"]))
+            partitions.append(part)
+    partitions.extend(touched.values())
+
+    manifest = dict(old, generation=generation, dir=gen_name,
+                    created=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    rows=sum(p["rows"] for p in partitions), encoding=encoding,
+                    devices={p["device"]: os.path.dirname(p["path"]) for p in partitions}, partitions=partitions)
+    return _publish(root, manifest, old, keep_previous)
+
+
+# ========================
+# READ
+# ========================
+def _load(root, manifest, part, col):
+    path = os.path.join(root, manifest["dir"], part["path"], TS_FILE if col is None else _column_file(col))
+    return np.load(path, mmap_mode="r")
+
+
+def _concat(parts):
+    if len(parts) == 1:
+        return parts[0]     # single partition: stay zero-copy on the mmap
+    return np.concatenate(parts)
+
+
+def open_store(root, columns=None, source="Columnar Store"):
+    """Open the current generation as a DataStore (None if there is none).
+
+    `columns` restricts which data columns are read; partitions are mapped,
+    not parsed, then concatenated, so the cost is one copy of the projected
+    columns.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return None
+    device_col = manifest["device_col"]
+    wanted = [c for c in manifest["encoding"] if columns is None or c in columns]
+    parts = manifest["partitions"]
+
+    devices = sorted({p["device"] for p in parts})
+    code_of = {d: i for i, d in enumerate(devices)}
+    # Partitions are listed per device in month order; make sure device order is sorted
+    parts = sorted(parts, key=lambda p: (code_of[p["device"]], p["min_ts"] if p["min_ts"] is not None else NAT))
+
+    if not parts:
+        ts = np.empty(0, dtype=np.int64)
+        data = {c: np.empty(0) for c in wanted}
+        codes = np.empty(0, dtype=np.int32)
+    else:
+        ts = _concat([_load(root, manifest, p, None) for p in parts])
+        data = {c: _decode(_concat([_load(root, manifest, p, c) for p in parts]), manifest["encoding"][c]) for c in wanted}
+        codes = np.repeat(np.arange(len(devices), dtype=np.int32)[[code_of[p["device"]] for p in parts]],
+                          [p["rows"] for p in parts])
+    if device_col and (columns is None or device_col in columns):
+        data[device_col] = np.array(devices, dtype=object)[codes] if len(codes) else np.empty(0, dtype=object)
+
+    out_columns = [c for c in manifest["columns"] if c in data or c == "_source"]
+    store = DataStore(out_columns, data, np.ascontiguousarray(ts), device_col, devices, codes, source)
+    store.generation = manifest["generation"]
+    return store
+
+
+def scan(root, device=None, start_ns=None, end_ns=None, columns=None):
+    """Column arrays for one device/time range, read from matching partitions only."""
+    manifest = read_manifest(root)
+    if manifest is None:
+        return {}
+    wanted = [c for c in manifest["encoding"] if columns is None or c in columns]
+    key = normalize_device(device) if device is not None else None
+
+    ts_parts, col_parts = [], {c: [] for c in wanted}
+    for p in manifest["partitions"]:
+        if key is not None and normalize_device(p["device"]) != key:
+            continue
+        if start_ns is not None and p["max_ts"] is not None and p["max_ts"] < start_ns:
+            continue
+        if end_ns is not None and p["min_ts"] is not None and p["min_ts"] > end_ns:
+            continue
+        ts = _load(root, manifest, p, None)
+        a = int(np.searchsorted(ts, start_ns, "left")) if start_ns is not None else 0
+        b = int(np.searchsorted(ts, end_ns, "right")) if end_ns is not None else len(ts)
+        if b <= a:
+            continue
+        ts_parts.append(ts[a:b])
+        for c in wanted:
+            col_parts[c].append(_load(root, manifest, p, c)[a:b])
+
+    if not ts_parts:
+        return {"ts": np.empty(0, dtype=np.int64)}
+    out = {"ts": _concat(ts_parts)}
+    for c in wanted:
+        out[c] = _decode(_concat(col_parts[c]), manifest["encoding"][c])
+    return out
+
+
+def read_frame(root, ts_column=None):
+    """Whole store as a pandas DataFrame (for the ingester's append step).
+
+    With `ts_column`, the stored epoch ns timestamps are added under that name
+    so the caller does not have to parse the Timestamp text again.
+    """
+    import pandas as pd
+
+    store = open_store(root)
+    if store is None:
+        return None
+    frame = pd.DataFrame({c: store.data[c] for c in store.columns if c in store.data})
+    if ts_column:
+        frame[ts_column] = np.asarray(store.ts)
+    return frame
+
+
+class ColumnarStoreCache:
+    """Serves the on-disk store, re-opening it when a new generation appears.
+
+    Same get()/stats() surface as DataCache so main.py can use either.
+    """
+
+    def __init__(self, root, ttl=5.0, source="Columnar Store"):
+        self.root = root
+        self.ttl = ttl
+        self.source = source
+        self.value = None
+        self.checked_at = 0.0
+        self.mtime = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+        self.last_load_ms = None
+
+    def get(self):
+        now = time.monotonic()
+        if self.value is not None and now - self.checked_at < self.ttl:
+            self.hits += 1
+            return self.value
+        with self._lock:
+            self.checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.root, MANIFEST)).st_mtime_ns
+            except OSError:
+                return self.value
+            if mtime != self.mtime or self.value is None:
+                start = time.perf_counter()
+                with stage("load"):
+                    self.value = open_store(self.root, source=self.source)
+                self.mtime = mtime
+                self.reloads += 1
+                self.last_load_ms = round((time.perf_counter() - start) * 1000, 3)
+            else:
+                self.hits += 1
+        return self.value
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "generation": getattr(self.value, "generation", None),
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "last_load_ms": self.last_load_ms,
+        }
+
+
+def migrate_csv(csv_path, root):
+    """Build a columnar store from an existing live_data.csv."""
+    import pandas as pd
+    from store import build_store
+
+    store = build_store(pd.read_csv(csv_path), "Columnar Store")
+    return write_store(store, root)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Columnar store tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="Convert a CSV export into a columnar store")
+    m.add_argument("csv", nargs="?", default="live_data.csv")
+    m.add_argument("root", nargs="?", default="data_store")
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        manifest = migrate_csv(args.csv, args.root)
+        print(f"✅ Wrote {manifest['rows']} rows in {len(manifest['partitions'])} partitions "
+              f"→ {args.root} (generation {manifest['generation']})")
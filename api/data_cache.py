@@ -0,0 +1,202 @@
+"""Process-wide cache for the live dataset.
+
+Keeps one parsed copy of the CSV in memory and revalidates it against GitHub
+with conditional requests (ETag / Last-Modified), so an unchanged file costs a
+304 and no re-parse. Only one refresh runs at a time (single-flight) and, once
+warm, requests are served the cached value while a refresh runs in the
+background (stale-while-revalidate).
+
+An `initial` value (the snapshot bundled at deploy time) is served from the
+first request on and treated as stale, so a cold start revalidates in the
+background instead of blocking on the network.
+"""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from metrics import stage
+
+
+class DataCache:
+    def __init__(self, url_fn, parse, fallback=None, ttl=60.0, timeout=5.0, initial=None, retry_s=5.0):
+        self.url_fn = url_fn          # () -> url to fetch
+        self.parse = parse            # (bytes, source) -> value
+        self.fallback = fallback      # () -> value or None, used when nothing is cached
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry_s = retry_s        # minimum gap between fetches after a failure with nothing cached
+
+        self.value = initial          # fetched_at stays 0: the first get() revalidates
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0.0
+        self.failed_at = None         # monotonic time of the last failed fetch, None once one succeeds
+
+        self._lock = threading.Lock()          # guards counters/state swaps
+        self._refresh_lock = threading.Lock()  # single-flight refresh
+        # Set while an async background refresher owns revalidation:
+        # get() then only reads memory and never fetches on the request path.
+        self.background = False
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.not_modified = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_refresh_ms = None
+        self.total_refresh_ms = 0.0
+        self.max_refresh_ms = 0.0
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    def get(self):
+        """Return the cached value, refreshing it if needed."""
+        if self.value is None:
+            # Cold start: block, but only one caller actually fetches.
+            with self._lock:
+                self.misses += 1
+            with self._refresh_lock:
+                if self.value is None and not self._backing_off():
+                    self._refresh()
+            return self.value
+
+        if self.background or time.monotonic() - self.fetched_at < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return self.value
+
+        # Stale: serve what we have and revalidate in the background.
+        with self._lock:
+            self.stale_hits += 1
+        self.refresh_async()
+        return self.value
+
+    def refresh_async(self):
+        """Start a background refresh unless one is already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._refresh()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    def _backing_off(self):
+        return self.failed_at is not None and time.monotonic() - self.failed_at < self.retry_s
+
+    def invalidate(self):
+        """Force the next get() to revalidate."""
+        self.fetched_at = 0.0
+        self.failed_at = None
+
+    def stats(self):
+        with self._lock:
+            refreshes = self.refreshes
+            return {
+                "ttl_s": self.ttl,
+                "background": self.background,
+                "age_s": round(time.monotonic() - self.fetched_at, 3) if self.fetched_at else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "refreshes": refreshes,
+                "not_modified": self.not_modified,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "retry_in_s": round(self.retry_s - (time.monotonic() - self.failed_at), 3)
+                if self._backing_off() else None,
+                "etag": self.etag,
+                "last_modified": self.last_modified,
+                "last_refresh_ms": self.last_refresh_ms,
+                "avg_refresh_ms": round(self.total_refresh_ms / refreshes, 3) if refreshes else None,
+                "max_refresh_ms": self.max_refresh_ms,
+            }
+
+    # ------------------------
+    # Refresh steps (shared with the async refresher)
+    # ------------------------
+    def request_headers(self):
+        """Headers for a conditional GET against the cached copy."""
+        # Use a User-Agent to bypass potential blocks
+        headers = {"User-Agent": "Mozilla/5.0"}
+        if self.value is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def not_modified_response(self):
+        with self._lock:
+            self.not_modified += 1
+        self.fetched_at = time.monotonic()
+        self.failed_at = None
+
+    def apply_response(self, content, etag=None, last_modified=None):
+        """Parse a 200 body and swap it in."""
+        value = self.parse(content, "GitHub (Live)")
+        # Swap in one go so readers never see a half-updated state
+        self.value = value
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        self.failed_at = None
+
+    def record_error(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error)
+        print(f"⚠️ GitHub Raw fetch failed: {error}")
+        if self.value is None and self.fallback is not None:
+            try:
+                self.value = self.fallback()
+            except Exception as e:
+                # A broken local copy must not turn into a request error
+                with self._lock:
+                    self.last_error = f"{error}; fallback failed: {e}"
+                print(f"⚠️ Local fallback failed: {e}")
+        # Back off for a full TTL instead of hammering GitHub on every request, and while
+        # nothing is cached, retry at most every retry_s
+        self.fetched_at = self.failed_at = time.monotonic()
+
+    def record_refresh(self, elapsed_ms):
+        with self._lock:
+            self.refreshes += 1
+            self.last_refresh_ms = round(elapsed_ms, 3)
+            self.total_refresh_ms += elapsed_ms
+            self.max_refresh_ms = max(self.max_refresh_ms, round(elapsed_ms, 3))
+
+    # ------------------------
+    # Internals
+    # ------------------------
+    def _refresh(self):
+        start = time.perf_counter()
+        try:
+            self._fetch()
+        except Exception as e:
+            self.record_error(e)
+        finally:
+            self.record_refresh((time.perf_counter() - start) * 1000)
+
+    def _fetch(self):
+        req = urllib.request.Request(self.url_fn(), headers=self.request_headers())
+        try:
+            with stage("fetch"), urllib.request.urlopen(req, timeout=self.timeout) as response:
+                content = response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                self.not_modified_response()
+                return
+            raise
+        self.apply_response(content, etag, last_modified)
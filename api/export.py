@@ -0,0 +1,329 @@
+"""Streaming dataset exports (/data/export): CSV, NDJSON and Parquet.
+
+The selected rows (a per-device slice or a view of DataStore.time_order,
+never a copy) are serialized `chunk_rows` at a time and each piece is
+yielded as soon as it is encoded, so memory stays at one chunk whatever the
+size of the export. A download keeps the DataStore it started with, so a
+dataset swap mid-stream never mixes two versions.
+
+Output is deterministic for a given dataset and selection, which is what
+makes HTTP Range requests (resumed downloads) possible:
+ - the ETag is derived from a checksum of the dataset plus the selected
+   rows, columns and format; If-Range falls back to the full body when it
+   no longer matches
+ - the size of every piece is recorded while the first full response
+   streams and kept in a small LRU, giving Content-Length and the offsets
+   of each chunk; until one has completed, Range is answered with the full
+   body (200), so the export is never encoded just to be measured
+ - a ranged CSV / NDJSON response re-encodes only from the chunk holding
+   the first requested byte; Parquet (footer offsets depend on every row
+   group before) is re-encoded from the start and skipped up to it
+
+Parquet needs pyarrow, imported on the first Parquet export only.
+"""
+
+import hashlib
+import io
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+import numpy as np
+from fastapi.responses import Response, StreamingResponse
+
+from metrics import stage
+from serialize import csv_bytes, dumps
+from store import NAT, _to_python, index_len, page
+
+CHUNK_ROWS = 10_000
+SIZE_CACHE = 32         # piece-size tables kept (one int per chunk each)
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportError(ValueError):
+    """Bad export request (unknown column, format unavailable)."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def export_columns(store, columns=None):
+    """Output columns in dataset order; `columns` (names) must all exist."""
+    available = [c for c in store.columns if c in store.data]
+    if not columns:
+        return available
+    unknown = [c for c in columns if c not in store.data]
+    if unknown:
+        raise ExportError(f"Unknown columns {unknown}; available: {available}")
+    wanted = set(columns)
+    return [c for c in available if c in wanted]
+
+
+def _crc_array(values, crc):
+    return zlib.crc32(np.ascontiguousarray(values).view(np.uint8), crc)
+
+
+def _crc_column(values, crc):
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return _crc_array(values, crc)
+    codes = getattr(values, "codes", None)
+    if codes is not None:
+        # Dictionary-encoded (mapped snapshot): codes plus the text they stand for
+        crc = _crc_array(codes, crc)
+        return zlib.crc32("\x1f".join(map(repr, values.categories)).encode("utf-8"), crc)
+    # Object column: repr() keeps None, NaN, 1.0 and "1.0" apart
+    for lo in range(0, len(values), CHUNK_ROWS):
+        crc = zlib.crc32("\x1f".join(map(repr, values[lo:lo + CHUNK_ROWS])).encode("utf-8"), crc)
+    return crc
+
+
+def fingerprint(store):
+    """Checksum of the dataset's timestamps, devices and every column (cached on the store)."""
+    tag = getattr(store, "_export_fingerprint", None)
+    if tag is None:
+        crc = _crc_array(store.ts, 0)
+        crc = _crc_array(store.device_codes, crc)
+        for col in store.columns:
+            values = store.data.get(col)
+            if values is not None:
+                crc = zlib.crc32(col.encode("utf-8"), _crc_column(values, crc))
+        tag = f"{store.rows}-{len(store.devices)}-{crc:08x}"
+        store._export_fingerprint = tag
+    return tag
+
+
+# ========================
+# ENCODERS
+# ========================
+def _csv_pieces(store, index, columns, chunk_rows, first):
+    n = index_len(index)
+    for lo in range(first * chunk_rows, max(n, 1), chunk_rows):
+        with stage("serialize"):
+            yield csv_bytes(store, page(index, lo, chunk_rows), columns, header=lo == 0)
+
+
+def _ndjson_pieces(store, index, columns, chunk_rows, first):
+    n = index_len(index)
+    for lo in range(first * chunk_rows, n, chunk_rows):
+        with stage("serialize"):
+            part = page(index, lo, chunk_rows)
+            cols = [_to_python(np.asarray(store.data[c][part])) for c in columns]
+            yield b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in zip(*cols))
+
+
+def _arrow_type(pa, store, col):
+    if col == "Timestamp":
+        return pa.timestamp("ns")       # typed from DataStore.ts, not the text column
+    dtype = store.data[col].dtype
+    return pa.string() if dtype == object else pa.from_numpy_dtype(dtype)
+
+
+def _arrow_column(pa, store, col, part, type):
+    if col == "Timestamp":
+        ts = np.asarray(store.ts[part])
+        return pa.array(ts, type=type, mask=ts == NAT)
+    values = np.asarray(store.data[col][part])
+    try:
+        return pa.array(values, type=type, from_pandas=True)      # NaN / None -> null
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed text/number cells in an object column
+        return pa.array([None if v is None or v != v else str(v) for v in values.tolist()], type=type)
+
+
+class _Sink(io.RawIOBase):
+    """File object for pyarrow that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        out = b"".join(self.parts)
+        self.parts.clear()
+        return out
+
+
+def _parquet_pieces(store, index, columns, chunk_rows, first):
+    pa, pq = _pyarrow()
+    schema = pa.schema([(c, _arrow_type(pa, store, c)) for c in columns])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    n = index_len(index)
+    for lo in range(0, n, chunk_rows):
+        with stage("serialize"):
+            part = page(index, lo, chunk_rows)
+            writer.write_table(pa.table([_arrow_column(pa, store, c, part, schema.field(c).type) for c in columns],
+                                        schema=schema))
+        yield sink.drain()      # one row group
+    writer.close()
+    yield sink.drain()          # footer
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)", status=501)
+    return pa, pq
+
+
+ENCODERS = {"csv": _csv_pieces, "ndjson": _ndjson_pieces, "parquet": _parquet_pieces}
+SEEKABLE = {"csv", "ndjson"}        # piece k depends only on chunk k
+
+
+# ========================
+# RANGE REQUESTS
+# ========================
+def parse_range(header, total):
+    """(first, last) byte positions for a single `bytes=` range, None to ignore it,
+    or "unsatisfiable"."""
+    unit, _, spec = (header or "").partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None                 # multiple ranges: the full body is a valid answer
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)      # bytes=-N: the last N bytes
+            if suffix <= 0:
+                return "unsatisfiable"
+            return max(total - suffix, 0), total - 1
+        first = int(first)
+        last = int(last) if last else total - 1
+    except ValueError:
+        return None
+    if first >= total or last < first:
+        return "unsatisfiable"
+    return first, min(last, total - 1)
+
+
+def _slice_pieces(pieces, offset, first, last):
+    """Bytes [first, last] out of `pieces`, which start at byte `offset`."""
+    pos = offset
+    for piece in pieces:
+        end = pos + len(piece)
+        if end > first:
+            yield piece[max(first - pos, 0):min(last + 1 - pos, len(piece))]
+        pos = end
+        if pos > last:
+            return
+
+
+class Exporter:
+    def __init__(self, chunk_rows=CHUNK_ROWS, size_cache=SIZE_CACHE):
+        self.chunk_rows = chunk_rows
+        self.size_cache = size_cache
+        self._sizes = OrderedDict()     # etag -> size of every piece
+        self._lock = threading.Lock()
+
+        self.exports = 0
+        self.ranged = 0
+        self.unsized_ranges = 0         # Range answered with 200: no complete download yet
+
+    def pieces(self, store, index, columns, fmt, first=0):
+        """Encoded pieces, starting at chunk `first` (seekable formats only)."""
+        return ENCODERS[fmt](store, index, columns, self.chunk_rows, first)
+
+    def etag(self, store, index, columns, fmt):
+        if isinstance(index, slice):
+            rows = ("slice", index.start, index.stop)
+        else:
+            rows = ("index", len(index), _crc_array(index, 0))
+        key = repr((fingerprint(store), rows, columns, fmt, self.chunk_rows))
+        return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:24] + '"'
+
+    def _recorded(self, etag, pieces):
+        """Pass `pieces` through, keeping their sizes once the last one has been sent."""
+        sizes = []
+        for piece in pieces:
+            sizes.append(len(piece))
+            yield piece
+        # Not reached when the client disconnects part-way (the generator is closed)
+        with self._lock:
+            self._sizes[etag] = sizes
+            while len(self._sizes) > self.size_cache:
+                self._sizes.popitem(last=False)
+
+    def known_sizes(self, etag):
+        with self._lock:
+            sizes = self._sizes.get(etag)
+            if sizes is not None:
+                self._sizes.move_to_end(etag)
+            return sizes
+
+    def response(self, store, index, columns, fmt, filename, range_header=None, if_range=None, headers=None):
+        """200 streaming the whole export, 206 for a satisfiable Range, 416 otherwise."""
+        if fmt == "parquet":
+            _pyarrow()              # fail before streaming starts
+        media_type, extension = FORMATS[fmt]
+        etag = self.etag(store, index, columns, fmt)
+        headers = dict(headers or {})
+        headers.update({
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Content-Disposition": f'attachment; filename="{filename}.{extension}"',
+        })
+        self.exports += 1
+
+        sizes = self.known_sizes(etag)
+        # If-Range with another version: the client's partial copy is stale, send everything
+        resumable = range_header and (not if_range or if_range.strip() == etag)
+        if resumable and sizes is None:
+            # No download has completed yet, so the size is unknown; ignoring Range (200) is valid HTTP
+            self.unsized_ranges += 1
+        elif resumable:
+            total = sum(sizes)
+            span = parse_range(range_header, total)
+            if span == "unsatisfiable":
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{total}"})
+            if span is not None:
+                first, last = span
+                self.ranged += 1
+                if fmt in SEEKABLE:
+                    offsets = np.cumsum([0] + sizes)
+                    k = bisect_right(offsets.tolist(), first) - 1
+                    pieces, offset = self.pieces(store, index, columns, fmt, first=k), int(offsets[k])
+                else:
+                    pieces, offset = self.pieces(store, index, columns, fmt), 0
+                headers["Content-Range"] = f"bytes {first}-{last}/{total}"
+                headers["Content-Length"] = str(last - first + 1)
+                return StreamingResponse(_slice_pieces(pieces, offset, first, last), status_code=206,
+                                         media_type=media_type, headers=headers)
+
+        pieces = self.pieces(store, index, columns, fmt)
+        if sizes is not None:
+            headers["Content-Length"] = str(sum(sizes))
+        else:
+            pieces = self._recorded(etag, pieces)
+        return StreamingResponse(pieces, media_type=media_type, headers=headers)
+
+    def stats(self):
+        with self._lock:
+            cached = len(self._sizes)
+        return {
+            "chunk_rows": self.chunk_rows,
+            "exports": self.exports,
+            "ranged": self.ranged,
+            "unsized_ranges": self.unsized_ranges,
+            "size_tables_cached": cached,
+        }
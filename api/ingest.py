@@ -0,0 +1,333 @@
+"""Direct device ingestion: validate, buffer in memory, flush to the columnar store.
+
+Readings are accepted in the live_data.csv schema ("Device ID",
+"Temperature (°C)", ...) or with short keys (device_id, temperature, ...),
+one object or a list per request. Validated rows go into a fixed-size ring
+buffer (preallocated NumPy columns); a background task drains it into the
+columnar store whenever `flush_rows` are pending or `flush_s` has passed,
+so disk writes are batched regardless of the request rate.
+
+Timestamps are stored as naive local wall-clock time like the rest of the
+dataset: readings without one are stamped with the server's local receive
+time, and epoch numbers (UTC) are shifted to local time.
+When the buffer is full because flushing fell behind, new readings are
+refused (503 + Retry-After) rather than dropping unflushed ones.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from columnar_store import append_store, read_frame, read_manifest, write_store
+from store import NAT, build_store, cutoff_ns, format_ts
+
+CAPACITY = 200_000          # rows held in memory awaiting a flush
+FLUSH_ROWS = 5_000          # flush as soon as this many rows are pending
+FLUSH_S = 2.0               # ...or at least this often
+MAX_BATCH = 5_000           # readings per request
+MAX_TEXT = 64
+
+# Canonical column -> (kind, accepted keys, (min, max) for numbers)
+SCHEMA = {
+    "Device ID": ("device", ("device id", "device_id", "device", "id"), None),
+    "Temperature (°C)": ("number", ("temperature (°c)", "temperature", "temp"), (-50, 100)),
+    "Humidity (%)": ("number", ("humidity (%)", "humidity"), (0, 100)),
+    "Light (Lux)": ("number", ("light (lux)", "light", "lux"), (0, 200_000)),
+    "AQI Value": ("number", ("aqi value", "aqi_value", "aqi"), (0, 10_000)),
+    "AQI Status": ("text", ("aqi status", "aqi_status"), None),
+    "Smoke Status": ("text", ("smoke status", "smoke_status", "smoke"), None),
+    "Device Health": ("text", ("device health", "device_health", "health"), None),
+    "Free Heap (B)": ("number", ("free heap (b)", "free_heap", "heap"), (0, 2**31 - 1)),
+}
+TIMESTAMP_KEYS = ("timestamp", "time", "ts")
+# Output order matches live_data.csv; Month / Month-Year / Year derive from the timestamp
+COLUMNS = ["Timestamp"] + list(SCHEMA) + ["Month", "Month-Year", "Year"]
+
+_ALIASES = {alias: col for col, (_, aliases, _) in SCHEMA.items() for alias in aliases}
+_ALIASES.update({col.lower(): col for col in SCHEMA})
+
+
+def _key(name):
+    """Column match key: "Temperature (°C)" and "Temperature_°C" -> "temperaturec"."""
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+class IngestError(ValueError):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid reading(s)")
+        self.errors = errors
+
+
+class BufferFull(RuntimeError):
+    pass
+
+
+# ========================
+# VALIDATION
+# ========================
+def _readings(payload):
+    if isinstance(payload, dict):
+        payload = payload.get("readings", [payload])
+    if not isinstance(payload, list) or not payload:
+        raise IngestError([{"index": None, "error": "expected a reading object or a non-empty list"}])
+    if len(payload) > MAX_BATCH:
+        raise IngestError([{"index": None, "error": f"at most {MAX_BATCH} readings per request"}])
+    return payload
+
+
+def validate(payload, now_ns=None):
+    """Payload -> column arrays ({canonical column: array}, ts int64); raises IngestError."""
+    readings = _readings(payload)
+    n = len(readings)
+    now_ns = cutoff_ns(datetime.now()) if now_ns is None else now_ns
+    values = {col: [None] * n for col in SCHEMA}
+    stamps = [None] * n
+    errors = []
+    for i, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            errors.append({"index": i, "error": "reading must be an object"})
+            continue
+        for key, value in reading.items():
+            k = str(key).strip().lower()
+            if k in TIMESTAMP_KEYS:
+                stamps[i] = value
+                continue
+            col = _ALIASES.get(k)
+            if col is None:
+                errors.append({"index": i, "field": key, "error": "unknown field"})
+                continue
+            kind, _, bounds = SCHEMA[col]
+            if value is None or value == "":
+                continue
+            if kind == "number":
+                if isinstance(value, bool):
+                    errors.append({"index": i, "field": key, "error": "not a number"})
+                    continue
+                if not isinstance(value, (int, float)):
+                    try:
+                        value = float(value)
+                    except (TypeError, ValueError):
+                        errors.append({"index": i, "field": key, "error": "not a number"})
+                        continue
+                if not bounds[0] <= value <= bounds[1]:
+                    errors.append({"index": i, "field": key, "error": f"out of range {bounds}"})
+                    continue
+            else:
+                value = str(value).strip()
+                if len(value) > MAX_TEXT:
+                    errors.append({"index": i, "field": key, "error": f"longer than {MAX_TEXT} characters"})
+                    continue
+            values[col][i] = value
+        if values["Device ID"][i] in (None, ""):
+            errors.append({"index": i, "field": "Device ID", "error": "required"})
+        if len(errors) >= 20:
+            break
+    if errors:
+        raise IngestError(errors)
+
+    ts = np.full(n, now_ns, dtype=np.int64)
+    numeric = [i for i, s in enumerate(stamps) if isinstance(s, (int, float)) and not isinstance(s, bool)]
+    if len(numeric) + sum(isinstance(s, str) for s in stamps) < sum(s is not None for s in stamps):
+        raise IngestError([{"index": None, "field": "Timestamp", "error": "must be a string or epoch number"}])
+    text = [i for i, s in enumerate(stamps) if isinstance(s, str)]
+    if numeric:
+        # Epoch seconds / ms / ns, told apart by magnitude
+        arr = np.asarray([stamps[i] for i in numeric], dtype=np.float64)
+        scale = np.where(arr < 1e11, 1e9, np.where(arr < 1e14, 1e6, 1.0))
+        ns = (arr * scale).astype(np.int64)
+        # UTC offset of each instant (DST aware), as stored timestamps are local wall-clock
+        offset = [time.localtime(int(v) // 1_000_000_000).tm_gmtoff for v in ns]
+        ts[numeric] = ns + np.asarray(offset, dtype=np.int64) * 1_000_000_000
+    if text:
+        from timeparse import parse_timestamps     # pandas, only needed for text timestamps
+
+        ts[text] = parse_timestamps([str(stamps[i]) for i in text], key="ingest")
+    bad = np.flatnonzero(ts == NAT)
+    if len(bad):
+        raise IngestError([{"index": int(i), "field": "Timestamp", "error": "unparseable"} for i in bad[:20]])
+    cols = {}
+    for col, (kind, _, _) in SCHEMA.items():
+        if kind == "number":
+            cols[col] = np.array([np.nan if v is None else v for v in values[col]], dtype=np.float64)
+        else:
+            cols[col] = np.array(values[col], dtype=object)
+    return cols, ts
+
+
+# ========================
+# RING BUFFER
+# ========================
+class RingBuffer:
+    """Fixed-capacity columnar FIFO: append() at the head, drain from the tail."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.cols = {
+            col: np.empty(capacity, dtype=np.float64 if kind == "number" else object)
+            for col, (kind, _, _) in SCHEMA.items()
+        }
+        self.head = 0           # total rows ever appended
+        self.tail = 0           # total rows ever flushed
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.head - self.tail
+
+    def _positions(self, start, n):
+        return (start + np.arange(n)) % self.capacity
+
+    def append(self, cols, ts):
+        n = len(ts)
+        with self._lock:
+            if len(self) + n > self.capacity:
+                raise BufferFull(f"ingest buffer full ({len(self)} rows pending)")
+            pos = self._positions(self.head, n)
+            self.ts[pos] = ts
+            for col, arr in cols.items():
+                self.cols[col][pos] = arr
+            self.head += n
+        return n
+
+    def peek(self, limit=None):
+        """Copy of the pending rows (oldest first) and the head it stops at."""
+        with self._lock:
+            n = len(self) if limit is None else min(len(self), limit)
+            pos = self._positions(self.tail, n)
+            end = self.tail + n
+            return {col: arr[pos] for col, arr in self.cols.items()}, self.ts[pos], end
+
+    def release(self, end):
+        """Mark rows up to `end` as flushed."""
+        with self._lock:
+            self.tail = max(self.tail, end)
+
+
+def to_frame(cols, ts):
+    """Buffered rows as a live_data.csv-shaped DataFrame."""
+    import pandas as pd
+
+    dt = pd.to_datetime(ts)
+    frame = {"Timestamp": format_ts(ts)}
+    frame.update(cols)
+    frame["Month"] = dt.strftime("%b")
+    frame["Month-Year"] = dt.strftime("%b-%Y")
+    frame["Year"] = dt.year
+    return pd.DataFrame(frame, columns=COLUMNS)
+
+
+# ========================
+# WRITE-BEHIND
+# ========================
+class Ingestor:
+    def __init__(self, root, capacity=CAPACITY, flush_rows=FLUSH_ROWS, flush_s=FLUSH_S):
+        self.root = root
+        self.buffer = RingBuffer(capacity)
+        self.flush_rows = flush_rows
+        self.flush_s = flush_s
+        self._wake = None
+        self._task = None
+        self._flush_lock = threading.Lock()
+
+        self.accepted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.rewrites = 0
+        self.last_flush_ms = None
+        self.last_error = None
+
+    def add(self, payload):
+        """Validate and buffer one request's readings; returns the number accepted."""
+        try:
+            cols, ts = validate(payload)
+        except IngestError:
+            self.rejected += 1
+            raise
+        n = self.buffer.append(cols, ts)
+        self.accepted += n
+        if len(self.buffer) >= self.flush_rows and self._wake is not None:
+            self._wake.set()
+        return n
+
+    def flush(self):
+        """Merge pending rows into the columnar store as one new generation."""
+        with self._flush_lock:
+            cols, ts, end = self.buffer.peek()
+            if len(ts) == 0:
+                return 0
+            start = time.perf_counter()
+            new = to_frame(cols, ts)
+            manifest = read_manifest(self.root)
+            if manifest is not None:
+                # Use the store's spelling of each column (update_sheet_v4.py normalizes names)
+                names = {_key(c): c for c in manifest["columns"]}
+                new = new.rename(columns={c: names.get(_key(c), c) for c in new.columns})
+            delta = build_store(new, "Columnar Store", ts=ts)
+            # Only the (device, month) partitions these rows fall in are rewritten
+            if manifest is None or append_store(delta, self.root) is None:
+                self._rewrite(new, ts)
+            self.buffer.release(end)
+            self.flushes += 1
+            self.flushed_rows += len(ts)
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 3)
+            return len(ts)
+
+    def _rewrite(self, new, ts):
+        """Full store rewrite, for the first flush or when new rows change the schema."""
+        import pandas as pd
+
+        new = new.assign(_ts=ts)
+        stored = read_frame(self.root, ts_column="_ts")
+        frame = new if stored is None else pd.concat([stored, new], ignore_index=True)
+        device_col = next((c for c in frame.columns if "device" in c.lower() and "health" not in c.lower()), None)
+        # A device re-sending a batch must not duplicate readings
+        frame = frame.drop_duplicates(subset=[device_col, "_ts"], keep="last")
+        store_ts = frame.pop("_ts").to_numpy(dtype=np.int64)
+        write_store(build_store(frame, "Columnar Store", ts=store_ts), self.root)
+        self.rewrites += 1
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Don't lose what is still buffered on shutdown
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Ingest flush failed: {e}")
+
+    def stats(self):
+        return {
+            "pending": len(self.buffer),
+            "capacity": self.buffer.capacity,
+            "accepted": self.accepted,
+            "rejected_requests": self.rejected,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "full_rewrites": self.rewrites,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+        }
+
@@ -0,0 +1,287 @@
+"""Streaming per-device analytics behind /insights.
+
+Every sensor column of every device keeps a handful of numbers, updated in
+O(1) per reading from the rows each new dataset adds (a per-device
+watermark, as for retention):
+
+ - exponentially weighted mean and variance, decayed by time (`span_s`),
+   and the z-score of each reading against them before it is folded in;
+   |z| >= `z_threshold` is an anomaly (reported for RECENT_S)
+ - an exponentially weighted least-squares slope over `trend_s`, i.e. the
+   rate of change per hour without single-reading noise
+ - since when the value has not changed: unchanged for `stuck_s` (and at
+   least STUCK_MIN_READINGS readings) is a stuck sensor
+ - for heap columns, a slope below -`leak_per_h` is a memory leak
+
+State lives in (devices x columns) arrays and each step advances every
+device that has a pending reading at once, so an update costs a few array
+operations per reading *depth* (usually 1-2 after a swap), not per device.
+A device seen for the first time is warmed up from its last WARMUP_ROWS
+readings only; older readings would carry negligible weight.
+"""
+
+import time
+
+import numpy as np
+
+from serialize import dumps
+from store import NAT, format_ts, normalize_device
+
+SPAN_S = 6 * 3600           # time constant of the mean/variance behind z-scores
+TREND_S = 24 * 3600         # time constant of the trend (slope) fit
+Z_THRESHOLD = 4.0
+RECENT_S = 3600             # anomalies this close to the latest reading are reported
+STUCK_S = 12 * 3600         # longer than a night of Light = 0
+LEAK_PER_H = 50.0           # heap bytes lost per hour, sustained
+MIN_READINGS = 20           # before z-scores and trends are reported
+STUCK_MIN_READINGS = 10
+WARMUP_ROWS = 2_000
+
+_FLOAT = ("mean", "var", "z", "last_x", "t_mean", "x_mean", "t_var", "cov", "anomaly_value", "anomaly_z")
+_INT = ("n", "same_count", "anomalies")
+_TS = ("last_col_ts", "same_since", "anomaly_ts")
+
+
+def _num(value, digits=3):
+    value = float(value)
+    return None if value != value else round(value, digits)
+
+
+def _fmt(value):
+    return f"{value:.6g}"
+
+
+class Insights:
+    def __init__(self, span_s=SPAN_S, trend_s=TREND_S, z_threshold=Z_THRESHOLD, stuck_s=STUCK_S,
+                 leak_per_h=LEAK_PER_H):
+        self.span_s = span_s
+        self.trend_s = trend_s
+        self.z_threshold = z_threshold
+        self.stuck_s = stuck_s
+        self.leak_per_h = leak_per_h
+        self.columns = None
+        self.index = {}             # normalized key -> row in the state arrays
+        self.names = []
+        self.last_ts = np.empty(0, dtype=np.int64)      # per device: newest reading folded in
+        self.t0 = np.empty(0, dtype=np.int64)           # per device: origin of the trend's time axis
+        self.rows_added = 0
+        self.last_update_ms = None
+
+    # ------------------------
+    # Updates
+    # ------------------------
+    def update(self, store):
+        """Fold in the rows of `store` newer than each device's watermark."""
+        if store is None:
+            return 0
+        start = time.perf_counter()
+        if self.columns is None:
+            self.columns = list(store.sensor_columns)
+            self._grow(0)
+        elif [c for c in self.columns if c not in store.data]:
+            return 0        # different schema (e.g. other source); keep what we have
+
+        new = []
+        for key, (lo, hi) in store.device_slices.items():
+            name = store.devices[store.device_codes[lo]] if hi > lo else None
+            if key not in self.index and name and name.lower() != "nan":
+                new.append((key, name))
+        if new:
+            self._grow(len(new))
+            for key, name in new:
+                self.index[key] = len(self.names)
+                self.names.append(name)
+
+        rows, firsts, counts = [], [], []
+        for key, (lo, hi) in store.device_slices.items():
+            r = self.index.get(key)
+            if r is None or hi <= lo:
+                continue
+            first = lo + int(np.searchsorted(store.ts[lo:hi], self.last_ts[r], side="right"))
+            if self.last_ts[r] == NAT:
+                first = max(first, hi - WARMUP_ROWS)
+                self.t0[r] = store.ts[first] if first < hi else NAT
+            if first < hi:
+                rows.append(r)
+                firsts.append(first)
+                counts.append(hi - first)
+        if not rows:
+            self.last_update_ms = round((time.perf_counter() - start) * 1000, 3)
+            return 0
+
+        # Deepest backlog first, so the devices still active at step j are a prefix
+        order = np.argsort(counts, kind="stable")[::-1]
+        rows, firsts, counts = np.array(rows)[order], np.array(firsts)[order], np.array(counts)[order]
+        neg_counts = -counts
+        cols = [store.data[c] for c in self.columns]
+        for j in range(int(counts[0])):
+            k = int(np.searchsorted(neg_counts, -j, side="left"))
+            idx = firsts[:k] + j
+            x = np.empty((k, len(cols)), dtype=np.float64)
+            for i, col in enumerate(cols):
+                x[:, i] = col[idx]
+            self._step(rows[:k], store.ts[idx], x)
+        added = int(counts.sum())
+        self.rows_added += added
+        self.last_update_ms = round((time.perf_counter() - start) * 1000, 3)
+        return added
+
+    def _grow(self, extra):
+        width = len(self.columns)
+        self.last_ts = np.concatenate([self.last_ts, np.full(extra, NAT, dtype=np.int64)])
+        self.t0 = np.concatenate([self.t0, np.full(extra, NAT, dtype=np.int64)])
+        for name in _FLOAT:
+            fill = np.nan if name in ("z", "last_x", "anomaly_value", "anomaly_z") else 0.0
+            self._extend(name, np.full((extra, width), fill))
+        for name in _INT:
+            self._extend(name, np.zeros((extra, width), dtype=np.int64))
+        for name in _TS:
+            self._extend(name, np.full((extra, width), NAT, dtype=np.int64))
+
+    def _extend(self, name, block):
+        old = getattr(self, name, None)
+        setattr(self, name, block if old is None else np.concatenate([old, block]))
+
+    def _step(self, r, ts, x):
+        """One reading for each device in `r` (unique rows), all columns at once."""
+        valid = ~np.isnan(x)
+        n = self.n[r]
+        first = valid & (n == 0)
+        tcol = ts[:, None]
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            dt = np.where(first, 0.0, (tcol - self.last_col_ts[r]) / 1e9).clip(0)
+            # Plain running mean/variance until the window has filled, so early z-scores aren't
+            # measured against a variance that is still growing from zero
+            warm = 1.0 / (n + 1)
+            a = np.maximum(1.0 - np.exp(-dt / self.span_s), warm)
+            at = np.maximum(1.0 - np.exp(-dt / self.trend_s), warm)
+
+            # Score against the state before this reading
+            mean, var = self.mean[r], self.var[r]
+            std = np.sqrt(var)
+            scored = valid & (n >= MIN_READINGS) & (std > 0)
+            z = np.where(scored, (x - mean) / np.where(std > 0, std, 1.0), np.nan)
+            anomaly = scored & (np.abs(z) >= self.z_threshold)
+
+            diff = x - mean
+            new_mean = mean + a * diff
+            new_var = (1 - a) * (var + a * diff * diff)
+
+            # Weighted least squares of x over t (hours since the device's origin)
+            t = ((ts - self.t0[r]) / 3.6e12)[:, None]
+            dtm, dxm = t - self.t_mean[r], x - self.x_mean[r]
+            new_t_mean = self.t_mean[r] + at * dtm
+            new_x_mean = self.x_mean[r] + at * dxm
+            new_t_var = (1 - at) * (self.t_var[r] + at * dtm * dtm)
+            new_cov = (1 - at) * (self.cov[r] + at * dtm * dxm)
+
+        changed = valid & (first | (x != self.last_x[r]))
+        keep = ~valid
+        self.mean[r] = np.where(keep, mean, new_mean)
+        self.var[r] = np.where(keep, var, new_var)
+        self.t_mean[r] = np.where(keep, self.t_mean[r], new_t_mean)
+        self.x_mean[r] = np.where(keep, self.x_mean[r], new_x_mean)
+        self.t_var[r] = np.where(keep, self.t_var[r], new_t_var)
+        self.cov[r] = np.where(keep, self.cov[r], new_cov)
+        self.z[r] = np.where(keep, self.z[r], z)
+        self.same_since[r] = np.where(changed, tcol, self.same_since[r])
+        self.same_count[r] = np.where(changed, 1, self.same_count[r] + valid)
+        self.last_x[r] = np.where(keep, self.last_x[r], x)
+        self.last_col_ts[r] = np.where(keep, self.last_col_ts[r], tcol)
+        self.n[r] = n + valid
+        self.anomalies[r] += anomaly
+        self.anomaly_ts[r] = np.where(anomaly, tcol, self.anomaly_ts[r])
+        self.anomaly_value[r] = np.where(anomaly, x, self.anomaly_value[r])
+        self.anomaly_z[r] = np.where(anomaly, z, self.anomaly_z[r])
+        self.last_ts[r] = ts
+
+    # ------------------------
+    # Queries
+    # ------------------------
+    def device(self, r, last_reading=None):
+        """Current statistics, flags and a one-line summary for the device in row `r`."""
+        name = self.names[r]
+        last_ts = int(self.last_ts[r])
+        observed_s = (last_ts - int(self.t0[r])) / 1e9 if last_ts != NAT else 0.0
+        metrics, flags = {}, []
+        for i, col in enumerate(self.columns):
+            n = int(self.n[r, i])
+            if n == 0:
+                continue
+            std = float(np.sqrt(self.var[r, i]))
+            slope = self.cov[r, i] / self.t_var[r, i] if n >= MIN_READINGS and self.t_var[r, i] > 0 else np.nan
+            unchanged_s = (int(self.last_col_ts[r, i]) - int(self.same_since[r, i])) / 1e9
+            value, z = float(self.last_x[r, i]), float(self.z[r, i])
+            stuck = int(self.same_count[r, i]) >= STUCK_MIN_READINGS and unchanged_s >= self.stuck_s
+            leak = "heap" in col.lower() and observed_s >= self.trend_s / 2 and slope < -self.leak_per_h
+            recent = self.anomaly_ts[r, i] != NAT and last_ts - self.anomaly_ts[r, i] <= RECENT_S * 1e9
+            anomaly = None
+            if recent:
+                anomaly = {"time": format_ts([int(self.anomaly_ts[r, i])])[0],
+                           "value": _num(self.anomaly_value[r, i]), "z": _num(self.anomaly_z[r, i], 2)}
+
+            if leak:
+                flags.append(("leak", col, f"🧠 {col} falling ~{abs(slope):.0f}/h (possible memory leak)"))
+            if stuck:
+                flags.append(("stuck", col, f"🧊 {col} stuck at {_fmt(value)} for {unchanged_s / 3600:.1f} h"))
+            if recent:
+                flags.append(("anomaly", col, f"🚨 {col} {_fmt(self.anomaly_value[r, i])} was "
+                                              f"{self.anomaly_z[r, i]:+.1f}σ from its recent mean"))
+            elif not leak and slope == slope and std > 0 and abs(slope) >= std:
+                # Moving by more than its usual spread every hour
+                flags.append(("trend", col, f"{'📈' if slope > 0 else '📉'} {col} {'rising' if slope > 0 else 'falling'} "
+                                            f"{abs(slope):.3g}/h"))
+            metrics[col] = {
+                "value": _num(value),
+                "mean": _num(self.mean[r, i]),
+                "std": _num(std),
+                "z": _num(z, 2),
+                "trend_per_h": _num(slope, 4),
+                "unchanged_s": round(unchanged_s),
+                "readings": n,
+                "anomalies": int(self.anomalies[r, i]),
+                "last_anomaly": anomaly,
+                "stuck": bool(stuck),
+                "leak": bool(leak),
+            }
+        text = "; ".join(f[2] for f in flags) if flags else "✅ All sensors within their usual range"
+        return {
+            "device": name,
+            "last_reading": last_reading,
+            "flags": [{"kind": kind, "column": col, "text": msg} for kind, col, msg in flags],
+            "text": f"{name}: {text}",
+            "metrics": metrics,
+        }
+
+    def body(self, devices=None):
+        """JSON bytes: per-device insights plus one summary line for InsightBox.
+
+        With no device to report on, the line is null and InsightBox keeps its default text.
+        """
+        if devices is None:
+            rows = sorted(self.index.values(), key=lambda r: self.names[r])
+        else:
+            rows = [self.index[k] for k in (normalize_device(d) for d in devices) if k in self.index]
+        # One strftime pass for every device's last reading
+        stamps = format_ts(self.last_ts[rows]) if rows else []
+        entries = [self.device(r, stamp if self.last_ts[r] != NAT else None) for r, stamp in zip(rows, stamps)]
+        attention = [e for e in entries if any(f["kind"] != "trend" for f in e["flags"])]
+        if not entries:
+            text = None
+        elif len(entries) == 1:
+            text = entries[0]["text"]
+        elif attention:
+            text = f"⚠️ {len(attention)} of {len(entries)} devices need attention — " + \
+                   " | ".join(e["text"] for e in attention[:3]) + (" | …" if len(attention) > 3 else "")
+        else:
+            text = f"✅ {len(entries)} devices, all sensors within their usual range"
+        return dumps({"text": text, "devices": entries})
+
+    def stats(self):
+        return {
+            "devices": len(self.names),
+            "columns": self.columns,
+            "rows_added": self.rows_added,
+            "last_update_ms": self.last_update_ms,
+            "state_bytes": int(sum(getattr(self, f).nbytes for f in _FLOAT + _INT + _TS)) if self.columns else 0,
+        }
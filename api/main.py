@@ -1,12 +1,29 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+import hmac
 from datetime import datetime, timedelta
-import pandas as pd
+from functools import partial
 import os
-import urllib.request
-from io import StringIO
+import sys
+import threading
+from io import BytesIO
 
-app = FastAPI(root_path="/api")
+sys.path.insert(0, os.path.dirname(__file__))
+from data_cache import DataCache
+from ingest import BufferFull, Ingestor, IngestError
+from columnar_store import MANIFEST, ColumnarStoreCache, open_store
+from shared_dataset import BUNDLED_SNAPSHOT, DEFAULT_DIR as SHARED_DEFAULT_DIR, SharedDataset, open_snapshot
+from retention import RAW_ROWS, TIERS, Retention
+from metrics import MetricsMiddleware, REGISTRY, record_rows, stage
+from metrics import ENABLED as METRICS_ENABLED
+from aggregate import bucket_aggregate, lttb_downsample, parse_resolution
+from serialize import columnar_json, dumps, encoded_response, orjson, records_json
+from export import CHUNK_ROWS, ExportError, Exporter, export_columns
+from store import build_store, cutoff_ns, index_len, page
+from stream import StreamBroker
+from summary import SILENT_S, SummaryTable
+from insights import LEAK_PER_H, SPAN_S, STUCK_S, TREND_S, Z_THRESHOLD, Insights
 
 # Robust CSV path finding
 POSSIBLE_PATHS = [
@@ -24,104 +41,464 @@ for p in POSSIBLE_PATHS:
 if not DATA_PATH:
     DATA_PATH = "live_data.csv"
 
+# Columnar store written by the ingester / columnar_store.py migrate
+STORE_PATHS = [
+    os.path.join(os.path.dirname(__file__), "..", "data_store"),
+    os.path.join(os.path.dirname(__file__), "data_store"),
+    "/var/task/data_store",
+    "data_store"
+]
+DATA_STORE_DIR = os.getenv("DATA_STORE_DIR") or next(
+    (p for p in STORE_PATHS if os.path.exists(os.path.join(p, MANIFEST))), "data_store")
+
+# Binary snapshot written at deploy time next to the columnar store: a cold instance serves it
+# (mapped, no pandas) from the first request while the live CSV is fetched in the background
+BUNDLED_SNAPSHOT_PATH = os.getenv("BUNDLED_SNAPSHOT") or os.path.join(DATA_STORE_DIR, BUNDLED_SNAPSHOT)
+COLD_START_SNAPSHOT = os.getenv("COLD_START_SNAPSHOT", "1") == "1"
+
+# "github" = live CSV from GitHub Raw (local store/CSV as fallback)
+# "store"  = serve the local columnar store directly, reloading on new generations
+# POST /ingest writes to the columnar store, so the default is "store" when INGEST_TOKEN is set;
+# with DATA_SOURCE=github ingested readings are only served once the CSV itself contains them
+DATA_SOURCE = os.getenv("DATA_SOURCE") or ("store" if os.getenv("INGEST_TOKEN") else "github")
+
 # GitHub Live Data URL (Hardcoded fallback for reliability)
 GITHUB_REPO = os.getenv("GITHUB_REPOSITORY") or "Naveen359-G/iot-sensor-dashboard"
 
-def get_df():
-    """Fetch DataFrame from GitHub Raw if possible, otherwise local file."""
+# Seconds a fetched copy is served before it is revalidated against GitHub
+DATA_CACHE_TTL = float(os.getenv("DATA_CACHE_TTL", "60"))
+# While nothing is loaded, seconds between fetch attempts after a failure
+DATA_RETRY_S = float(os.getenv("DATA_RETRY_S", "5"))
+# Revalidate from a background task (app lifespan) instead of on the request path
+BACKGROUND_REFRESH = os.getenv("BACKGROUND_REFRESH", "1") == "1"
+
+# Multi-worker serving (uvicorn --workers N): one worker loads and publishes memory-mapped
+# snapshots to SHARED_DATASET_DIR (tmpfs by default), the others map them read-only
+SHARED_DATASET = os.getenv("SHARED_DATASET", "0") == "1"
+SHARED_DATASET_DIR = os.getenv("SHARED_DATASET_DIR", SHARED_DEFAULT_DIR)
+# Seconds between a worker's checks for a newer published generation
+SHARED_DATASET_TTL = float(os.getenv("SHARED_DATASET_TTL", "1"))
+
+# POST /ingest is enabled only when a token is configured (devices send it as a Bearer token)
+INGEST_TOKEN = os.getenv("INGEST_TOKEN")
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "5000"))
+INGEST_FLUSH_S = float(os.getenv("INGEST_FLUSH_S", "2"))
+
+# Per-device retention served from memory: raw ring size and rollup tiers (width:kept, ...)
+RETENTION_RAW_ROWS = int(os.getenv("RETENTION_RAW_ROWS", str(RAW_ROWS)))
+RETENTION_TIERS = os.getenv("RETENTION_TIERS", TIERS)
+# /summary: rolling stat windows and how long without a reading flags a device as silent
+SUMMARY_WINDOWS = os.getenv("SUMMARY_WINDOWS", "1h,24h")
+SUMMARY_SILENT_S = float(os.getenv("SUMMARY_SILENT_S", str(SILENT_S)))
+# /insights: z-score window and trend window (seconds), anomaly threshold (σ),
+# how long an unchanged value counts as a stuck sensor, and heap loss (B/h) that flags a leak
+INSIGHTS_SPAN_S = float(os.getenv("INSIGHTS_SPAN_S", str(SPAN_S)))
+INSIGHTS_TREND_S = float(os.getenv("INSIGHTS_TREND_S", str(TREND_S)))
+INSIGHTS_Z = float(os.getenv("INSIGHTS_Z", str(Z_THRESHOLD)))
+INSIGHTS_STUCK_S = float(os.getenv("INSIGHTS_STUCK_S", str(STUCK_S)))
+INSIGHTS_LEAK_PER_H = float(os.getenv("INSIGHTS_LEAK_PER_H", str(LEAK_PER_H)))
+# Rows encoded per streamed piece of /data/export and /data/csv (memory per download)
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", str(CHUNK_ROWS)))
+# Optional snapshot so rollups survive restarts (and outlive the dataset's own 90 days)
+RETENTION_FILE = os.getenv("RETENTION_FILE")
+
+# Per-stage histograms on /metrics and Server-Timing headers (METRICS=0 turns both off);
+# API_DEBUG=1 additionally lets any request be answered with a stack profile via ?profile=1
+API_DEBUG = os.getenv("API_DEBUG", "0") == "1"
+PROFILE_INTERVAL_S = float(os.getenv("PROFILE_INTERVAL_S", "0.001"))
+
+def _live_url():
     timestamp = int(datetime.now().timestamp() // 60)
-    live_url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/live_data.csv?v={timestamp}"
-    
+    return f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/live_data.csv?v={timestamp}"
+
+def _parse_csv(content, source):
+    # pandas is imported on the first parse, not at cold start
+    import pandas as pd
+
+    with stage("parse"):
+        df = pd.read_csv(BytesIO(content))
+        return build_store(df, source)
+
+def _load_snapshot(source):
+    if not os.path.exists(BUNDLED_SNAPSHOT_PATH):
+        return None
     try:
-        # Use a Request with User-Agent to bypass potential blocks
-        req = urllib.request.Request(live_url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.status == 200:
-                content = response.read().decode('utf-8')
-                df = pd.read_csv(StringIO(content))
-                # Ensure we only keep the last 1000 records
-                if len(df) > 1000:
-                    df = df.tail(1000)
-                # Add a marker for the frontend
-                df["_source"] = "GitHub (Live)"
-                return df
-    except Exception as e:
-        print(f"⚠️ GitHub Raw fetch failed: {e}")
-    
+        store = open_snapshot(BUNDLED_SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Bundled snapshot unusable: {e}")
+        return None
+    store.source = source
+    return store
+
+def _load_local():
+    # Mapped snapshot / columnar store first (no text parsing), then the CSV
+    store = _load_snapshot("Local (Stale Fallback)")
+    if store is not None:
+        return store
+    if os.path.exists(os.path.join(DATA_STORE_DIR, MANIFEST)):
+        return open_store(DATA_STORE_DIR, source="Local (Stale Fallback)")
     if os.path.exists(DATA_PATH):
-        df = pd.read_csv(DATA_PATH)
-        if len(df) > 1000:
-            df = df.tail(1000)
-        df["_source"] = "Local (Stale Fallback)"
-        return df
+        with open(DATA_PATH, "rb") as f:
+            return _parse_csv(f.read(), "Local (Stale Fallback)")
     return None
 
+if DATA_SOURCE == "store":
+    data_cache = ColumnarStoreCache(DATA_STORE_DIR)
+else:
+    initial = _load_snapshot("Bundled Snapshot") if COLD_START_SNAPSHOT else None
+    data_cache = DataCache(_live_url, _parse_csv, fallback=_load_local, ttl=DATA_CACHE_TTL, initial=initial,
+                           retry_s=DATA_RETRY_S)
+if SHARED_DATASET:
+    # The loader revalidates on its own TTL from the broker's polls; no per-worker refresher
+    data_cache = SharedDataset(data_cache, SHARED_DATASET_DIR, ttl=SHARED_DATASET_TTL)
+
+# Bounded raw history + rollup tiers per device, fed from every new dataset
+retention = Retention(RETENTION_RAW_ROWS, RETENTION_TIERS)
+# Latest reading + rolling stats per device, pre-encoded for /summary
+summary = SummaryTable(SUMMARY_WINDOWS, SUMMARY_SILENT_S)
+# Streaming per-device statistics (EWMA z-scores, trends, stuck sensors, heap leaks)
+insights = Insights(INSIGHTS_SPAN_S, INSIGHTS_TREND_S, INSIGHTS_Z, INSIGHTS_STUCK_S, INSIGHTS_LEAK_PER_H)
+# Dataset each derived view was last fed: the broker pushes new datasets while a lifespan runs,
+# requests pull them otherwise (serverless), and no view is fed the same store twice
+_fed = {}
+_fed_lock = threading.Lock()
+
+def _feed(view, store):
+    if store is None:
+        return
+    with _fed_lock:
+        if _fed.get(view) is not store:
+            view.update(store)
+            _fed[view] = store
+
+def _fresh(view):
+    """`view` brought up to date with the current dataset."""
+    _feed(view, get_store())
+    return view
+
+# Pushes rows from each new dataset to /stream subscribers; runs only under the lifespan, so /stream
+# answers 503 (and "/" reports live_updates: false) on serverless deployments
+broker = StreamBroker(lambda: data_cache.get(),
+                      listeners=[partial(_feed, view) for view in (summary, retention, insights)])
+# Chunked CSV/NDJSON/Parquet downloads with Range support
+exporter = Exporter(EXPORT_CHUNK_ROWS)
+# Buffers POST /ingest readings and writes them to the columnar store in batches
+ingestor = Ingestor(DATA_STORE_DIR, flush_rows=INGEST_FLUSH_ROWS, flush_s=INGEST_FLUSH_S) if INGEST_TOKEN else None
+if ingestor is not None and DATA_SOURCE != "store":
+    print(f"⚠️ /ingest writes to {DATA_STORE_DIR}, which DATA_SOURCE={DATA_SOURCE} does not serve; "
+          "set DATA_SOURCE=store to serve ingested readings")
+
+@asynccontextmanager
+async def lifespan(app):
+    refresher, deferred = None, False
+    if BACKGROUND_REFRESH and isinstance(data_cache, DataCache):
+        # Imported here: httpx is only needed once a lifespan runs (not per serverless request)
+        from refresher import BackgroundRefresher
+
+        refresher = BackgroundRefresher(data_cache, interval=DATA_CACHE_TTL)
+        # Serving the bundled snapshot: revalidate once the listeners are fed so the fetch and
+        # CSV parse don't compete with startup (background=True keeps requests from fetching)
+        deferred = data_cache.value is not None
+        if deferred:
+            data_cache.background = True
+        else:
+            await refresher.start()
+    if RETENTION_FILE:
+        retention.load(RETENTION_FILE)
+    await broker.start()
+    if deferred:
+        await refresher.start()
+    if ingestor is not None:
+        await ingestor.start()
+    yield
+    if ingestor is not None:
+        await ingestor.stop()
+    await broker.stop()
+    if RETENTION_FILE:
+        retention.save(RETENTION_FILE)
+    if refresher is not None:
+        await refresher.stop()
+
+app = FastAPI(root_path="/api", lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, profile=API_DEBUG, profile_interval=PROFILE_INTERVAL_S)
+
+# Point-in-time gauges read from the existing stats when /metrics is scraped
+REGISTRY.gauge("api_dataset_rows", "Rows in the dataset being served.",
+               lambda: data_cache.value.rows if data_cache.value is not None else None)
+REGISTRY.gauge("api_dataset_devices", "Devices in the dataset being served.",
+               lambda: len(data_cache.value.device_list) if data_cache.value is not None else None)
+REGISTRY.gauge("api_stream_subscribers", "Connected /stream clients.", lambda: len(broker.subscribers))
+REGISTRY.gauge("api_ingest_pending", "Ingested readings waiting for the next flush.",
+               lambda: len(ingestor.buffer) if ingestor is not None else None)
+
+def get_store():
+    """Return the cached DataStore (GitHub Raw if possible, otherwise local file)."""
+    return data_cache.get()
+
 @app.get("/")
 def root():
-    df = get_df()
-    source = df["_source"].iloc[0] if df is not None and "_source" in df.columns else "Unknown"
-    return {"status": "API Online", "source": source, "repo": GITHUB_REPO}
+    store = get_store()
+    source = store.source if store is not None else "Unknown"
+    # The dashboard opens /stream only when this is true
+    return {"status": "API Online", "source": source, "repo": GITHUB_REPO, "live_updates": broker.running}
 
 
 @app.get("/data/csv")
-def get_csv():
-    # Still returns the deploy-time CSV for download
-    return FileResponse(DATA_PATH, media_type="text/csv")
+def get_csv(request: Request):
+    # CSV is a streamed export of the current dataset; the deploy-time file only if nothing is loaded
+    store = get_store()
+    if store is None:
+        return FileResponse(DATA_PATH, media_type="text/csv")
+    record_rows(store.rows)
+    return exporter.response(store, store.time_order, export_columns(store), "csv", "live_data",
+                             request.headers.get("range"), request.headers.get("if-range"))
 
 @app.get("/devices")
 def get_devices():
-    df = get_df()
-    if df is None:
+    store = get_store()
+    if store is None:
         return {"devices": []}
-    try:
-        device_col = next((c for c in df.columns if "device" in c.lower()), None)
-        if device_col:
-            return {"devices": sorted([str(d).strip() for d in df[device_col].dropna().unique()])}
-    except Exception:
-        pass
-    return {"devices": []}
+    return {"devices": store.device_list}
 
 @app.get("/debug")
 def debug_info():
-    df = get_df()
-    source = df["_source"].iloc[0] if df is not None and "_source" in df.columns else "None (Fetch Failed)"
+    store = get_store()
+    source = store.source if store is not None else "None (Fetch Failed)"
     return {
         "status": "API Online",
         "data_source": source,
         "repo": GITHUB_REPO,
-        "rows": len(df) if df is not None else 0,
-        "columns": list(df.columns) if df is not None else []
+        "rows": store.rows if store is not None else 0,
+        "columns": store.columns if store is not None else [],
+        "cache": data_cache.stats(),
+        "stream": broker.stats(),
+        "retention": retention.stats(),
+        "summary": summary.stats(),
+        "insights": insights.stats(),
+        "export": exporter.stats(),
+        "ingest": ingestor.stats() if ingestor is not None else None
     }
 
 
+def _time_bounds(days, start, end):
+    """(start_ns, end_ns) from the days/start/end query params."""
+    # `days` and `start` both bound the start, the later one wins
+    start_ns = cutoff_ns(start) if start is not None else None
+    if days is not None:
+        days_ns = cutoff_ns(datetime.now() - timedelta(days=days))
+        start_ns = days_ns if start_ns is None else max(start_ns, days_ns)
+    end_ns = cutoff_ns(end) if end is not None else None
+    return start_ns, end_ns
+
 @app.get("/data/json")
-def get_json(device_id: str = Query(None), days: int = Query(None)):
-    df = get_df()
-    if df is None:
-        return JSONResponse([])
-    
-    # Filter by Device (Extreme Robust)
-    if device_id:
-        device_col = next((c for c in df.columns if "device" in c.lower()), None)
-        if device_col:
-            target = str(device_id).lower().replace("_", "-").strip()
-            df = df[df[device_col].astype(str).str.lower().str.replace("_", "-").str.strip() == target]
-
-    # Filter by Date
-    if days is not None and "Timestamp" in df.columns:
+def get_json(
+    request: Request,
+    device_id: str = Query(None),
+    days: int = Query(None),
+    start: datetime = Query(None, description="ISO timestamp, inclusive"),
+    end: datetime = Query(None, description="ISO timestamp, inclusive"),
+    limit: int = Query(None, ge=1),
+    offset: int = Query(0, ge=0),
+    format: str = Query("records", pattern="^(records|columnar)$"),
+):
+    store = get_store()
+    if store is None:
+        return JSONResponse({} if format == "columnar" else [])
+
+    start_ns, end_ns = _time_bounds(days, start, end)
+
+    # Device + time range is a binary search on the per-device slice
+    with stage("filter"):
+        index = store.query(device_id or None, start_ns, end_ns)
+        total = index_len(index)
+        index = page(index, offset, limit)
+    record_rows(index_len(index))
+
+    # columnar = {column: [values...]}, no per-row dicts or repeated keys
+    with stage("serialize"):
+        body = columnar_json(store, index) if format == "columnar" else records_json(store, index)
+    headers = {"X-Total-Count": str(total), "X-Data-Source": store.source}
+    with stage("compress"):
+        return encoded_response(body, request.headers.get("accept-encoding", ""), headers)
+
+@app.get("/data/export")
+def export_data(
+    request: Request,
+    device_id: str = Query(None),
+    days: int = Query(None),
+    start: datetime = Query(None, description="ISO timestamp, inclusive"),
+    end: datetime = Query(None, description="ISO timestamp, inclusive"),
+    columns: str = Query(None, description="Comma-separated columns (default: all)"),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+):
+    """Filtered download streamed in chunks; supports Range / If-Range to resume."""
+    store = get_store()
+    if store is None:
+        raise HTTPException(503, "No dataset loaded yet")
+    try:
+        selected = export_columns(store, [c.strip() for c in columns.split(",") if c.strip()] if columns else None)
+    except ExportError as e:
+        raise HTTPException(e.status, str(e))
+
+    start_ns, end_ns = _time_bounds(days, start, end)
+    with stage("filter"):
+        index = store.query(device_id or None, start_ns, end_ns)
+    rows = index_len(index)
+    record_rows(rows)
+    headers = {"X-Total-Count": str(rows), "X-Data-Source": store.source}
+    try:
+        return exporter.response(store, index, selected, format, "export", request.headers.get("range"),
+                                 request.headers.get("if-range"), headers)
+    except ExportError as e:
+        raise HTTPException(e.status, str(e))
+
+@app.get("/data/aggregate")
+def get_aggregate(
+    device_id: str = Query(None),
+    mode: str = Query("bucket", pattern="^(bucket|lttb)$"),
+    resolution: str = Query("1h", description="Bucket width, e.g. 5min, 1h, 1d"),
+    points: int = Query(500, ge=3, le=10000, description="Max points per series (lttb)"),
+    columns: str = Query(None, description="Comma-separated sensor columns (default: all)"),
+    days: int = Query(None),
+    start: datetime = Query(None),
+    end: datetime = Query(None),
+):
+    """Downsampled chart series: per-bucket min/mean/max/last, or LTTB points."""
+    store = get_store()
+    if store is None:
+        return {"mode": mode, "devices": {}}
+
+    if columns:
+        selected = [c.strip() for c in columns.split(",") if c.strip()]
+        unknown = [c for c in selected if c not in store.sensor_columns]
+        if unknown:
+            raise HTTPException(400, f"Unknown sensor columns {unknown}; available: {store.sensor_columns}")
+    else:
+        selected = store.sensor_columns
+
+    device_ids = [device_id] if device_id else store.device_list
+    start_ns, end_ns = _time_bounds(days, start, end)
+
+    if mode == "lttb":
+        with stage("aggregate"):
+            devices = lttb_downsample(store, device_ids, selected, points, start_ns, end_ns)
+        out = {"mode": mode, "points": points, "source": store.source, "devices": devices}
+    else:
         try:
-            df["dt"] = pd.to_datetime(df["Timestamp"], dayfirst=True, errors='coerce')
-            cutoff_date = datetime.now() - timedelta(days=days)
-            df = df[df["dt"] >= cutoff_date].copy()
-            df = df.drop(columns=["dt"])
-        except Exception:
-            pass
-            
-    return JSONResponse(df.to_dict(orient="records"))
+            width_ns = parse_resolution(resolution)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        with stage("aggregate"):
+            devices = bucket_aggregate(store, device_ids, selected, width_ns, start_ns, end_ns)
+        out = {"mode": mode, "resolution": resolution, "source": store.source, "devices": devices}
+    with stage("serialize"):
+        body = dumps(out)
+    return Response(body, media_type="application/json")
+
+@app.get("/summary")
+def get_summary(device_id: str = Query(None, description="Comma-separated device ids (default: all)")):
+    """Latest reading, 1h/24h stats and seconds since the last reading, per device."""
+    devices = [d.strip() for d in device_id.split(",") if d.strip()] if device_id else None
+    with stage("serialize"):
+        body = _fresh(summary).body(cutoff_ns(datetime.now()), devices)
+    return Response(body, media_type="application/json")
+
+@app.get("/insights")
+def get_insights(device_id: str = Query(None, description="Comma-separated device ids (default: all)")):
+    """Anomalies, trends, stuck sensors and heap leaks per device, plus a one-line summary."""
+    devices = [d.strip() for d in device_id.split(",") if d.strip()] if device_id else None
+    with stage("serialize"):
+        body = _fresh(insights).body(devices)
+    return Response(body, media_type="application/json")
+
+@app.get("/data/recent")
+def get_recent(
+    device_id: str = Query(..., description="Device id"),
+    limit: int = Query(None, ge=1, description="Newest N readings (default: all retained)"),
+):
+    """Newest raw readings of one device from its in-memory ring buffer."""
+    recent = _fresh(retention).recent(device_id, limit)
+    if recent is None:
+        raise HTTPException(404, f"No retained readings for device '{device_id}'")
+    return Response(dumps(recent), media_type="application/json")
+
+@app.get("/data/rollup")
+def get_rollup(
+    device_id: str = Query(None),
+    tier: str = Query(None, description="Rollup tier, e.g. 1min or 1h (default: finest)"),
+    days: int = Query(None),
+    start: datetime = Query(None),
+    end: datetime = Query(None),
+):
+    """Pre-aggregated min/mean/max/last buckets, maintained incrementally per device."""
+    tiers = retention.tier_names
+    tier = tier or (tiers[0] if tiers else None)
+    if tier not in tiers:
+        raise HTTPException(400, f"Unknown tier '{tier}'; available: {tiers}")
+    _fresh(retention)
+    device_ids = [device_id] if device_id else [d.name for d in retention.devices.values()]
+    start_ns, end_ns = _time_bounds(days, start, end)
+    devices = retention.rollup(device_ids, tier, start_ns, end_ns)
+    return Response(dumps({"tier": tier, "devices": devices}), media_type="application/json")
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition: request/stage latency, rows and bytes per route."""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/data/columns")
 def get_columns():
-    df = get_df()
-    if df is None:
+    store = get_store()
+    if store is None:
         return {"columns": []}
-    return {"columns": list(df.columns)}
+    return {"columns": store.columns}
+
+@app.get("/stream")
+async def stream(
+    request: Request,
+    device_id: str = Query(None, description="Comma-separated device ids (default: all)"),
+    since: int = Query(None, description="Resume token (sync event id); Last-Event-ID takes precedence"),
+):
+    """Server-Sent Events: `readings` with newly ingested rows, then a `sync` resume token."""
+    if not broker.running:
+        # Without a lifespan nothing is published: don't hold a (serverless) invocation open for pings
+        raise HTTPException(503, "Live updates are not available on this deployment; poll /data/json instead")
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(400, "Last-Event-ID must be a resume token from a sync event")
+    devices = [d.strip() for d in device_id.split(",") if d.strip()] if device_id else None
+
+    # Subscribe and take the matching dataset in one step so replay and live frames don't overlap
+    sub, store = broker.subscribe(devices)
+    replay = broker.replay(store, sub, since)
+    return StreamingResponse(
+        broker.events(sub, replay),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def ingest(request: Request):
+    """Accept one reading or a list (live_data.csv column names or short keys)."""
+    if not hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {INGEST_TOKEN}"):
+        raise HTTPException(401, "Invalid or missing ingest token")
+    try:
+        payload = orjson.loads(await request.body()) if orjson is not None else await request.json()
+    except ValueError:
+        raise HTTPException(400, "Body must be JSON")
+    try:
+        accepted = ingestor.add(payload)
+    except IngestError as e:
+        return JSONResponse({"error": str(e), "details": e.errors}, status_code=422)
+    except BufferFull as e:
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": str(int(INGEST_FLUSH_S) + 1)})
+    return Response(dumps({"accepted": accepted, "pending": len(ingestor.buffer)}), status_code=202,
+                    media_type="application/json")
+
+
+# Only exists when INGEST_TOKEN is set (404 otherwise)
+if ingestor is not None:
+    app.post("/ingest", status_code=202)(ingest)
@@ -0,0 +1,353 @@
+"""Request metrics, Server-Timing and an on-demand sampling profiler.
+
+ - `stage(name)` times one step of a request (fetch, parse, filter,
+   serialize, ...) into the `api_stage_seconds` histogram and, when called
+   under a request, into that request's Server-Timing header. Outside a
+   request (background refreshes) it is recorded with route="background".
+ - `MetricsMiddleware` (plain ASGI, so streaming responses pass through
+   untouched) times every request, counts rows/bytes and adds Server-Timing.
+ - `render()` is the Prometheus text exposition for /metrics.
+ - `?profile=1` (only when the middleware is built with profile=True)
+   samples the stacks of busy threads while the request runs and returns
+   them in collapsed "frame;frame;frame count" form, ready for
+   flamegraph.pl, speedscope or inferno.
+
+With METRICS disabled `stage()` returns a shared no-op context manager and
+the middleware is not installed, so the cost is one flag check per stage.
+"""
+
+import collections
+import contextvars
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.getenv("METRICS", "1") == "1"
+
+# Seconds; sub-millisecond stages up to multi-second cold loads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000)
+BYTE_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+PROFILE_INTERVAL_S = 0.001
+# Leaf frames of threads that are parked, not working (worker pools, the event loop's select)
+IDLE_FRAMES = {"wait", "select", "poll", "epoll", "accept", "_wait_for_tstate_lock", "sleep", "_worker"}
+
+
+# ========================
+# REGISTRY
+# ========================
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            series = dict(self.series)
+        for labels, value in sorted(series.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set (Prometheus cumulative `le` buckets)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self.series = {}        # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self.series.get(labels)
+            if s is None:
+                s = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][i] += 1
+            s[1] += value
+
+    def lines(self):
+        with self._lock:
+            series = {k: (list(v[0]), v[1]) for k, v in self.series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            running = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                running += count
+                le = 'le="%s"' % (bound if bound == "+Inf" else _number(float(bound)))
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(float(total))}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {running}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []        # (name, help, fn -> number or {label value: number}, label name)
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, fn, labelname=None):
+        """Gauge read from `fn()` at scrape time (existing stats, nothing to keep in sync)."""
+        self.gauges.append((name, help, fn, labelname))
+
+    def render(self):
+        out = []
+        for m in self.metrics:
+            out += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}"]
+            out.extend(m.lines())
+        for name, help, fn, labelname in self.gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            out += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            if isinstance(value, dict):
+                for label, v in sorted(value.items()):
+                    if v is not None:
+                        out.append(f"{name}{_labels((labelname,), (label,))} {_number(v)}")
+            else:
+                out.append(f"{name} {_number(value)}")
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.add(Histogram(
+    "api_request_seconds", "Request time until the response is complete.", LATENCY_BUCKETS,
+    ("route", "method", "status")))
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    "api_stage_seconds", "Time spent per request stage.", LATENCY_BUCKETS, ("route", "stage")))
+RESPONSE_BYTES = REGISTRY.add(Histogram(
+    "api_response_bytes", "Response body size (after compression).", BYTE_BUCKETS, ("route",)))
+RESPONSE_ROWS = REGISTRY.add(Histogram(
+    "api_response_rows", "Rows selected per response.", ROW_BUCKETS, ("route",)))
+PROFILES = REGISTRY.add(Counter("api_profiles_total", "Requests answered with a stack profile.", ("route",)))
+
+
+def render():
+    return REGISTRY.render()
+
+
+# ========================
+# PER-REQUEST TIMINGS
+# ========================
+class Timings:
+    """Stages of one request; shared by reference with the handler's worker thread."""
+
+    __slots__ = ("scope", "stages", "rows")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.stages = []        # (name, seconds) in completion order
+        self.rows = None
+
+    @property
+    def route(self):
+        # Set by the router before the endpoint runs; unmatched paths share one label
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    def server_timing(self, total):
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages]
+        parts.append(f"app;dur={total * 1000:.2f}")
+        return ", ".join(parts).encode("latin-1")
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        timings = _current.get()
+        if timings is None:
+            STAGE_SECONDS.observe(elapsed, "background", self.name)
+        else:
+            timings.stages.append((self.name, elapsed))
+            STAGE_SECONDS.observe(elapsed, timings.route, self.name)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """Context manager timing one stage of the current request (or of background work)."""
+    return _Stage(name) if ENABLED else _NO_STAGE
+
+
+def record_rows(n):
+    """Rows the current request selected; observed once the response is sent."""
+    timings = _current.get()
+    if timings is not None:
+        timings.rows = int(n)
+
+
+# ========================
+# SAMPLING PROFILER
+# ========================
+class StackSampler:
+    """Samples every busy thread's Python stack until stopped; output is collapsed stacks."""
+
+    def __init__(self, interval=PROFILE_INTERVAL_S):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.is_set():
+            for tid, frame in sys._current_frames().items():
+                if tid == own or frame.f_code.co_name in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(tid) or f"thread-{tid}")
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+# ========================
+# MIDDLEWARE
+# ========================
+class MetricsMiddleware:
+    """ASGI middleware: request/stage histograms, Server-Timing and `?profile=1`."""
+
+    def __init__(self, app, profile=False, profile_interval=PROFILE_INTERVAL_S):
+        self.app = app
+        self.profile = profile
+        self.profile_interval = profile_interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = Timings(scope)
+        token = _current.set(timings)
+        if self.profile and b"profile=1" in scope.get("query_string", b"").split(b"&"):
+            try:
+                return await self._profiled(scope, receive, send, timings)
+            finally:
+                _current.reset(token)
+
+        start = time.perf_counter()
+        state = {"status": 500, "bytes": 0}
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter() - start)))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            _current.reset(token)
+            route = timings.route
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route, scope["method"], str(state["status"]))
+            RESPONSE_BYTES.observe(state["bytes"], route)
+            if timings.rows is not None:
+                RESPONSE_ROWS.observe(timings.rows, route)
+
+    async def _profiled(self, scope, receive, send, timings):
+        """Run the request with the sampler on and answer with its collapsed stacks instead."""
+        status = {"code": 500}
+
+        async def discard(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        start = time.perf_counter()
+        sampler = StackSampler(self.profile_interval).start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            sampler.stop()
+        total = time.perf_counter() - start
+        PROFILES.inc(timings.route)
+        body = sampler.collapsed().encode()
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"server-timing", timings.server_timing(total)),
+            (b"x-profile-samples", str(sampler.samples).encode()),
+            (b"x-profile-status", str(status["code"]).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
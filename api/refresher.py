@@ -0,0 +1,108 @@
+"""Async background refresher for DataCache.
+
+Started from the FastAPI lifespan: a single task revalidates the cached
+dataset every `interval` seconds over one pooled keep-alive connection
+(httpx.AsyncClient), parses new bodies in a worker thread, and swaps them in.
+Route handlers then only read memory (DataCache.background = True) and never
+block on GitHub. Each revalidation holds DataCache's refresh lock, so it never
+overlaps a fetch started by a request (a tick that finds one running is skipped).
+
+Without httpx installed the blocking urllib refresh is run in a thread instead.
+"""
+
+import asyncio
+import time
+
+from metrics import stage
+
+try:
+    import httpx
+except ImportError:  # optional; falls back to DataCache's urllib path
+    httpx = None
+
+
+class BackgroundRefresher:
+    def __init__(self, cache, interval=60.0, timeout=5.0):
+        self.cache = cache
+        self.interval = interval
+        self.timeout = timeout
+        self.client = None
+        self._task = None
+
+    async def start(self):
+        """Load once (so the first request is served from memory), then loop.
+
+        A cache already holding a bundled snapshot is served as is: the
+        client is set up and the first revalidation runs from the loop, so
+        neither delays startup.
+        """
+        delay = 0.0
+        if self.cache.value is None:
+            self.client = self._connect()
+            await self.refresh()
+            delay = self.interval
+        self.cache.background = True
+        self._task = asyncio.create_task(self._run(delay))
+
+    def _connect(self):
+        # Creating the client loads the CA bundle (~100 ms)
+        if httpx is None:
+            return None
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=2, max_keepalive_connections=1),
+        )
+
+    async def stop(self):
+        self.cache.background = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def _run(self, delay):
+        if self.client is None:
+            self.client = await asyncio.to_thread(self._connect)
+        while True:
+            await asyncio.sleep(delay)
+            await self.refresh()
+            delay = self.interval
+
+    async def refresh(self):
+        """One revalidation; skipped if a request is already fetching (single flight)."""
+        cache = self.cache
+        if not cache._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if self.client is None:
+                await asyncio.to_thread(cache._refresh)
+            else:
+                await self._revalidate(cache)
+        finally:
+            cache._refresh_lock.release()
+        return True
+
+    async def _revalidate(self, cache):
+        start = time.perf_counter()
+        try:
+            with stage("fetch"):
+                response = await self.client.get(cache.url_fn(), headers=cache.request_headers())
+            if response.status_code == 304:
+                cache.not_modified_response()
+            else:
+                response.raise_for_status()
+                # Parsing is CPU-bound: keep it off the event loop
+                await asyncio.to_thread(
+                    cache.apply_response,
+                    response.content,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+        except Exception as e:
+            await asyncio.to_thread(cache.record_error, e)
+        finally:
+            cache.record_refresh((time.perf_counter() - start) * 1000)
@@ -0,0 +1,325 @@
+"""Bounded per-device retention: a raw ring buffer plus rollup tiers.
+
+Every device gets the same fixed allocation, so memory grows linearly with
+the fleet and never with a device's reporting rate:
+
+  - raw:   the newest `raw_rows` readings (ts + one float32 per sensor column)
+  - tiers: e.g. 1-minute buckets for 7 days and 1-hour buckets for a year,
+           each a direct-mapped ring (slot = bucket % slots) holding
+           row count and per-column count/sum/min/max/last
+
+Tiers are updated incrementally from new rows only: a reading lands in its
+bucket's slot, resetting the slot when it still holds a bucket that has
+aged out. Readings older than a tier's window are ignored by that tier.
+All arrays are allocated when a device is first seen, so memory per device
+is fixed up front (`Retention.bytes_per_device()`, ~2.5 MB with the default
+tiers and five sensor columns).
+
+The dataset is fed in with `update(store)` after each swap; rows newer than
+a device's last fed timestamp are appended (late rows are not back-filled,
+as for /stream).
+"""
+
+import json
+import os
+
+import numpy as np
+
+from aggregate import _json_floats, parse_resolution
+from store import NAT, format_ts, normalize_device
+
+RAW_ROWS = 2_000
+TIERS = "1min:7d,1h:365d"
+
+
+def parse_tiers(text):
+    """'1min:7d,1h:365d' -> [(name, width_ns, retention_ns)] (ValueError if invalid)."""
+    tiers = []
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        name, _, keep = part.partition(":")
+        width, retention = parse_resolution(name), parse_resolution(keep or name)
+        if retention < width:
+            raise ValueError(f"Tier '{part}' keeps less than one bucket")
+        tiers.append((name.strip(), width, retention))
+    return sorted(tiers, key=lambda t: t[1])
+
+
+class RawRing:
+    """Newest `capacity` readings of one device, oldest overwritten first."""
+
+    def __init__(self, capacity, ncols):
+        self.capacity = capacity
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros((ncols, capacity), dtype=np.float32)
+        self.count = 0          # total rows ever appended
+
+    def extend(self, ts, values):
+        if len(ts) > self.capacity:
+            self.count += len(ts) - self.capacity
+            ts, values = ts[-self.capacity:], values[:, -self.capacity:]
+        pos = (self.count + np.arange(len(ts))) % self.capacity
+        self.ts[pos] = ts
+        self.values[:, pos] = values
+        self.count += len(ts)
+
+    def view(self, limit=None):
+        """(ts, values) of the newest `limit` rows, oldest first."""
+        n = min(self.count, self.capacity)
+        if limit is not None:
+            n = min(n, limit)
+        pos = (self.count - n + np.arange(n)) % self.capacity
+        return self.ts[pos], self.values[:, pos]
+
+
+class RollupTier:
+    """Fixed-width buckets of one device, kept for `retention_ns`."""
+
+    def __init__(self, width_ns, retention_ns, ncols):
+        self.width = width_ns
+        self.slots = max(1, retention_ns // width_ns)
+        self.bucket = np.zeros(self.slots, dtype=np.int64)     # bucket index + 1, 0 = empty
+        self.rows = np.zeros(self.slots, dtype=np.int32)
+        self.count = np.zeros((ncols, self.slots), dtype=np.int32)
+        self.sum = np.zeros((ncols, self.slots), dtype=np.float64)
+        self.min = np.zeros((ncols, self.slots), dtype=np.float32)
+        self.max = np.zeros((ncols, self.slots), dtype=np.float32)
+        self.last = np.zeros((ncols, self.slots), dtype=np.float32)
+        self.head = None        # newest bucket index seen
+
+    def add(self, ts, values):
+        """Fold time-sorted rows into their buckets."""
+        b = ts // self.width
+        head = int(b[-1]) if self.head is None else max(self.head, int(b[-1]))
+        # Only buckets still inside the window; keeps slots distinct within a batch
+        first = int(np.searchsorted(b, head - self.slots + 1, "left"))
+        if first >= len(b):
+            return
+        b, values = b[first:], values[:, first:]
+        self.head = head
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(b)) + 1))
+        ends = np.concatenate((starts[1:], [len(b)]))
+        ids = b[starts]
+        slot = ids % self.slots
+        stored = self.bucket[slot]
+        # A slot holding a newer bucket than ours means ours has already aged out
+        keep = stored <= ids + 1
+        dropped = not keep.all()
+        if dropped:
+            starts, ends, ids, slot, stored = starts[keep], ends[keep], ids[keep], slot[keep], stored[keep]
+            if not len(ids):
+                return
+        reset = slot[stored != ids + 1]
+        self.bucket[reset] = ids[stored != ids + 1] + 1
+        self.rows[reset] = 0
+        self.count[:, reset] = 0
+        self.sum[:, reset] = 0.0
+        self.min[:, reset] = np.inf
+        self.max[:, reset] = -np.inf
+        self.last[:, reset] = np.nan
+
+        if dropped:
+            # Rows of dropped buckets sit between kept runs; regroup on the kept rows only
+            rows = np.concatenate([np.arange(a, z) for a, z in zip(starts, ends)])
+            values = values[:, rows]
+            lengths = ends - starts
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            ends = starts + lengths
+        valid = ~np.isnan(values)
+        self.rows[slot] += (ends - starts).astype(np.int32)
+        self.count[:, slot] += np.add.reduceat(valid, starts, axis=1).astype(np.int32)
+        self.sum[:, slot] += np.add.reduceat(np.where(valid, values, 0.0), starts, axis=1)
+        self.min[:, slot] = np.fmin(self.min[:, slot], np.fmin.reduceat(values, starts, axis=1))
+        self.max[:, slot] = np.fmax(self.max[:, slot], np.fmax.reduceat(values, starts, axis=1))
+        # Last non-missing value per bucket: forward-fill within the batch, then keep the old one if none
+        filled = np.where(valid, np.arange(values.shape[1]), -1)
+        filled = np.maximum.accumulate(filled, axis=1)[:, ends - 1]
+        has = filled >= starts
+        newest = np.take_along_axis(values, np.maximum(filled, 0), axis=1)
+        self.last[:, slot] = np.where(has, newest, self.last[:, slot])
+
+    def buckets(self, start_ns=None, end_ns=None):
+        """Slots of live buckets in [start_ns, end_ns], oldest first."""
+        if self.head is None:
+            return np.empty(0, dtype=np.int64)
+        ids = self.bucket - 1
+        live = (self.bucket > 0) & (ids > self.head - self.slots)
+        if start_ns is not None:
+            live &= ids >= start_ns // self.width
+        if end_ns is not None:
+            live &= ids <= end_ns // self.width
+        slots = np.flatnonzero(live)
+        return slots[np.argsort(ids[slots])]
+
+
+class DeviceRetention:
+    def __init__(self, name, raw_rows, tiers, ncols):
+        self.name = name
+        self.raw = RawRing(raw_rows, ncols)
+        self.tiers = {tier: RollupTier(width, keep, ncols) for tier, width, keep in tiers}
+        self.last_ts = NAT
+
+    def add(self, ts, values):
+        self.raw.extend(ts, values)
+        for tier in self.tiers.values():
+            tier.add(ts, values)
+        self.last_ts = int(ts[-1])
+
+
+class Retention:
+    def __init__(self, raw_rows=RAW_ROWS, tiers=TIERS):
+        self.raw_rows = raw_rows
+        self.tier_spec = parse_tiers(tiers) if isinstance(tiers, str) else list(tiers)
+        self.columns = None             # sensor columns, fixed by the first dataset
+        self.devices = {}               # normalized key -> DeviceRetention
+        self.rows_added = 0
+
+    def _device(self, key, name):
+        dev = self.devices.get(key)
+        if dev is None:
+            dev = self.devices[key] = DeviceRetention(name, self.raw_rows, self.tier_spec, len(self.columns))
+        return dev
+
+    def update(self, store):
+        """Append the rows of `store` newer than what each device already has."""
+        if store is None:
+            return 0
+        if self.columns is None:
+            self.columns = list(store.sensor_columns)
+        elif [c for c in self.columns if c not in store.data]:
+            return 0        # different schema (e.g. other source); keep what we have
+        added = 0
+        for key, (lo, hi) in store.device_slices.items():
+            if hi <= lo:
+                continue
+            dev = self.devices.get(key)
+            last = dev.last_ts if dev is not None else NAT
+            first = lo + int(np.searchsorted(store.ts[lo:hi], last, side="right"))
+            if first >= hi:
+                continue
+            values = np.vstack([np.asarray(store.data[c][first:hi], dtype=np.float32) for c in self.columns]) \
+                if self.columns else np.empty((0, hi - first), dtype=np.float32)
+            self._device(key, store.devices[store.device_codes[lo]]).add(store.ts[first:hi], values)
+            added += hi - first
+        self.rows_added += added
+        return added
+
+    # ------------------------
+    # Queries
+    # ------------------------
+    def recent(self, device_id, limit=None):
+        """Newest raw readings of one device: {"time", "series": {col: [...]}} (None if unknown)."""
+        dev = self.devices.get(normalize_device(device_id))
+        if dev is None:
+            return None
+        ts, values = dev.raw.view(limit)
+        return {
+            "device": dev.name,
+            "time": format_ts(ts),
+            "series": {col: _json_floats(values[i]) for i, col in enumerate(self.columns)},
+        }
+
+    def rollup(self, device_ids, tier, start_ns=None, end_ns=None):
+        """Buckets of one tier per device, in /data/aggregate's bucket layout."""
+        result = {}
+        for device_id in device_ids:
+            dev = self.devices.get(normalize_device(device_id))
+            if dev is None:
+                continue
+            t = dev.tiers[tier]
+            slots = t.buckets(start_ns, end_ns)
+            if not len(slots):
+                continue
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(t.count[:, slots] > 0, t.sum[:, slots] / t.count[:, slots], np.nan)
+            series = {}
+            for i, col in enumerate(self.columns):
+                empty = t.count[i, slots] == 0
+                series[col] = {
+                    "min": _json_floats(np.where(empty, np.nan, t.min[i, slots])),
+                    "mean": _json_floats(mean[i]),
+                    "max": _json_floats(np.where(empty, np.nan, t.max[i, slots])),
+                    "last": _json_floats(t.last[i, slots]),
+                }
+            result[dev.name] = {
+                "time": format_ts((t.bucket[slots] - 1) * t.width),
+                "count": t.rows[slots].tolist(),
+                "series": series,
+            }
+        return result
+
+    @property
+    def tier_names(self):
+        return [name for name, _, _ in self.tier_spec]
+
+    def bytes_per_device(self):
+        """Upper bound of the memory one device can use."""
+        ncols = len(self.columns or ())
+        raw = self.raw_rows * (8 + 4 * ncols)
+        tiers = sum(max(1, keep // width) * (8 + 4 + ncols * (4 + 8 + 4 + 4 + 4)) for _, width, keep in self.tier_spec)
+        return raw + tiers
+
+    def stats(self):
+        return {
+            "devices": len(self.devices),
+            "columns": self.columns,
+            "raw_rows": self.raw_rows,
+            "tiers": {name: {"width_s": width / 1e9, "slots": max(1, keep // width)}
+                      for name, width, keep in self.tier_spec},
+            "rows_added": self.rows_added,
+            "bytes_per_device": self.bytes_per_device(),
+            "bytes_max": self.bytes_per_device() * len(self.devices),
+        }
+
+    # ------------------------
+    # Snapshot (tiers outlive the dataset's own retention)
+    # ------------------------
+    def _config(self):
+        return {"raw_rows": self.raw_rows, "tiers": [[n, w, k] for n, w, k in self.tier_spec], "columns": self.columns}
+
+    def save(self, path):
+        """Write occupied rows/buckets only (atomic replace)."""
+        if self.columns is None:
+            return
+        arrays = {}
+        names = []
+        for i, (key, dev) in enumerate(self.devices.items()):
+            names.append([key, dev.name, dev.last_ts])
+            ts, values = dev.raw.view()
+            arrays[f"{i}/raw_ts"], arrays[f"{i}/raw_values"] = ts, values
+            for tier, t in dev.tiers.items():
+                slots = t.buckets()
+                arrays[f"{i}/{tier}/head"] = np.array([NAT if t.head is None else t.head])
+                for field in ("bucket", "rows", "count", "sum", "min", "max", "last"):
+                    arrays[f"{i}/{tier}/{field}"] = getattr(t, field)[..., slots]
+        meta = dict(self._config(), devices=names)
+        arrays["meta"] = np.array(json.dumps(meta))
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restore a snapshot written with the same configuration; False if unusable."""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as snap:
+            meta = json.loads(str(snap["meta"]))
+            if {k: meta[k] for k in ("raw_rows", "tiers")} != {k: v for k, v in self._config().items() if k != "columns"}:
+                return False
+            self.columns = meta["columns"]
+            self.devices = {}
+            for i, (key, name, last_ts) in enumerate(meta["devices"]):
+                dev = self._device(key, name)
+                dev.raw.extend(snap[f"{i}/raw_ts"], snap[f"{i}/raw_values"])
+                for tier, t in dev.tiers.items():
+                    head = int(snap[f"{i}/{tier}/head"][0])
+                    t.head = None if head == NAT else head
+                    slots = (snap[f"{i}/{tier}/bucket"] - 1) % t.slots
+                    for field in ("bucket", "rows", "count", "sum", "min", "max", "last"):
+                        getattr(t, field)[..., slots] = snap[f"{i}/{tier}/{field}"]
+                dev.last_ts = last_ts
+        return True
+
@@ -0,0 +1,94 @@
+"""JSON encoding and content-encoding negotiation for DataStore responses.
+
+orjson (with native NumPy array support) is used when installed; otherwise
+the stdlib json module. Brotli is used only if the `brotli` package is
+available, gzip always.
+"""
+
+import gzip
+import json
+
+import numpy as np
+from fastapi.responses import Response
+
+from store import _to_python
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def dumps(obj):
+    """Serialize to JSON bytes (NumPy arrays allowed when orjson is present)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return _to_python(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def records_json(store, index):
+    """[{column: value, ...}, ...] as bytes."""
+    return dumps(store.records(index))
+
+
+def columnar_json(store, index):
+    """{column: [values...]} as bytes; numeric columns go out as raw arrays."""
+    out = {}
+    for col in store.columns:
+        if col not in store.data:
+            continue
+        arr = store.data[col][index]
+        if arr.dtype.kind in "OU" or orjson is None:
+            out[col] = _to_python(arr)
+        else:
+            out[col] = np.ascontiguousarray(arr)
+    return dumps(out)
+
+
+def csv_bytes(store, index, columns=None, header=True):
+    """Rows at `index` as CSV (same columns as /data/json minus _source, or `columns`)."""
+    import pandas as pd
+
+    frame = {}
+    for col in columns or store.columns:
+        if col not in store.data:
+            continue
+        arr = store.data[col][index]
+        frame[col] = np.round(arr.astype(np.float64), 5) if arr.dtype == np.float32 else arr
+    return pd.DataFrame(frame).to_csv(index=False, header=header).encode("utf-8")
+
+
+def _accepts(accept_encoding, coding):
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+def encoded_response(body, accept_encoding="", headers=None, media_type="application/json"):
+    """Response with br/gzip Content-Encoding when the client accepts it."""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= MIN_COMPRESS_BYTES and accept_encoding:
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif _accepts(accept_encoding, "gzip"):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, headers=headers, media_type=media_type)
@@ -0,0 +1,354 @@
+"""Dataset shared by every API worker process through memory-mapped snapshots.
+
+With several workers (uvicorn --workers N) each process would otherwise
+fetch, parse and hold its own copy of the dataset. Instead, whichever worker
+holds the loader lock runs the normal loader (DataCache / ColumnarStoreCache)
+and publishes each new dataset as one snapshot file:
+
+    /dev/shm/iot-dataset/
+      loader.lock
+      current             {"generation": 12, "file": "gen-000012.snap"}
+      gen-000011.snap     (previous, for workers that still have it mapped)
+      gen-000012.snap
+
+A snapshot holds every array a DataStore needs (ts, device codes, time order,
+sorted ts and each column, text dictionary-encoded as int32 codes) at
+64-byte aligned offsets after a JSON header. Workers map it read-only and
+wrap the arrays without copying, so the dataset is in memory once (tmpfs
+pages are shared) however many workers there are.
+
+Refreshes are atomic: the snapshot is written under a temporary name and
+renamed into place, and only then is `current` replaced. A worker re-reads
+`current` at most every `ttl` seconds and keeps serving the generation it
+has mapped until then. Older files are unlinked by the next publish; their
+mappings stay valid until the last reader drops them. If the loader
+process exits, its lock is released and another worker takes over.
+
+The same file format is bundled with a deployment (data_store/dataset.snap,
+written next to the columnar store by update_sheet_v4.py or
+`python api/shared_dataset.py build`) so a cold serverless instance can map
+the dataset in well under a millisecond instead of fetching and parsing the
+CSV before its first response.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # no cross-process lock: every process loads for itself
+    fcntl = None
+
+from columnar_store import _encode
+from store import DataStore
+
+MAGIC = b"IOTSNAP1"
+ALIGN = 64
+POINTER = "current"
+LOCK_FILE = "loader.lock"
+BUNDLED_SNAPSHOT = "dataset.snap"   # deploy-time snapshot inside the columnar store directory
+DEFAULT_DIR = "/dev/shm/iot-dataset" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(),
+                                                                                    "iot-dataset")
+
+
+def _align(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+class DictColumn:
+    """Dictionary-encoded text column: int32 codes on the mapping, decoded per slice."""
+
+    dtype = np.dtype(object)
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = np.array(list(categories) + [None], dtype=object)    # code -1 -> None
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def __getitem__(self, index):
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+
+# ========================
+# SNAPSHOT FILES
+# ========================
+def write_snapshot(store, path, generation=0):
+    """Write `store` as one snapshot file (temporary name, renamed into place)."""
+    arrays = {
+        "ts": store.ts,
+        "device_codes": store.device_codes,
+        "time_order": store.time_order,
+        "sorted_ts": store.sorted_ts,
+    }
+    encoding = {}
+    for col in store.columns:
+        if col not in store.data:
+            continue
+        values = store.data[col]
+        if col == store.device_col:
+            # Rebuilt from device_codes + devices on open
+            encoding[col] = {"kind": "device"}
+            continue
+        if isinstance(values, DictColumn):
+            arr, meta = values.codes, {"kind": "dict", "categories": values.categories[:-1].tolist()}
+        else:
+            arr, meta = _encode(np.asarray(values))
+        arrays["col:" + col] = arr
+        encoding[col] = meta
+
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        arrays[name] = arr = np.ascontiguousarray(arr)
+        layout[name] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+        offset = _align(offset + arr.nbytes)
+    header = json.dumps({
+        "generation": generation,
+        "source": store.source,
+        "columns": store.columns,
+        "device_col": store.device_col,
+        "devices": list(store.devices),
+        "encoding": encoding,
+        "arrays": layout,
+    }, ensure_ascii=False).encode("utf-8")
+    base = _align(len(MAGIC) + 8 + len(header))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+        for name, arr in arrays.items():
+            f.seek(base + layout[name]["offset"])
+            f.write(arr.reshape(-1).view(np.uint8))
+        f.truncate(base + offset)
+    os.replace(tmp, path)
+    return base + offset
+
+
+def open_snapshot(path):
+    """Map a snapshot read-only and wrap it as a DataStore; no column is copied."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a dataset snapshot")
+    size = int.from_bytes(mm[len(MAGIC):len(MAGIC) + 8], "little")
+    header = json.loads(mm[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+    base = _align(len(MAGIC) + 8 + size)
+
+    def array(name):
+        spec = header["arrays"][name]
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        count = int(np.prod(shape))
+        if count == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.frombuffer(mm, dtype, count, base + spec["offset"]).reshape(shape)
+
+    devices = header["devices"]
+    codes = array("device_codes")
+    data = {}
+    for col, meta in header["encoding"].items():
+        if meta["kind"] == "device":
+            data[col] = DictColumn(codes, devices)
+        elif meta["kind"] == "dict":
+            data[col] = DictColumn(array("col:" + col), meta["categories"])
+        else:
+            data[col] = array("col:" + col)
+    store = DataStore(header["columns"], data, array("ts"), header["device_col"], devices, codes,
+                      header["source"], time_order=array("time_order"), sorted_ts=array("sorted_ts"))
+    store.generation = header["generation"]
+    store.snapshot_bytes = len(mm)
+    return store
+
+
+def read_pointer(root):
+    try:
+        with open(os.path.join(root, POINTER)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def publish(store, root):
+    """Write the next generation and atomically point `current` at it."""
+    os.makedirs(root, exist_ok=True)
+    old = read_pointer(root)
+    generation = (old["generation"] + 1) if old else 1
+    name = f"gen-{generation:06d}.snap"
+    write_snapshot(store, os.path.join(root, name), generation)
+
+    tmp = os.path.join(root, POINTER + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"generation": generation, "file": name}, f)
+    os.replace(tmp, os.path.join(root, POINTER))
+
+    # Keep the previous generation for workers that have not re-attached yet
+    for entry in os.listdir(root):
+        if entry.startswith("gen-") and entry not in (name, old and old.get("file")):
+            try:
+                os.remove(os.path.join(root, entry))
+            except FileNotFoundError:
+                pass
+    return generation
+
+
+# ========================
+# WORKER SIDE
+# ========================
+class SharedDataset:
+    """Serves the published snapshot; the worker holding the loader lock also publishes.
+
+    Same get()/stats() surface as DataCache so main.py can use either.
+    """
+
+    def __init__(self, loader, root=DEFAULT_DIR, ttl=1.0, wait_s=30.0):
+        self.loader = loader        # DataCache / ColumnarStoreCache; only the leader calls it
+        self.root = root
+        self.ttl = ttl
+        self.wait_s = wait_s        # how long a follower's first get() waits for a snapshot
+        os.makedirs(root, exist_ok=True)
+
+        self.value = None
+        self.generation = None
+        self.checked_at = 0.0
+        self.leader = False
+        self._pointer_key = None
+        self._published_from = None
+        self._lock_file = None
+        self._waited = False
+        self._lock = threading.Lock()
+
+        self.attaches = 0
+        self.publishes = 0
+        self.last_attach_ms = None
+        self.last_publish_ms = None
+        self.last_error = None
+
+    def get(self):
+        if self.value is not None and time.monotonic() - self.checked_at < self.ttl:
+            return self.value
+        # While another thread checks (or publishes), keep serving the mapped generation
+        if not self._lock.acquire(blocking=self.value is None):
+            return self.value
+        try:
+            if self.value is not None and time.monotonic() - self.checked_at < self.ttl:
+                return self.value
+            self._check()
+            # First call in a follower: give the loader time to publish instead of serving nothing
+            deadline = time.monotonic() + (0 if self._waited else self.wait_s)
+            while self.value is None and time.monotonic() < deadline:
+                time.sleep(0.1)
+                self._check()
+            self._waited = True
+            self.checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+        return self.value
+
+    def _check(self):
+        if self._lead():
+            self._publish_new()
+        self._attach_current()
+
+    def _lead(self):
+        if self.leader:
+            return True
+        if fcntl is not None:
+            f = open(os.path.join(self.root, LOCK_FILE), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                return False
+            self._lock_file = f     # held (and the lock with it) for the life of the process
+        self.leader = True      # reported by stats() with the pid, like the rest of the worker's state
+        return True
+
+    def _publish_new(self):
+        store = self.loader.get()
+        if store is None or store is self._published_from:
+            return
+        start = time.perf_counter()
+        try:
+            publish(store, self.root)
+        except OSError as e:
+            self.last_error = str(e)
+            print(f"⚠️ Publishing the shared dataset failed: {e}")
+            return
+        self._published_from = store
+        self.publishes += 1
+        self.last_publish_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def _attach_current(self):
+        try:
+            st = os.stat(os.path.join(self.root, POINTER))
+        except FileNotFoundError:
+            return
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == self._pointer_key:
+            return
+        pointer = read_pointer(self.root)
+        if pointer is None:
+            return
+        if pointer["generation"] != self.generation:
+            start = time.perf_counter()
+            try:
+                store = open_snapshot(os.path.join(self.root, pointer["file"]))
+            except FileNotFoundError:
+                return      # superseded while we read the pointer; the next check sees the newer one
+            self.value = store
+            self.generation = pointer["generation"]
+            self.attaches += 1
+            self.last_attach_ms = round((time.perf_counter() - start) * 1000, 3)
+        self._pointer_key = key
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "pid": os.getpid(),
+            "leader": self.leader,
+            "generation": self.generation,
+            "snapshot_mb": round(self.value.snapshot_bytes / 2**20, 2) if self.value is not None else None,
+            "attaches": self.attaches,
+            "publishes": self.publishes,
+            "last_attach_ms": self.last_attach_ms,
+            "last_publish_ms": self.last_publish_ms,
+            "last_error": self.last_error,
+            "loader": self.loader.stats() if self.leader else None,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dataset snapshot tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Write a snapshot of a CSV export (bundled for fast cold starts)")
+    b.add_argument("csv", nargs="?", default="live_data.csv")
+    b.add_argument("out", nargs="?", default=os.path.join("data_store", BUNDLED_SNAPSHOT))
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        import pandas as pd
+        from store import build_store
+
+        store = build_store(pd.read_csv(args.csv), "Bundled Snapshot")
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        size = write_snapshot(store, args.out)
+        print(f"✅ Wrote {store.rows} rows ({size / 2**20:.2f} MB) → {args.out}")
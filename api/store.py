@@ -0,0 +1,255 @@
+"""Typed, pre-normalized in-memory dataset.
+
+Built once per data refresh so request handlers never re-parse timestamps or
+re-normalize device names: rows are sorted by (device, time), every device
+owns one contiguous slice, and sensor columns are stored as compact NumPy
+arrays.
+
+pandas is only imported by build_store(): serving a prebuilt store (mapped
+snapshot, columnar store) needs NumPy alone, which keeps cold starts short.
+"""
+
+import numpy as np
+
+# Sensor columns matched by keyword (lower-case) -> preferred dtype.
+# Integer columns fall back to float32 when they contain missing values.
+SENSOR_DTYPES = {
+    "temperature": np.float32,
+    "humidity": np.float32,
+    "light": np.int32,
+    "aqi value": np.int32,
+    "free heap": np.int32,
+}
+
+NAT = np.iinfo(np.int64).min
+
+# Timestamp layout used in live_data.csv and expected by the frontend
+TS_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+
+def normalize_device(value):
+    """Canonical lookup key for a device id ("Indoor_Farm_01 " -> "indoor-farm-01")."""
+    return str(value).lower().replace("_", "-").strip()
+
+
+def format_ts(ns):
+    """int64 epoch ns array -> list of TS_FORMAT strings (None for NAT)."""
+    # ISO text from NumPy, reordered into TS_FORMAT (dd/mm/YYYY HH:MM:SS)
+    iso = np.datetime_as_string(np.asarray(ns, dtype=np.int64).astype("datetime64[ns]"), unit="s")
+    return [None if s == "NaT" else f"{s[8:10]}/{s[5:7]}/{s[:4]} {s[11:]}" for s in iso.tolist()]
+
+
+def _sensor_dtype(col):
+    name = col.lower().replace("_", " ")
+    for keyword, dtype in SENSOR_DTYPES.items():
+        if keyword in name:
+            return dtype
+    return None
+
+
+def _to_python(arr):
+    """Convert a column slice to JSON-ready Python values (NaN -> None)."""
+    if arr.dtype == np.float32:
+        # float32 -> float64 exposes noise digits (27.8 -> 27.799999237...);
+        # round back to float32 precision.
+        out = np.round(arr.astype(np.float64), 5)
+    else:
+        out = arr
+    values = out.tolist()
+    if out.dtype.kind == "f" and np.isnan(out).any():
+        values = [None if v != v else v for v in values]
+    elif out.dtype == object:
+        values = [None if isinstance(v, float) and v != v else v for v in values]
+    return values
+
+
+def _looks_numeric(series, sample=64):
+    """Cheap pre-check on a few values before converting a whole text column."""
+    import pandas as pd
+
+    head = series.dropna().head(sample)
+    return len(head) > 0 and pd.to_numeric(head, errors="coerce").notna().all()
+
+
+class DataStore:
+    """Column arrays sorted by (device, time) plus lookup tables."""
+
+    def __init__(self, columns, data, ts, device_col, devices, device_codes, source, time_order=None,
+                 sorted_ts=None):
+        self.columns = columns              # output column order (canonical names)
+        self.data = data                    # column name -> np.ndarray
+        self.ts = ts                        # int64 epoch ns, NAT where unparseable
+        self.device_col = device_col
+        self.devices = devices              # display name per device code
+        self.device_codes = device_codes    # int32 code per row
+        self.source = source
+        self.sensor_columns = [c for c in columns if c in data and _sensor_dtype(c) is not None]
+
+        if len({normalize_device(name) for name in devices}) < len(devices):
+            devices, device_codes, ts, data = _merge_spellings(devices, device_codes, ts, data)
+            time_order = sorted_ts = None       # rows were re-sorted
+            self.ts, self.devices, self.device_codes, self.data = ts, devices, device_codes, data
+
+        n = len(ts)
+        self.rows = n
+        # Device codes are sorted, so each device is one contiguous [start, stop)
+        bounds = np.searchsorted(device_codes, np.arange(len(devices) + 1))
+        self.device_slices = {
+            normalize_device(name): (int(bounds[i]), int(bounds[i + 1]))
+            for i, name in enumerate(devices)
+        }
+        self.device_list = sorted(d for d in devices if d and d.lower() != "nan")
+        # Chronological order across all devices (for unfiltered queries); can be passed in
+        # precomputed so a mapped snapshot is wrapped without sorting or copying
+        self.time_order = np.argsort(ts, kind="stable") if time_order is None else time_order
+        self.sorted_ts = ts[self.time_order] if sorted_ts is None else sorted_ts
+
+    def device_slice(self, device_id):
+        """Row range for a device, or None if unknown."""
+        return self.device_slices.get(normalize_device(device_id))
+
+    def query(self, device_id=None, start_ns=None, end_ns=None):
+        """Rows in [start_ns, end_ns] for one device (or all), oldest first.
+
+        Uses binary search on the time-sorted arrays, so the cost is
+        O(log n) plus the size of the result. Returns a slice for a single
+        device and an index array otherwise.
+        """
+        if device_id is not None and self.device_col:
+            bounds = self.device_slice(device_id)
+            if bounds is None:
+                return slice(0, 0)
+            lo, hi = bounds
+            ts = self.ts[lo:hi]
+            a = lo + (int(np.searchsorted(ts, start_ns, "left")) if start_ns is not None else 0)
+            b = lo + (int(np.searchsorted(ts, end_ns, "right")) if end_ns is not None else hi - lo)
+            return slice(a, max(a, b))
+
+        a = int(np.searchsorted(self.sorted_ts, start_ns, "left")) if start_ns is not None else 0
+        b = int(np.searchsorted(self.sorted_ts, end_ns, "right")) if end_ns is not None else self.rows
+        return self.time_order[a:max(a, b)]
+
+    def records(self, index):
+        """Rows at `index` (slice or int array) as a list of dicts."""
+        names = [c for c in self.columns if c in self.data]
+        cols = [_to_python(self.data[c][index]) for c in names]
+        source = self.source
+        out = []
+        for row in zip(*cols):
+            rec = dict(zip(names, row))
+            rec["_source"] = source
+            out.append(rec)
+        return out
+
+
+def _merge_spellings(devices, device_codes, ts, data):
+    """Give spellings of one device ("Farm_01", "farm-01") a single code and re-sort the rows.
+
+    build_store already keys devices by normalize_device(); this covers stores
+    assembled from parts written under different spellings.
+    """
+    keys = [normalize_device(name) for name in devices]
+    first = {}
+    for name, key in zip(devices, keys):
+        first.setdefault(key, name)
+    merged = sorted(first)
+    code = {key: i for i, key in enumerate(merged)}
+    remap = np.array([code[key] for key in keys], dtype=np.int32)
+    codes = remap[device_codes] if len(device_codes) else device_codes
+    order = np.lexsort((ts, codes))
+    data = {col: values[order] for col, values in data.items()}
+    return [first[key] for key in merged], codes[order], ts[order], data
+
+
+def build_store(df, source, ts=None):
+    """Canonicalize, type and sort a raw CSV frame into a DataStore.
+
+    `ts` (int64 epoch ns per row) skips parsing the Timestamp column when the
+    caller already has it.
+    """
+    import pandas as pd
+
+    from timeparse import parse_timestamps
+
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+
+    device_col = next((c for c in df.columns if "device" in c.lower() and "health" not in c.lower()), None)
+
+    # Timestamp -> int64 epoch ns (parsed once here, never per request)
+    if ts is not None:
+        ts = np.asarray(ts, dtype=np.int64)
+    elif "Timestamp" in df.columns:
+        ts = parse_timestamps(df["Timestamp"], key=source)
+    else:
+        ts = np.full(len(df), NAT, dtype=np.int64)
+
+    # Device ids -> categorical codes, keyed by normalize_device() so every spelling of a
+    # device ("Farm_01", "farm-01") shares one code; the first spelling seen is displayed
+    if device_col:
+        names = df[device_col].astype(str).str.strip()
+        keys = names.str.lower().str.replace("_", "-").str.strip()
+        cat = pd.Categorical(keys)
+        device_codes = cat.codes.astype(np.int32)
+        display = names.groupby(device_codes, sort=True).first() if len(names) else names
+        devices = [str(display.get(i, key)) for i, key in enumerate(cat.categories)]
+        df[device_col] = names
+    else:
+        devices = []
+        device_codes = np.zeros(len(df), dtype=np.int32)
+
+    order = np.lexsort((ts, device_codes))
+    ts = ts[order]
+    device_codes = device_codes[order]
+
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        dtype = _sensor_dtype(col)
+        if dtype is not None:
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+            if dtype == np.int32 and np.isnan(values).any():
+                dtype = np.float32
+            arr = values.astype(dtype)
+        else:
+            if not pd.api.types.is_numeric_dtype(series.dtype) and _looks_numeric(series):
+                # Text columns that are entirely numeric (e.g. Year read from the sheet as str)
+                numeric = pd.to_numeric(series, errors="coerce")
+                if numeric.notna().sum() == series.notna().sum():
+                    series = numeric
+            if pd.api.types.is_integer_dtype(series.dtype):
+                arr = series.to_numpy(dtype=np.int64)
+            elif pd.api.types.is_float_dtype(series.dtype):
+                arr = series.to_numpy(dtype=np.float64)
+            else:
+                arr = series.to_numpy(dtype=object)
+        data[col] = arr[order]
+
+    columns = list(df.columns) + ["_source"]
+    return DataStore(columns, data, ts, device_col, devices, device_codes, source)
+
+
+def cutoff_ns(dt):
+    """datetime -> int64 epoch ns comparable with DataStore.ts.
+
+    Stored timestamps are naive wall-clock times, so any timezone on `dt`
+    is dropped rather than converted.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.replace(tzinfo=None)
+    return int(np.datetime64(dt, "ns").view(np.int64))
+
+
+def page(index, offset=0, limit=None):
+    """Apply offset/limit to a slice or index array without copying rows."""
+    stop = None if limit is None else offset + limit
+    if isinstance(index, slice):
+        lo, hi = index.start, index.stop
+        return slice(min(lo + offset, hi), hi if stop is None else min(lo + stop, hi))
+    return index[offset:stop]
+
+
+def index_len(index):
+    if isinstance(index, slice):
+        return index.stop - index.start
+    return len(index)
@@ -0,0 +1,234 @@
+"""Server-Sent Events fan-out of newly ingested readings.
+
+A single watcher task polls the data cache (memory only) and, when a new
+DataStore is swapped in, diffs it against the previous one per device. The
+new rows of each device are serialized once and the same bytes are handed
+to every subscriber of that device, so fan-out cost does not depend on
+payload size.
+
+Every subscriber has a bounded queue. A client that falls behind is dropped
+(it gets a final `dropped` event) instead of buffering without limit; it
+then reconnects with Last-Event-ID and is sent the rows it missed from the
+current store.
+
+Resume tokens are reading timestamps (epoch ns): after the `readings`
+frames of one dataset swap, a `sync` frame carries the newest timestamp of
+that dataset as its id. Reconnecting with it replays the rows newer than it,
+so tokens stay valid across reconnects, restarts and workers. A client
+dropped part-way through a swap resumes from the previous `sync`, and may see
+a few rows twice but loses none. Rows that arrive late, stamped older than a
+token the client already has, are pushed live but not replayed.
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from serialize import dumps, records_json
+from store import NAT, normalize_device
+
+QUEUE_EVENTS = 64           # per-subscriber backlog before it is dropped
+HEARTBEAT_S = 15.0          # comment line to keep idle connections (and proxies) alive
+POLL_S = 1.0                # how often the watcher checks for a new dataset
+RETRY_MS = 3000             # reconnect delay suggested to EventSource clients
+
+
+def sse(data, event=None, id=None):
+    """One SSE frame as bytes (`data` already JSON bytes)."""
+    head = ""
+    if id is not None:
+        head += f"id: {id}\n"
+    if event is not None:
+        head += f"event: {event}\n"
+    return head.encode("utf-8") + b"data: " + data + b"\n\n"
+
+
+def new_rows(old, new, after=None):
+    """{device key: row slice of `new`} of rows newer than `old` (or than token `after`).
+
+    Rows are (device, time) sorted, so per device this is one binary search
+    for the last timestamp the old store (or the client) already had.
+    """
+    out = {}
+    for key, (lo, hi) in new.device_slices.items():
+        if hi <= lo:
+            continue
+        if after is not None:
+            last = after
+        elif old is not None and key in old.device_slices:
+            olo, ohi = old.device_slices[key]
+            last = int(old.ts[ohi - 1]) if ohi > olo else NAT
+        else:
+            last = NAT
+        first = lo + int(np.searchsorted(new.ts[lo:hi], last, side="right"))
+        if first < hi:
+            out[key] = slice(first, hi)
+    return out
+
+
+def watermark(store):
+    """Newest valid timestamp in a dataset (the resume token after it is sent)."""
+    valid = store.sorted_ts[store.sorted_ts != NAT]
+    return int(valid[-1]) if len(valid) else NAT
+
+
+def readings_event(store, rows):
+    """`readings` frame for one device: {"device", "rows": [records]}."""
+    name = store.devices[store.device_codes[rows.start]]
+    body = b'{"device":' + dumps(name) + b',"rows":' + records_json(store, rows) + b"}"
+    return sse(body, "readings")
+
+
+def sync_event(token):
+    return sse(b"{}", "sync", token)
+
+
+class Subscription:
+    def __init__(self, devices, queue_size):
+        self.devices = devices          # set of normalized keys, None = all
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def wants(self, key):
+        return self.devices is None or key in self.devices
+
+
+class StreamBroker:
+    def __init__(self, get_store, queue_size=QUEUE_EVENTS, poll=POLL_S, listeners=()):
+        self.get_store = get_store
+        self.listeners = list(listeners)    # (store) -> None, run in a thread on every new dataset
+        self.queue_size = queue_size
+        self.poll = poll
+        self.store = None               # last dataset published to subscribers
+        self.subscribers = set()
+        self._task = None
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    # ------------------------
+    # Subscribers
+    # ------------------------
+    def subscribe(self, devices=None):
+        """New subscription plus the dataset it is in sync with (for replay)."""
+        keys = {normalize_device(d) for d in devices} if devices else None
+        sub = Subscription(keys, self.queue_size)
+        self.subscribers.add(sub)
+        return sub, self.store
+
+    def unsubscribe(self, sub):
+        self.subscribers.discard(sub)
+
+    def replay(self, store, sub, after):
+        """Frames for rows newer than resume token `after` in `store`."""
+        if store is None:
+            return []
+        if after is None:
+            # Fresh client: nothing to replay, just hand out a token
+            return [sync_event(watermark(store))]
+        rows = new_rows(None, store, after=after)
+        frames = [readings_event(store, r) for key, r in rows.items() if sub.wants(key)]
+        return frames + [sync_event(watermark(store))]
+
+    # ------------------------
+    # Publishing
+    # ------------------------
+    def publish(self, store):
+        """Diff `store` against the last one and fan out the new rows."""
+        old, self.store = self.store, store
+        if old is None or not self.subscribers:
+            return 0
+        frames = {key: readings_event(store, rows) for key, rows in new_rows(old, store).items()}
+        if not frames:
+            return 0
+        self.published += len(frames)
+        sync = sync_event(watermark(store))
+        for sub in list(self.subscribers):
+            wanted = [frame for key, frame in frames.items() if sub.wants(key)]
+            if not wanted:
+                continue
+            try:
+                for frame in wanted:
+                    sub.queue.put_nowait(frame)
+                sub.queue.put_nowait(sync)
+                self.delivered += len(wanted)
+            except asyncio.QueueFull:
+                self._drop(sub)
+        return len(frames)
+
+    def _drop(self, sub):
+        # Free the backlog and leave only the end-of-stream marker
+        sub.dropped = True
+        self.dropped += 1
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
+        self.subscribers.discard(sub)
+
+    @property
+    def running(self):
+        """True while the watcher publishes, i.e. under the app lifespan (never on serverless)."""
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        self.store = await asyncio.to_thread(self.get_store)
+        await self._notify(self.store)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll)
+            try:
+                store = await asyncio.to_thread(self.get_store)
+            except Exception as e:
+                print(f"⚠️ Stream watcher failed to read the dataset: {e}")
+                continue
+            if store is not None and store is not self.store:
+                self.publish(store)
+                await self._notify(store)
+
+    async def _notify(self, store):
+        for listener in self.listeners:
+            try:
+                await asyncio.to_thread(listener, store)
+            except Exception as e:
+                print(f"⚠️ Dataset listener failed: {e}")
+
+    async def events(self, sub, replay=(), heartbeat=HEARTBEAT_S):
+        """Async iterator of SSE bytes for one client; ends when it is dropped."""
+        try:
+            yield f"retry: {RETRY_MS}\n\n".encode("ascii")
+            for frame in replay:
+                yield frame
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if frame is None:
+                    yield sse(dumps({"reason": "slow consumer", "at": time.time()}), "dropped")
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(sub)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
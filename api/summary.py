@@ -0,0 +1,114 @@
+"""Latest-reading table behind /summary.
+
+One entry per device, maintained from each new dataset: the latest row plus
+min/max/mean/count of every sensor column over the hour and day up to that
+reading. Only devices whose rows changed are recomputed (a binary search
+per window on their time-sorted slice), and each entry is kept as
+pre-encoded JSON, so a request only splices in the per-device age
+(time since the last reading, computed at request time) and joins bytes.
+Memory is O(devices), independent of history size.
+"""
+
+import time
+
+import numpy as np
+
+from aggregate import _json_floats, parse_resolution
+from serialize import dumps
+from store import NAT, format_ts, normalize_device
+
+WINDOWS = "1h,24h"
+SILENT_S = 15 * 60          # no reading for this long -> "silent": true
+
+
+def parse_windows(text):
+    """'1h,24h' -> [(name, width_ns)]."""
+    return [(w.strip(), parse_resolution(w)) for w in (text or "").split(",") if w.strip()]
+
+
+class SummaryTable:
+    def __init__(self, windows=WINDOWS, silent_s=SILENT_S):
+        self.windows = parse_windows(windows) if isinstance(windows, str) else list(windows)
+        self.silent_s = silent_s
+        self.entries = {}       # normalized key -> (name, last_ts, rows, encoded entry)
+        self.updated_at = None
+        self.recomputed = 0
+        self.last_update_ms = None
+
+    def update(self, store):
+        """Recompute the entries of devices whose rows changed in `store`."""
+        if store is None:
+            return 0
+        start = time.perf_counter()
+        entries = {}
+        changed = 0
+        for key, (lo, hi) in store.device_slices.items():
+            if hi <= lo:
+                continue
+            name = store.devices[store.device_codes[lo]]
+            if not name or name.lower() == "nan":
+                continue
+            last_ts = int(store.ts[hi - 1])
+            old = self.entries.get(key)
+            if old is not None and old[1] == last_ts and old[2] == hi - lo:
+                entries[key] = old
+                continue
+            entries[key] = self._entry(store, lo, hi)
+            changed += 1
+        # Swap the whole table at once so readers never see a half-updated one
+        self.entries = dict(sorted(entries.items(), key=lambda kv: kv[1][0]))
+        self.updated_at = time.time()
+        self.recomputed += changed
+        self.last_update_ms = round((time.perf_counter() - start) * 1000, 3)
+        return changed
+
+    def _entry(self, store, lo, hi):
+        name = store.devices[store.device_codes[lo]]
+        last_ts = int(store.ts[hi - 1])
+        ts = store.ts[lo:hi]
+        stats = {}
+        for window, width in self.windows:
+            a = lo + int(np.searchsorted(ts, last_ts - width, "right")) if last_ts != NAT else hi
+            block = {}
+            for col in store.sensor_columns:
+                v = store.data[col][a:hi].astype(np.float64)
+                v = v[~np.isnan(v)]
+                if len(v):
+                    lo_v, mean, hi_v = _json_floats(np.array([v.min(), v.mean(), v.max()]))
+                else:
+                    lo_v = mean = hi_v = None
+                block[col] = {"min": lo_v, "max": hi_v, "mean": mean, "count": len(v)}
+            stats[window] = block
+        latest = store.records(slice(hi - 1, hi))[0]
+        entry = {
+            "device": name,
+            "last_reading": format_ts([last_ts])[0] if last_ts != NAT else None,
+            "latest": latest,
+            "stats": stats,
+        }
+        return name, last_ts, hi - lo, dumps(entry)
+
+    def body(self, now_ns, devices=None):
+        """JSON bytes of the table with each device's age and silent flag spliced in."""
+        entries = self.entries
+        if devices is not None:
+            keys = [normalize_device(d) for d in devices]
+            entries = {k: entries[k] for k in keys if k in entries}
+        parts = []
+        for name, last_ts, _, encoded in entries.values():
+            if last_ts == NAT:
+                head = b'{"age_s":null,"silent":true,'
+            else:
+                age = (now_ns - last_ts) / 1e9
+                head = b'{"age_s":%.1f,"silent":%s,' % (age, b"true" if age > self.silent_s else b"false")
+            parts.append(head + encoded[1:])
+        return b'{"silent_after_s":%d,"devices":[' % self.silent_s + b",".join(parts) + b"]}"
+
+    def stats(self):
+        return {
+            "devices": len(self.entries),
+            "windows": [name for name, _ in self.windows],
+            "updated_at": self.updated_at,
+            "recomputed": self.recomputed,
+            "last_update_ms": self.last_update_ms,
+        }
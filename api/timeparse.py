@@ -0,0 +1,198 @@
+"""Single-pass timestamp parsing with a per-source format cache.
+
+`pd.to_datetime(dayfirst=True)` infers the layout on every call, and callers
+used to retry with dayfirst=False when most rows failed. Here the explicit
+strptime format is detected once from a small sample, remembered per source
+(e.g. sheet tab or "GitHub (Live)"), and the whole column is parsed with that
+fixed format in one vectorized pass. Zero-padded layouts are decoded straight
+from the digits; that path is only taken when a sample of the source decodes
+(pd.to_datetime also accepts "1/11/2025 0:14:00", the digit decoder doesn't).
+Only rows the format does not match (hand-edited cells) fall back to inference.
+
+Results are int64 epoch ns with NAT for missing values, the representation
+DataStore and the columnar store keep, so nothing downstream parses text again.
+"""
+
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min
+
+# Tried in order; the first is the layout written by the devices and used in
+# live_data.csv (store.TS_FORMAT), so it wins ties on ambiguous samples.
+FORMATS = [
+    "%d/%m/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y %H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+]
+SAMPLE_ROWS = 200
+MIN_MATCH = 0.9         # share of the sample a format must parse to be chosen
+
+# source key -> detected format (process-wide default cache)
+FORMAT_CACHE = {}
+# (source key, format) -> fixed-width layout, or None when the source's values are not zero-padded
+LAYOUT_CACHE = {}
+
+
+# Fixed-width numeric fields the fast path can decode: directive -> (width, name)
+_FIELDS = {"%d": (2, "day"), "%m": (2, "month"), "%Y": (4, "year"),
+           "%H": (2, "hour"), "%M": (2, "minute"), "%S": (2, "second")}
+_MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _text(values):
+    series = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+    return series.astype(str).str.strip().reset_index(drop=True)
+
+
+def _present(text):
+    return (text != "") & ~text.str.lower().isin(("nan", "none", "nat", "n/a"))
+
+
+def _layout(fmt):
+    """(width, {field: (offset, width)}, [(offset, char)]) or None if not fixed-width."""
+    fields, literals, pos, i = {}, [], 0, 0
+    while i < len(fmt):
+        if fmt[i] == "%":
+            if fmt[i:i + 2] not in _FIELDS:
+                return None
+            width, name = _FIELDS[fmt[i:i + 2]]
+            fields[name] = (pos, width)
+            pos += width
+            i += 2
+        else:
+            literals.append((pos, fmt[i]))
+            pos += 1
+            i += 1
+    if set(fields) != {"day", "month", "year", "hour", "minute", "second"}:
+        return None
+    return pos, fields, literals
+
+
+def _parse_fixed(values, layout):
+    """Decode fixed-width digit layouts straight from the code points (NAT on mismatch)."""
+    width, fields, literals = layout
+    # One spare column: anything longer than the layout has a non-zero code there
+    codes = np.asarray(values, dtype=f"U{width + 1}").view(np.int32).reshape(-1, width + 1)
+    ok = codes[:, width] == 0
+    for pos, char in literals:
+        ok &= codes[:, pos] == ord(char)
+    digits = codes - 48
+    parts = {}
+    for name, (pos, w) in fields.items():
+        block = digits[:, pos:pos + w]
+        ok &= ((block >= 0) & (block <= 9)).all(axis=1)
+        parts[name] = (block @ (10 ** np.arange(w - 1, -1, -1, dtype=np.int32))).astype(np.int64)
+
+    year, month, day = parts["year"], parts["month"], parts["day"]
+    ok &= (month >= 1) & (month <= 12) & (parts["hour"] < 24) & (parts["minute"] < 60) & (parts["second"] < 60)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = _MONTH_DAYS[np.clip(month, 1, 12) - 1] + ((month == 2) & leap)
+    ok &= (day >= 1) & (day <= month_days)
+
+    # Days since 1970-01-01 (proleptic Gregorian, H. Hinnant's days_from_civil)
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    days = era * 146097 + yoe * 365 + yoe // 4 - yoe // 100 + doy - 719468
+    seconds = days * 86400 + parts["hour"] * 3600 + parts["minute"] * 60 + parts["second"]
+    return np.where(ok, seconds * 1_000_000_000, NAT)
+
+
+def _sample(values, sample_rows=SAMPLE_ROWS):
+    """Present, stripped values from the head and tail (a tab may have switched layout part-way)."""
+    series = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+    half = sample_rows // 2
+    if len(series) > sample_rows:
+        series = pd.concat([series.iloc[:half], series.iloc[-half:]])
+    sample = _text(series)
+    return sample[_present(sample)]
+
+
+def _fixed_layout(fmt, sample):
+    """Layout of `fmt` if the sample is zero-padded fixed width, else None."""
+    layout = _layout(fmt)
+    if layout is None or sample.empty:
+        return None
+    hits = (_parse_fixed(sample.to_numpy(dtype=object), layout) != NAT).sum()
+    return layout if hits >= MIN_MATCH * len(sample) else None
+
+
+def detect_format(values, sample_rows=SAMPLE_ROWS):
+    """Best explicit format for a column of timestamp strings, or None."""
+    sample = _sample(values, sample_rows)
+    if sample.empty:
+        return None
+    best, best_hits = None, 0
+    for fmt in FORMATS:
+        hits = pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum()
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+        if hits == len(sample):
+            break
+    return best if best_hits >= MIN_MATCH * len(sample) else None
+
+
+def _infer(text):
+    """The previous behaviour: day-first inference, month-first if that mostly fails."""
+    dt = pd.to_datetime(text, dayfirst=True, errors="coerce", format="mixed")
+    if dt.isna().sum() > len(dt) * 0.5:
+        dt = pd.to_datetime(text, dayfirst=False, errors="coerce", format="mixed")
+    return dt
+
+
+def _to_ns(dt):
+    if getattr(dt.dtype, "tz", None) is not None:
+        dt = dt.dt.tz_localize(None)
+    return dt.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def parse_timestamps(values, key=None, formats=None):
+    """Timestamp strings -> int64 epoch ns array (NAT where missing/unparseable).
+
+    `key` names the source whose format is cached in `formats` (a dict,
+    FORMAT_CACHE by default; pass a persisted dict to keep it across runs).
+    """
+    formats = FORMAT_CACHE if formats is None else formats
+    series = values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=object))
+    if series.empty:
+        return np.empty(0, dtype=np.int64)
+
+    fmt = formats.get(key) if key is not None else None
+    cached = fmt is not None
+    if fmt is None:
+        fmt = detect_format(series)
+        if fmt is not None and key is not None:
+            formats[key] = fmt
+    if fmt is None:
+        return _to_ns(_infer(_text(series)))
+
+    if key is not None and (key, fmt) in LAYOUT_CACHE:
+        layout = LAYOUT_CACHE[(key, fmt)]
+    else:
+        layout = _fixed_layout(fmt, _sample(series))
+        if key is not None:
+            LAYOUT_CACHE[(key, fmt)] = layout
+    if layout is not None:
+        ns = _parse_fixed(series.to_numpy(dtype=object), layout)
+    else:
+        ns = _to_ns(pd.to_datetime(series.reset_index(drop=True), format=fmt, errors="coerce"))
+
+    # Rows the format did not match: blanks stay NAT, hand-edited cells are inferred
+    nat = np.flatnonzero(ns == NAT)
+    if len(nat):
+        text = _text(series.iloc[nat])
+        present = _present(text).to_numpy()
+        if cached and present.sum() > len(series) * 0.5:
+            # The source changed layout: forget the cached format and start over
+            formats.pop(key, None)
+            LAYOUT_CACHE.pop((key, fmt), None)
+            return parse_timestamps(series, key, formats)
+        if present.any():
+            ns[nat[present]] = _to_ns(_infer(text[present]))
+    return ns
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the API (import time and first-request latency).
+
+ - import: `python -X importtime -c "import main"` in fresh interpreters;
+   total import time of main, the heaviest packages it pulls in, and which
+   of the lazily imported dependencies (pandas, httpx) got loaded anyway
+ - first request: a fresh uvicorn process per run against a local stand-in
+   for GitHub raw (`--latency` injected), once without lifespan (as on a
+   serverless function) and once with it; time from spawn until the server
+   listens, latency of the first /data/json request, and for the bundled
+   snapshot how long until the live CSV has replaced it in the background.
+   Each case runs with the deploy-time snapshot and without it (blocking
+   fetch + CSV parse on the first request).
+
+Also run by benchmarks/run_suite.py, so cold start regressions show up in
+the suite's JSON results and --compare.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--latency 0.3] [--csv live_data.csv] [--save out.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+API_DIR = os.path.join(ROOT, "api")
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, API_DIR)
+from load_test_fetch import start_raw_server
+from run_suite import free_port
+from shared_dataset import BUNDLED_SNAPSHOT, write_snapshot
+from store import build_store
+
+# Dependencies the cold path is expected to leave unloaded
+LAZY_MODULES = ("pandas", "httpx", "timeparse", "refresher")
+
+# Server process: nothing but uvicorn and the API is imported before it listens
+SERVE = ("import sys, uvicorn, main; main.data_cache.url_fn = lambda: sys.argv[1]; "
+         "uvicorn.run(main.app, host='127.0.0.1', port=int(sys.argv[2]), log_level='warning', lifespan=sys.argv[3])")
+
+
+def _stats(values):
+    ms = np.array(values) * 1000
+    return {"median_ms": round(float(np.median(ms)), 1), "min_ms": round(float(ms.min()), 1),
+            "max_ms": round(float(ms.max()), 1), "runs": len(ms)}
+
+
+# ========================
+# IMPORT TIME
+# ========================
+def _importtime(stderr):
+    """(main's cumulative µs, {top-level package: cumulative µs}) from -X importtime output."""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue        # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 0:
+            if name == "main":
+                return int(cumulative), packages
+            packages = {}   # site, encodings... imported before main
+        elif "." not in name:
+            packages[name] = int(cumulative)
+    raise RuntimeError("`import main` not found in -X importtime output")
+
+
+def import_profile(runs, env=None):
+    code = f"import main, sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    totals, packages, loaded = [], {}, set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=API_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        total, pkgs = _importtime(out.stderr)
+        totals.append(total / 1e6)
+        for name, us in pkgs.items():
+            packages.setdefault(name, []).append(us / 1000)
+        loaded.update(m for m in out.stdout.strip().split(",") if m)
+    heaviest = sorted(((round(float(np.median(v)), 1), k) for k, v in packages.items()), reverse=True)[:8]
+    return {**_stats(totals), "lazy_loaded": sorted(loaded), "heaviest_ms": {k: v for v, k in heaviest}}
+
+
+# ========================
+# FIRST REQUEST
+# ========================
+def _get(url, timeout=60):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def first_request(raw_url, path, env, lifespan):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", SERVE, raw_url, str(port), lifespan], cwd=API_DIR, env=env)
+    try:
+        for _ in range(3000):
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1):
+                    break
+            except OSError:
+                time.sleep(0.005)
+        else:
+            raise RuntimeError("server did not start")
+        listening = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        status, _ = _get(base + path)
+        first = time.perf_counter() - t1
+        assert status == 200, status
+        total = time.perf_counter() - t0
+        # Until the live CSV has replaced the bundled snapshot (background revalidation)
+        live = None
+        for _ in range(600):
+            source = json.loads(_get(base + "/debug")[1])["data_source"]
+            if source == "GitHub (Live)":
+                live = time.perf_counter() - t0
+                break
+            time.sleep(0.01)
+        return listening, first, total, live
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def cold_start(raw, runs=5, latency=0.3, import_runs=None):
+    """Import profile plus first-request timings, with and without the bundled snapshot."""
+    store = build_store(pd.read_csv(BytesIO(raw)), "Bundled Snapshot")
+    device = store.device_list[len(store.device_list) // 2]
+    path = f"/data/json?device_id={device}&limit=100"
+    workdir = tempfile.mkdtemp(prefix="bench_cold_")
+    raw_server, raw_url = start_raw_server(raw, latency)
+    results = {}
+    try:
+        snap = os.path.join(workdir, BUNDLED_SNAPSHOT)
+        write_snapshot(store, snap)
+        del store
+        env = {k: v for k, v in os.environ.items() if k not in ("INGEST_TOKEN", "SHARED_DATASET")}
+        env.update(DATA_SOURCE="github", DATA_STORE_DIR=workdir, BUNDLED_SNAPSHOT=snap, BACKGROUND_REFRESH="1")
+
+        r = results["import main"] = import_profile(import_runs or runs, env)
+        print(f"   {'import main':<40} median {r['median_ms']:>7.1f} ms   lazy deps loaded: "
+              f"{r['lazy_loaded'] or 'none'}")
+        print("      " + ", ".join(f"{k} {v:.0f} ms" for k, v in r["heaviest_ms"].items()))
+
+        for lifespan in ("off", "on"):
+            for snapshot in ("1", "0"):
+                name = f"first request ({'snapshot' if snapshot == '1' else 'fetch + parse'}, " \
+                       f"lifespan {lifespan})"
+                samples = [first_request(raw_url, path, dict(env, COLD_START_SNAPSHOT=snapshot), lifespan)
+                           for _ in range(runs)]
+                listening, first, total, live = zip(*samples)
+                r = results[name] = _stats(total)
+                r["listening_ms"] = _stats(listening)["median_ms"]
+                r["first_request_ms"] = _stats(first)["median_ms"]
+                live = [s for s in live if s is not None]
+                r["live_after_ms"] = _stats(live)["median_ms"] if live else None
+                print(f"   {name:<40} median {r['median_ms']:>7.1f} ms   (listening {r['listening_ms']:.0f} ms "
+                      f"+ request {r['first_request_ms']:.1f} ms; live data after {r['live_after_ms']} ms)")
+    finally:
+        raw_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.path.join(ROOT, "live_data.csv"))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds added to each GitHub raw response")
+    parser.add_argument("--save", help="write results JSON here")
+    args = parser.parse_args()
+
+    with open(args.csv, "rb") as f:
+        raw = f.read()
+    print(f"🧊 Cold start: {args.csv} ({len(raw) / 2**20:.1f} MB), GitHub raw latency {args.latency * 1000:.0f} ms")
+    results = cold_start(raw, args.runs, args.latency)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: columnar store vs pd.read_csv.
+
+For 10k / 100k / 500k rows reports
+ - cold load : pd.read_csv (+ build_store)  vs  open_store (memory-mapped)
+ - per query : one device, last 7 days, one column —
+               read_csv + boolean masks (old get_json path)  vs  scan() with
+               partition pruning  vs  DataStore.query() on an opened store
+
+Usage: python benchmarks/bench_columnar_store.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+from bench_serialization import make_frame
+from columnar_store import migrate_csv, open_store, scan
+from store import build_store, cutoff_ns
+
+SIZES = [10_000, 100_000, 500_000]
+REPEAT = 3
+DEVICE = "indoor-farm-02"
+COLUMN = "Temperature (°C)"
+
+
+def best_of(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def old_query(csv_path, cutoff):
+    df = pd.read_csv(csv_path)
+    df = df[df["Device ID"].astype(str).str.lower().str.replace("_", "-").str.strip() == DEVICE]
+    dt = pd.to_datetime(df["Timestamp"], dayfirst=True, errors="coerce")
+    return df[dt >= cutoff][f" {COLUMN}"]
+
+
+def main():
+    tmp = tempfile.mkdtemp(prefix="bench_store_")
+    try:
+        print(f"{'rows':>8} | {'case':<34} | {'ms':>9}")
+        print("-" * 58)
+        for rows in SIZES:
+            csv_path = os.path.join(tmp, f"live_{rows}.csv")
+            root = os.path.join(tmp, f"store_{rows}")
+            make_frame(rows).to_csv(csv_path, index=False)
+            migrate_csv(csv_path, root)
+
+            store = open_store(root)
+            end = pd.Timestamp(store.sorted_ts[-1])
+            cutoff = end - pd.Timedelta(days=7)
+            start_ns = cutoff_ns(cutoff.to_pydatetime())
+
+            cases = {
+                "cold load: pd.read_csv": lambda: pd.read_csv(csv_path),
+                "cold load: read_csv + build_store": lambda: build_store(pd.read_csv(csv_path), "csv"),
+                "cold load: open_store (mmap)": lambda: open_store(root),
+                "query: read_csv + masks": lambda: old_query(csv_path, cutoff),
+                "query: scan (pruned partitions)": lambda: scan(root, DEVICE, start_ns, None, [COLUMN]),
+                "query: open store.query()": lambda: store.data[COLUMN][store.query(DEVICE, start_ns)],
+            }
+            for name, fn in cases.items():
+                print(f"{rows:>8} | {name:<34} | {best_of(fn):>9.3f}")
+            print("-" * 58)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
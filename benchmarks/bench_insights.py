@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming insights (api/insights.py) for a large fleet.
+
+A synthetic fleet (`--devices`, one reading every `--interval` s each) is fed
+into insights.Insights the way the API does, one update() per dataset swap:
+ - bootstrap: the first update, warming every device up from its history
+ - per-swap update time with `--swap-min` minutes of new readings
+ - /insights body for the whole fleet and for one device
+and checks that
+ - feeding the same rows in many small swaps gives the same state as one
+   update (the statistics are truly incremental)
+ - one device's mean/variance/trend match a plain per-reading Python loop
+
+Usage: python benchmarks/bench_insights.py [--devices 1000] [--interval 30] [--history-days 2]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+import insights as insights_module
+from bench_retention import COLUMNS, fleet_store
+from insights import MIN_READINGS, Insights
+from store import DataStore
+
+MINUTE = 60 * 1_000_000_000
+
+
+def take(store, end_ns):
+    """The rows of `store` up to `end_ns`, as a new DataStore."""
+    keep = np.flatnonzero(store.ts <= end_ns)
+    data = {c: store.data[c][keep] for c in store.data}
+    return DataStore(store.columns, data, store.ts[keep], store.device_col, store.devices,
+                     store.device_codes[keep], store.source)
+
+
+def reference(ts, values, span_s, trend_s):
+    """Per-reading loop of the same recurrences for one column of one device."""
+    mean = var = t_mean = x_mean = t_var = cov = 0.0
+    n, last = 0, None
+    for t_ns, x in zip(ts.tolist(), values.tolist()):
+        if x != x:
+            continue
+        dt = 0.0 if last is None else max((t_ns - last) / 1e9, 0.0)
+        a = max(1 - math.exp(-dt / span_s), 1 / (n + 1))
+        at = max(1 - math.exp(-dt / trend_s), 1 / (n + 1))
+        diff = x - mean
+        mean += a * diff
+        var = (1 - a) * (var + a * diff * diff)
+        t = (t_ns - ts[0]) / 3.6e12
+        dtm, dxm = t - t_mean, x - x_mean
+        t_mean += at * dtm
+        x_mean += at * dxm
+        t_var = (1 - at) * (t_var + at * dtm * dtm)
+        cov = (1 - at) * (cov + at * dtm * dxm)
+        n, last = n + 1, t_ns
+    return mean, var, cov / t_var if n >= MIN_READINGS else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between readings per device")
+    parser.add_argument("--history-days", type=float, default=2)
+    parser.add_argument("--swaps", type=int, default=20)
+    parser.add_argument("--swap-min", type=float, default=1, help="minutes of new readings per swap")
+    args = parser.parse_args()
+
+    t0_ns = int(pd.Timestamp("2025-11-01").value)
+    boot_end = t0_ns + int(args.history_days * 1440) * MINUTE
+    insights = Insights()
+    history = fleet_store(args.devices, t0_ns, boot_end, args.interval)
+    t = time.perf_counter()
+    insights.update(history)
+    boot_s = time.perf_counter() - t
+    print(f"🧪 {args.devices} devices, bootstrap from {history.rows:,} rows: {boot_s:.2f}s "
+          f"(state {insights.stats()['state_bytes'] / 1e6:.2f} MB)")
+    del history
+
+    times = []
+    end = boot_end
+    for i in range(args.swaps):
+        new_end = end + int(args.swap_min * MINUTE)
+        swap = fleet_store(args.devices, end, new_end, args.interval, seed=i + 1)
+        t = time.perf_counter()
+        added = insights.update(swap)
+        times.append(time.perf_counter() - t)
+        end = new_end
+    per_swap = np.array(times) * 1000
+    print(f"🔁 {args.swaps} swaps of ~{added:,} new rows: p50 {np.percentile(per_swap, 50):.1f} ms, "
+          f"max {per_swap.max():.1f} ms ({np.median(times) / added * 1e6:.2f} µs/reading)")
+
+    t = time.perf_counter()
+    body = insights.body()
+    fleet_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    insights.body(["sim-00007"])
+    print(f"💡 /insights: fleet {fleet_ms:.1f} ms ({len(body) / 1e6:.1f} MB), one device "
+          f"{(time.perf_counter() - t) * 1000:.2f} ms")
+
+    # Incremental == one-shot (warm-up cut-off disabled so both see every row)
+    insights_module.WARMUP_ROWS = 10**9
+    store = fleet_store(20, t0_ns, t0_ns + 6 * 60 * MINUTE, 60, seed=3)
+    one, many = Insights(), Insights()
+    one.update(store)
+    for minutes in range(30, 6 * 60 + 1, 7):
+        many.update(take(store, t0_ns + minutes * MINUTE))
+    many.update(store)
+    for name in ("mean", "var", "cov", "t_var", "n", "anomalies"):
+        assert np.allclose(getattr(one, name), getattr(many, name), rtol=1e-9, equal_nan=True), name
+
+    lo, hi = store.device_slices["sim-00005"]
+    r = one.index["sim-00005"]
+    for i, col in enumerate(COLUMNS):
+        mean, var, slope = reference(store.ts[lo:hi], store.data[col][lo:hi].astype(np.float64),
+                                     one.span_s, one.trend_s)
+        assert np.isclose(one.mean[r, i], mean) and np.isclose(one.var[r, i], var), col
+        assert np.isclose(one.cov[r, i] / one.t_var[r, i], slope), col
+    print("✅ incremental updates match one update and a per-reading reference loop")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the request instrumentation in api/metrics.py.
+
+ - stage(): one timed block with metrics enabled vs disabled (METRICS=0)
+ - middleware: a minimal ASGI endpoint called directly, bare vs wrapped in
+   MetricsMiddleware (request histogram, bytes, Server-Timing header)
+ - /metrics: rendering the registry once every route/stage has series
+
+Usage: python benchmarks/bench_metrics.py [--requests 20000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+import metrics
+from metrics import MetricsMiddleware, record_rows, stage
+
+
+class Route:
+    path = "/data/json"
+
+
+async def endpoint(scope, receive, send):
+    # What a handler does: a couple of stages, then a small JSON body
+    scope["route"] = Route
+    with stage("filter"):
+        pass
+    record_rows(10)
+    with stage("serialize"):
+        body = b'{"ok":true}'
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def drive(app, n):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "path": "/data/json", "query_string": b"device_id=x"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def per_stage_us(n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with stage("filter"):
+            pass
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.requests
+
+    metrics.ENABLED = False
+    off_stage = per_stage_us(n * 5)
+    bare = asyncio.run(drive(endpoint, n))
+    metrics.ENABLED = True
+    on_stage = per_stage_us(n * 5)
+    wrapped = asyncio.run(drive(MetricsMiddleware(endpoint), n))
+    print(f"⏱️ stage(): {off_stage:.3f} µs disabled, {on_stage:.3f} µs enabled")
+    print(f"🌐 request: {bare:.2f} µs bare (metrics off), {wrapped:.2f} µs with MetricsMiddleware "
+          f"(+{wrapped - bare:.2f} µs)")
+
+    t0 = time.perf_counter()
+    text = metrics.render()
+    print(f"📈 /metrics render: {(time.perf_counter() - t0) * 1000:.2f} ms, {len(text):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
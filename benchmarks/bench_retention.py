@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-device retention (raw ring + rollup tiers) for a large fleet.
+
+A synthetic fleet (`--devices`, one reading every `--interval` s each) is fed
+into retention.Retention the way the API does: one update() per dataset
+swap, each swap adding `--swap-min` minutes of readings. Reports:
+ - bootstrap: feeding `--history-days` of history in one update
+ - per-swap update time (incremental, new rows only)
+ - memory: upper bound from bytes_per_device() vs measured RSS growth
+ - query time of /data/rollup-style reads for one device
+and checks the 1h tier against aggregate.bucket_aggregate over the raw rows.
+
+Usage: python benchmarks/bench_retention.py [--devices 1000] [--interval 30] [--history-days 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+from aggregate import bucket_aggregate, parse_resolution
+from retention import Retention
+from store import DataStore
+
+COLUMNS = ["Temperature (°C)", "Humidity (%)", "Light (Lux)", "AQI Value", "Free Heap (B)"]
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def fleet_store(devices, start_ns, end_ns, interval_s, seed=0):
+    """DataStore of every device's readings in [start_ns, end_ns), built directly from arrays."""
+    rng = np.random.default_rng(seed)
+    step = interval_s * 1_000_000_000
+    per_device = np.arange(start_ns, end_ns, step, dtype=np.int64)
+    n = len(per_device)
+    # Each device reports with its own phase so buckets aren't perfectly aligned
+    ts = (per_device[None, :] + rng.integers(0, step, devices)[:, None]).ravel()
+    codes = np.repeat(np.arange(devices, dtype=np.int32), n)
+    data = {
+        "Temperature (°C)": rng.normal(28, 1.5, devices * n).astype(np.float32),
+        "Humidity (%)": rng.uniform(40, 95, devices * n).astype(np.float32),
+        "Light (Lux)": rng.integers(0, 120, devices * n).astype(np.int32),
+        "AQI Value": rng.integers(50, 700, devices * n).astype(np.int32),
+        "Free Heap (B)": rng.integers(180_000, 195_000, devices * n).astype(np.int32),
+    }
+    names = [f"sim-{d:05d}" for d in range(devices)]
+    data["Device ID"] = np.array(names, dtype=object)[codes]
+    return DataStore(["Device ID"] + COLUMNS, data, ts, "Device ID", names, codes, "bench")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--interval", type=int, default=30, help="seconds between readings per device")
+    parser.add_argument("--history-days", type=float, default=2)
+    parser.add_argument("--swaps", type=int, default=20)
+    parser.add_argument("--swap-min", type=float, default=1, help="minutes of new readings per swap")
+    args = parser.parse_args()
+
+    retention = Retention()
+    minute = 60 * 1_000_000_000
+    t0_ns = int(pd.Timestamp("2025-11-01").value)
+    boot_end = t0_ns + int(args.history_days * 1440) * minute
+
+    device = "sim-00007"
+    kept = []       # the check device's rows, to re-aggregate from scratch at the end
+
+    def feed(store):
+        lo, hi = store.device_slices[device]
+        kept.append((store.ts[lo:hi], {c: store.data[c][lo:hi] for c in COLUMNS}))
+        t = time.perf_counter()
+        added = retention.update(store)
+        return added, time.perf_counter() - t
+
+    rss0 = rss_mb()
+    history = fleet_store(args.devices, t0_ns, boot_end, args.interval)
+    _, boot_s = feed(history)
+    print(f"🧪 {args.devices} devices, bootstrap {history.rows:,} rows: {boot_s:.2f}s "
+          f"({history.rows / boot_s:,.0f} rows/s)")
+    del history
+
+    # Incremental swaps, each adding swap_min minutes of readings for every device
+    times = []
+    end = boot_end
+    for i in range(args.swaps):
+        new_end = end + int(args.swap_min * minute)
+        added, took = feed(fleet_store(args.devices, end, new_end, args.interval, seed=i + 1))
+        times.append(took)
+        end = new_end
+    per_swap = np.array(times) * 1000
+    print(f"🔁 {args.swaps} swaps of ~{added:,} new rows: p50 {np.percentile(per_swap, 50):.1f} ms, "
+          f"max {per_swap.max():.1f} ms")
+
+    stats = retention.stats()
+    print(f"🧮 bound {stats['bytes_per_device'] / 1e6:.2f} MB/device → {stats['bytes_max'] / 1e6:,.0f} MB for the fleet; "
+          f"RSS growth {rss_mb() - rss0:,.0f} MB")
+
+    for tier in retention.tier_names:
+        t = time.perf_counter()
+        for _ in range(20):
+            out = retention.rollup([device], tier)
+        print(f"📈 rollup {tier}: {len(out[device]['time'])} buckets in {(time.perf_counter() - t) / 20 * 1000:.2f} ms")
+    t = time.perf_counter()
+    recent = retention.recent(device, 500)
+    print(f"⏱️ recent(500): {(time.perf_counter() - t) * 1000:.2f} ms")
+
+    ts = np.concatenate([k[0] for k in kept])
+    data = {c: np.concatenate([k[1][c] for k in kept]) for c in COLUMNS}
+    data["Device ID"] = np.array([device] * len(ts), dtype=object)
+    one = DataStore(["Device ID"] + COLUMNS, data, ts, "Device ID", [device], np.zeros(len(ts), np.int32), "check")
+    expected = bucket_aggregate(one, [device], COLUMNS, parse_resolution("1h"))[device]
+    got = retention.rollup([device], "1h")[device]
+    assert expected["time"] == got["time"] and expected["count"] == got["count"], "bucket mismatch"
+    for c in COLUMNS:
+        for k in ("min", "mean", "max", "last"):
+            assert np.allclose(np.array(expected["series"][c][k], float), np.array(got["series"][c][k], float),
+                               rtol=1e-5, equal_nan=True), (c, k)
+    assert len(recent["time"]) == 500 and recent["series"]["AQI Value"][-1] == float(data["AQI Value"][-1])
+    print("✅ 1h tier matches bucket_aggregate over the raw rows")
+
+
+if __name__ == "__main__":
+    main()
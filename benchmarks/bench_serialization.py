@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /data/json serialization — records vs columnar.
+
+Compares, for 1k / 10k / 100k rows:
+ - records (stdlib json)    : the old JSONResponse(df.to_dict("records")) path
+ - records (fast)           : records_json() (orjson when installed)
+ - columnar (fast)          : columnar_json()
+ - columnar (df.to_json)    : pandas DataFrame.to_json(orient="columns")
+and reports the raw / gzip body sizes of each format.
+
+Usage: python benchmarks/bench_serialization.py
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+from serialize import columnar_json, orjson, records_json
+from store import build_store
+
+SIZES = [1_000, 10_000, 100_000]
+REPEAT = 5
+
+
+def make_frame(rows, devices=4):
+    rng = np.random.default_rng(0)
+    ts = pd.date_range("2025-11-01", periods=rows, freq="20s")
+    return pd.DataFrame({
+        "Timestamp": ts.strftime("%d/%m/%Y %H:%M:%S"),
+        "Device ID": [f"indoor-farm-{i % devices + 1:02d}" for i in range(rows)],
+        " Temperature (°C)": np.round(rng.normal(28, 1.5, rows), 1),
+        " Humidity (%)": np.round(rng.normal(85, 8, rows), 1),
+        " Light (Lux)": rng.integers(0, 120, rows),
+        "AQI Value": rng.integers(50, 700, rows),
+        "AQI Status": rng.choice(["Good", "Moderate", "Hazardous"], rows),
+        "Smoke Status": "No smoke detected",
+        "Device Health": "GOOD 🟢",
+        "Free Heap (B)": rng.integers(180_000, 195_000, rows),
+        "Month": "Nov",
+        "Month-Year": "Nov-2025",
+        "Year": 2025,
+    })
+
+
+def best_of(fn):
+    best = float("inf")
+    out = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def main():
+    print(f"orjson: {'yes' if orjson is not None else 'no (stdlib json fallback)'}")
+    print(f"{'rows':>8} | {'method':<24} | {'ms':>9} | {'bytes':>11} | {'gzip bytes':>10}")
+    print("-" * 75)
+    for rows in SIZES:
+        df = make_frame(rows)
+        store = build_store(df, "bench")
+        index = store.time_order
+        frame = pd.DataFrame({c: store.data[c] for c in store.data})
+
+        cases = {
+            "records (stdlib json)": lambda: json.dumps(frame.to_dict(orient="records"), ensure_ascii=False).encode(),
+            "records (fast)": lambda: records_json(store, index),
+            "columnar (fast)": lambda: columnar_json(store, index),
+            "columnar (df.to_json)": lambda: frame.to_json(orient="columns", force_ascii=False).encode(),
+        }
+        for name, fn in cases.items():
+            ms, body = best_of(fn)
+            print(f"{rows:>8} | {name:<24} | {ms:>9.2f} | {len(body):>11,} | {len(gzip.compress(body, 5)):>10,}")
+        print("-" * 75)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-worker copies vs one shared memory-mapped dataset.
+
+A synthetic fleet (benchmarks/fleet.py) is loaded by `--workers` processes
+in two ways and each worker then reads every column, as a busy API worker
+eventually would:
+ - private: every worker parses the CSV and builds its own DataStore
+ - shared:  one snapshot is published, every worker maps it (open_snapshot)
+Per worker, memory is read from /proc/<pid>/smaps_rollup: Private is what
+that worker alone costs, Pss splits shared pages between the processes
+mapping them.
+
+Then the generation swap is checked: a follower process polls the
+SharedDataset (ttl=0) while the loader publishes `--swaps` generations of
+different sizes; every attached generation must be complete and consistent.
+
+Usage: python benchmarks/bench_shared_dataset.py [--devices 50] [--days 7] [--workers 4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+from bench_retention import fleet_store
+from fleet import make_fleet
+from shared_dataset import DictColumn, SharedDataset, open_snapshot, publish, read_pointer
+from store import build_store
+
+# Fresh interpreters, so memory deltas aren't blurred by pages shared copy-on-write with the parent
+mp = multiprocessing.get_context("spawn")
+
+
+def smaps_mb(pid="self"):
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                out[key] = int(rest.split()[0]) / 1024
+    return {"rss": out["Rss"], "pss": out["Pss"], "private": out["Private_Clean"] + out["Private_Dirty"]}
+
+
+def worker(mode, path, ready, done, results):
+    base = smaps_mb()
+    t0 = time.perf_counter()
+    if mode == "private":
+        with open(path, "rb") as f:
+            store = build_store(pd.read_csv(BytesIO(f.read())), "bench")
+    else:
+        store = open_snapshot(path)
+    load_s = time.perf_counter() - t0
+    # Fault in every column, as serving all devices' data over time would
+    for values in store.data.values():
+        arr = values.codes if isinstance(values, DictColumn) else values
+        if arr.dtype != object:
+            arr.view(np.uint8).sum()
+    store.sorted_ts.sum(), store.time_order.sum()
+    ready.wait()        # measure once every worker has the dataset in memory
+    mem = smaps_mb()
+    results.put({"load_s": load_s, **{k: mem[k] - base[k] for k in mem}})
+    done.wait()
+
+
+def run_workers(mode, path, n):
+    ready, done = mp.Barrier(n + 1, timeout=600), mp.Barrier(n + 1, timeout=600)
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(mode, path, ready, done, results)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    out = [results.get() for _ in procs]
+    done.wait()
+    for p in procs:
+        p.join()
+    return out
+
+
+def follower(root, last, expected, results):
+    shared = SharedDataset(None, root, ttl=0, wait_s=10)
+    seen, bad = set(), 0
+    deadline = time.monotonic() + 60
+    while last not in seen and time.monotonic() < deadline:
+        store = shared.get()
+        gen = store.generation
+        if gen not in seen:
+            seen.add(gen)
+            rows = expected[gen]
+            ok = (store.rows == rows and len(store.sorted_ts) == rows and len(store.data["AQI Value"]) == rows
+                  and bool(np.all(np.diff(store.sorted_ts) >= 0)))
+            bad += not ok
+    results.put({"generations_seen": len(seen), "inconsistent": bad, "leader": shared.leader})
+
+
+class Loader:
+    """Stands in for DataCache: hands out whatever dataset was set last."""
+
+    def __init__(self):
+        self.value = None
+
+    def get(self):
+        return self.value
+
+    def stats(self):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--swaps", type=int, default=20)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="shared_bench_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    try:
+        df = make_fleet(args.devices, args.days)
+        csv_path = os.path.join(root, "fleet.csv")
+        df.to_csv(csv_path, index=False)
+        store = build_store(df, "bench")
+        del df
+        t0 = time.perf_counter()
+        publish(store, root)
+        publish_s = time.perf_counter() - t0
+        snap = os.path.join(root, read_pointer(root)["file"])
+        print(f"🧪 {store.rows:,} rows; snapshot {os.path.getsize(snap) / 2**20:.1f} MB published in "
+              f"{publish_s * 1000:.0f} ms")
+        del store
+
+        for mode, path in (("private", csv_path), ("shared", snap)):
+            out = run_workers(mode, path, args.workers)
+            private = sum(r["private"] for r in out)
+            pss = sum(r["pss"] for r in out)
+            load = np.median([r["load_s"] for r in out]) * 1000
+            print(f"   {mode:<8} load {load:>8.1f} ms/worker   private {private:>7.1f} MB total "
+                  f"({private / len(out):.1f}/worker)   pss {pss:>7.1f} MB total")
+
+        # Generation swaps while a follower keeps attaching
+        loader = Loader()
+        leader = SharedDataset(loader, root, ttl=0)
+        start = int(pd.Timestamp("2025-11-01").value)
+        first = read_pointer(root)["generation"] + 1
+        gens = list(range(first, first + args.swaps + 1))
+        results = mp.Queue()
+        stores = {g: fleet_store(args.devices, start, start + (60 + 7 * i) * 3600 * 10**9, 60, seed=i)
+                  for i, g in enumerate(gens)}
+        expected = {g: s.rows for g, s in stores.items()}
+        loader.value = stores[gens[0]]
+        leader.get()
+        proc = mp.Process(target=follower, args=(root, gens[-1], expected, results))
+        proc.start()
+        times = []
+        for g in gens[1:]:
+            loader.value = stores[g]
+            t0 = time.perf_counter()
+            leader.get()
+            times.append(time.perf_counter() - t0)
+            time.sleep(0.05)
+        r = results.get()
+        proc.join()
+        print(f"🔁 {args.swaps} publishes (p50 {np.median(times) * 1000:.0f} ms): follower attached "
+              f"{r['generations_seen']} of {len(gens)} generations, {r['inconsistent']} inconsistent, "
+              f"follower leader={r['leader']}")
+        assert r["inconsistent"] == 0 and not r["leader"]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
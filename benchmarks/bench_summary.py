@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /summary latest-reading table vs history size.
+
+For a simulated fleet (`--devices`, one reading every 30s) with 1 and 7
+days of history, measures:
+ - full build: SummaryTable.update() on a fresh table
+ - incremental: update() after a swap where only `--changed` devices got rows
+ - request: SummaryTable.body() for the whole fleet and for one device
+and checks one device's 1h stats against a direct computation.
+
+Usage: python benchmarks/bench_summary.py [--devices 1000] [--changed 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import orjson
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+sys.path.insert(0, os.path.dirname(__file__))
+from bench_retention import COLUMNS, fleet_store
+from store import DataStore
+from summary import SummaryTable
+
+HISTORY_DAYS = [1, 7]
+
+
+def best_of(fn, repeat=200):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def with_new_rows(store, devices, step_ns):
+    """`store` plus one newer reading for the first `devices` devices (as a new dataset swap)."""
+    ts, codes = store.ts.copy(), store.device_codes
+    bounds = np.searchsorted(codes, np.arange(devices) + 1)
+    ts[bounds - 1] += step_ns       # shifting each device's last reading is enough to change it
+    return DataStore(store.columns, store.data, ts, store.device_col, store.devices, codes, store.source)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=10)
+    args = parser.parse_args()
+
+    t0_ns = int(pd.Timestamp("2025-11-01").value)
+    day = 86400 * 1_000_000_000
+    print(f"{'days':>5} {'rows':>12} {'build ms':>9} {'incr ms':>8} {'all us':>8} {'one us':>7} {'KB':>6}")
+    for days in HISTORY_DAYS:
+        store = fleet_store(args.devices, t0_ns, t0_ns + days * day, 30)
+        table = SummaryTable()
+        t = time.perf_counter()
+        table.update(store)
+        build_ms = (time.perf_counter() - t) * 1000
+
+        swapped = with_new_rows(store, args.changed, 1_000_000_000)
+        t = time.perf_counter()
+        changed = table.update(swapped)
+        incr_ms = (time.perf_counter() - t) * 1000
+        assert changed == args.changed
+
+        now = int(swapped.ts.max())
+        body = table.body(now)
+        all_us = best_of(lambda: table.body(now))
+        one_us = best_of(lambda: table.body(now, ["sim-00007"]))
+
+        # 1h stats of one device, computed directly
+        entry = next(d for d in orjson.loads(body)["devices"] if d["device"] == "sim-00007")
+        lo, hi = swapped.device_slices["sim-00007"]
+        ts = swapped.ts[lo:hi]
+        window = swapped.data[COLUMNS[0]][lo:hi][ts > ts[-1] - 3600 * 1_000_000_000].astype(np.float64)
+        got = entry["stats"]["1h"][COLUMNS[0]]
+        assert got["count"] == len(window) and abs(got["mean"] - window.mean()) < 1e-4
+        print(f"{days:>5} {store.rows:>12,} {build_ms:>9.1f} {incr_ms:>8.1f} {all_us:>8.0f} {one_us:>7.1f} "
+              f"{len(body) / 1024:>6.0f}")
+    print("✅ 1h stats match a direct computation")
+
+
+if __name__ == "__main__":
+    main()
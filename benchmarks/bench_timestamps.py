@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: timestamp parsing — inference-based calls vs timeparse.parse_timestamps().
+
+Compares, for 10k / 100k / 500k "%d/%m/%Y %H:%M:%S" strings:
+ - dayfirst inference   : one pd.to_datetime(dayfirst=True) call
+ - old update pipeline  : sort + alerts + retention, each re-parsing with
+                          dayfirst=True (and the dayfirst=False retry check)
+ - detect + fixed format: parse_timestamps() with an empty format cache
+ - cached format        : parse_timestamps() once the source's format is known
+and checks all of them agree.
+
+Usage: python benchmarks/bench_timestamps.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "api"))
+from timeparse import parse_timestamps
+
+SIZES = [10_000, 100_000, 500_000]
+REPEAT = 3
+
+
+def make_timestamps(rows):
+    ts = pd.date_range("2025-11-01", periods=rows, freq="20s")
+    return pd.Series(ts.strftime("%d/%m/%Y %H:%M:%S"))
+
+
+def infer(text):
+    return pd.to_datetime(text, dayfirst=True, errors="coerce")
+
+
+def old_pipeline(text):
+    out = None
+    for _ in range(3):      # sort, alert evaluation, 90-day retention
+        dt = pd.to_datetime(text, dayfirst=True, errors="coerce")
+        if dt.isna().sum() > len(dt) * 0.5:
+            dt = pd.to_datetime(text, dayfirst=False, errors="coerce")
+        out = dt
+    return out
+
+
+def best_of(fn):
+    best = float("inf")
+    out = None
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def main():
+    print(f"{'rows':>8} {'infer ms':>10} {'old x3 ms':>10} {'detect ms':>10} {'cached ms':>10}")
+    for rows in SIZES:
+        text = make_timestamps(rows)
+        cache = {}
+        infer_ms, ref = best_of(lambda: infer(text))
+        old_ms, _ = best_of(lambda: old_pipeline(text))
+        detect_ms, _ = best_of(lambda: parse_timestamps(text, key="bench", formats={}))
+        parse_timestamps(text, key="bench", formats=cache)
+        cached_ms, ns = best_of(lambda: parse_timestamps(text, key="bench", formats=cache))
+
+        assert np.array_equal(ref.to_numpy(dtype="datetime64[ns]").view(np.int64), ns), "parse mismatch"
+        print(f"{rows:>8} {infer_ms:>10.1f} {old_ms:>10.1f} {detect_ms:>10.1f} {cached_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
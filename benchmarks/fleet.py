@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Synthetic device fleet in the live_data.csv schema.
+
+N devices × M days of readings with the shapes seen in the real data:
+ - temperature/humidity follow a daily cycle (humidity moves opposite to
+   temperature) plus per-device offsets and noise
+ - light is ~0 at night and peaks around midday
+ - AQI wanders slowly (random walk) with occasional spikes into the
+   hazardous range; AQI Status is derived from it
+ - free heap slowly decreases on some devices (leak) and resets on reboot
+ - every device reports on its own phase, with jitter, dropped readings
+   and the odd offline gap, so timestamps are irregular and unaligned
+
+Header, column spelling (including the leading spaces) and Timestamp format
+match live_data.csv, so the output can replace it anywhere.
+
+Usage: python benchmarks/fleet.py --devices 100 --days 7 [--interval 60] [--out fleet.csv]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+HEADER = ["Timestamp", "Device ID", " Temperature (°C)", " Humidity (%)", " Light (Lux)", "AQI Value",
+          "AQI Status", "Smoke Status", "Device Health", "Free Heap (B)", "Month", "Month-Year", "Year"]
+AQI_LEVELS = [(300, "Good"), (600, "Moderate"), (np.inf, "Hazardous")]
+
+
+def device_names(devices):
+    return [f"indoor-farm-{i + 1:02d}" if devices <= 99 else f"indoor-farm-{i + 1:05d}" for i in range(devices)]
+
+
+def _calendar(ts):
+    """Timestamp / Month / Month-Year text for epoch ns, formatting each distinct day and second-of-day once."""
+    secs = ts // 1_000_000_000
+    days, day_idx = np.unique(secs // 86400, return_inverse=True)
+    day_dt = pd.to_datetime(days * 86400, unit="s")
+    clock = pd.to_datetime(np.arange(86400), unit="s").strftime(" %H:%M:%S").to_numpy(dtype=str)
+    stamp = np.char.add(day_dt.strftime("%d/%m/%Y").to_numpy(dtype=str)[day_idx], clock[secs % 86400])
+    return (stamp, day_dt.strftime("%b").to_numpy()[day_idx], day_dt.strftime("%b-%Y").to_numpy()[day_idx],
+            day_dt.year.to_numpy()[day_idx])
+
+
+def make_fleet(devices=10, days=7, interval_s=60, start="2025-11-01", seed=0, dropout=0.01):
+    """DataFrame of `devices` × `days` readings, time-ordered like the sheet export."""
+    rng = np.random.default_rng(seed)
+    step = interval_s * 1_000_000_000
+    start_ns = pd.Timestamp(start).value
+    per_device = int(days * 86400 // interval_s)
+
+    frames = []
+    for d, name in enumerate(device_names(devices)):
+        # Own phase + jitter; drop a few readings and, sometimes, a whole offline hour
+        ts = start_ns + rng.integers(0, step) + np.arange(per_device, dtype=np.int64) * step
+        ts += rng.integers(0, step // 10 + 1, per_device)
+        keep = rng.random(per_device) >= dropout
+        if rng.random() < 0.3:
+            gap = rng.integers(0, per_device)
+            keep[gap:gap + 3600 // interval_s] = False
+        ts = ts[keep]
+        n = len(ts)
+
+        hour = (ts // 1_000_000_000 % 86400) / 3600.0
+        daily = np.sin((hour - 9) / 24 * 2 * np.pi)         # peaks mid-afternoon
+        temp = 27 + rng.normal(0, 0.8) + 2.0 * daily + rng.normal(0, 0.3, n)
+        humidity = np.clip(80 + rng.normal(0, 4) - 8 * daily + rng.normal(0, 1.5, n), 20, 100)
+        light = np.clip(np.where((hour > 6) & (hour < 19), 110 * np.sin((hour - 6) / 13 * np.pi), 0)
+                        + rng.normal(0, 4, n), 0, None).astype(np.int64)
+        aqi = np.clip(250 + rng.normal(0, 60) + np.cumsum(rng.normal(0, 3, n)), 20, 1000)
+        spikes = rng.random(n) < 0.002
+        aqi[spikes] += rng.uniform(200, 500, spikes.sum())
+        aqi = np.clip(aqi, 0, 1500).astype(np.int64)
+        aqi_status = np.select([aqi <= limit for limit, _ in AQI_LEVELS], [label for _, label in AQI_LEVELS], "Hazardous")
+        smoke = np.where(aqi > 900, "Smoke detected", "No smoke detected")
+
+        heap = np.full(n, 192_500.0) + rng.normal(0, 60, n)
+        if d % 5 == 0:
+            # Leaky firmware: loses heap until it reboots
+            leak = np.cumsum(rng.uniform(0, 4, n))
+            heap -= leak % 12_000
+        heap = heap.astype(np.int64)
+        health = np.where(heap < 182_000, "LOW MEMORY 🟠", "GOOD 🟢")
+
+        frames.append(pd.DataFrame({
+            "_ts": ts, "Device ID": name,
+            " Temperature (°C)": np.round(temp, 1), " Humidity (%)": np.round(humidity, 1),
+            " Light (Lux)": light, "AQI Value": aqi, "AQI Status": aqi_status, "Smoke Status": smoke,
+            "Device Health": health, "Free Heap (B)": heap,
+        }))
+
+    df = pd.concat(frames, ignore_index=True).sort_values("_ts", kind="stable").reset_index(drop=True)
+    df["Timestamp"], df["Month"], df["Month-Year"], df["Year"] = _calendar(df.pop("_ts").to_numpy())
+    return df[HEADER]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic fleet in the live_data.csv schema")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--interval", type=int, default=60, help="seconds between readings per device")
+    parser.add_argument("--start", default="2025-11-01")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="fleet.csv")
+    args = parser.parse_args()
+
+    df = make_fleet(args.devices, args.days, args.interval, args.start, args.seed)
+    df.to_csv(args.out, index=False)
+    print(f"✅ Wrote {len(df):,} readings for {args.devices} devices × {args.days} days → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
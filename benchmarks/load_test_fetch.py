@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Load test: blocking per-request fetch (before) vs background refresher (after).
+
+A local stand-in for raw.githubusercontent.com serves live_data.csv with an
+injected latency (ETag + 304 supported). Two apps are run under uvicorn and
+driven with a fixed number of concurrent clients:
+ - before : the original get_df() — urllib fetch + pd.read_csv inside every
+            sync route handler
+ - after  : api/main.py — data refreshed by the lifespan background task,
+            handlers only read memory
+
+Usage: python benchmarks/load_test_fetch.py [--latency 0.3] [--concurrency 64] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import http.server
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from io import StringIO
+
+import httpx
+import numpy as np
+import pandas as pd
+import uvicorn
+from fastapi import FastAPI
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+
+# ========================
+# STAND-IN FOR GITHUB RAW
+# ========================
+def start_raw_server(payload, latency):
+    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/live_data.csv"
+
+
+# ========================
+# APPS UNDER TEST
+# ========================
+def legacy_app(url):
+    """The pre-cache API: one blocking fetch + parse per request."""
+    app = FastAPI()
+
+    def get_df():
+        req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return pd.read_csv(StringIO(response.read().decode("utf-8")))
+
+    @app.get("/devices")
+    def devices():
+        df = get_df()
+        device_col = next((c for c in df.columns if "device" in c.lower()), None)
+        return {"devices": sorted(str(d).strip() for d in df[device_col].dropna().unique())}
+
+    return app
+
+
+def current_app(url):
+    os.environ["BACKGROUND_REFRESH"] = "1"
+    import main
+    main.data_cache.url_fn = lambda: url
+    return main.app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(name, url):
+    """Run one app under uvicorn in its own process (so the load driver does
+    not compete with it for the GIL)."""
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", name, "--raw-url", url, "--port", str(port)])
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            httpx.get(base + "/devices", timeout=5)
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    return proc, base
+
+
+# ========================
+# LOAD DRIVER
+# ========================
+async def _get(reader, writer, request):
+    """One keep-alive HTTP/1.1 GET on a raw connection; returns the status code."""
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def drive(base_url, path, concurrency, duration):
+    """Closed-loop load: `concurrency` keep-alive connections for `duration` s.
+
+    Uses bare asyncio streams rather than an HTTP client library so that, on
+    small machines, the driver is not the bottleneck.
+    """
+    host, port = base_url.rsplit("//", 1)[1].split(":")
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, int(port))
+        try:
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                try:
+                    status = await _get(reader, writer, request)
+                except (OSError, asyncio.IncompleteReadError):
+                    errors += 1
+                    writer.close()
+                    reader, writer = await asyncio.open_connection(host, int(port))
+                    continue
+                if status == 200:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / duration, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2) if len(lat) else None,
+        "p95_ms": round(float(np.percentile(lat, 95)), 2) if len(lat) else None,
+        "p99_ms": round(float(np.percentile(lat, 99)), 2) if len(lat) else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3, help="injected GitHub latency (s)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--path", default="/devices")
+    parser.add_argument("--serve", choices=["before", "after"], help=argparse.SUPPRESS)
+    parser.add_argument("--raw-url", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        factory = legacy_app if args.serve == "before" else current_app
+        uvicorn.run(factory(args.raw_url), host="127.0.0.1", port=args.port, log_level="warning")
+        return
+
+    with open(os.path.join(ROOT, "live_data.csv"), "rb") as f:
+        raw_server, url = start_raw_server(f.read(), args.latency)
+
+    results = {}
+    for name in ("before", "after"):
+        proc, base = serve(name, url)
+        try:
+            results[name] = asyncio.run(drive(base, args.path, args.concurrency, args.duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{name:>6}: {results[name]}")
+
+    raw_server.shutdown()
+    config = {k: v for k, v in vars(args).items() if k in ("latency", "concurrency", "duration", "path")}
+    print(json.dumps({"config": config, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
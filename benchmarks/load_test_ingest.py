@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Load test: POST /ingest from a simulated device fleet.
+
+The API runs under uvicorn (one worker, DATA_SOURCE=store) on a temporary
+columnar store seeded from live_data.csv. `--connections` keep-alive clients
+post batches of `--batch` readings from `--devices` simulated devices for
+`--duration` seconds. Reports accepted readings/s, request latency and the
+ingestor's flush statistics, then checks every accepted reading reached the
+store.
+
+Usage: python benchmarks/load_test_ingest.py [--devices 500] [--batch 50] [--connections 16] [--duration 15]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "api"))
+from columnar_store import open_store, write_store
+from store import build_store
+
+TOKEN = "load-test"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(store_dir, flush_rows, flush_s):
+    port = free_port()
+    env = dict(os.environ, DATA_SOURCE="store", DATA_STORE_DIR=store_dir, INGEST_TOKEN=TOKEN,
+               INGEST_FLUSH_ROWS=str(flush_rows), INGEST_FLUSH_S=str(flush_s), BACKGROUND_REFRESH="0")
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(port)], env=env)
+    for _ in range(200):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def make_batches(devices, batch, count, seed=0):
+    """Pre-encoded request bodies (so the driver spends no time building JSON)."""
+    rng = np.random.default_rng(seed)
+    start = int(time.time())
+    bodies = []
+    for b in range(count):
+        ids = rng.integers(0, devices, batch)
+        readings = [{
+            "device_id": f"sim-{d:04d}",
+            "timestamp": start + b * batch + i,
+            "temperature": round(float(rng.normal(28, 1.5)), 1),
+            "humidity": round(float(rng.uniform(40, 95)), 1),
+            "light": int(rng.integers(0, 120)),
+            "aqi": int(rng.integers(50, 700)),
+            "smoke_status": "No smoke detected",
+            "free_heap": int(rng.integers(180_000, 195_000)),
+        } for i, d in enumerate(ids)]
+        bodies.append(json.dumps(readings).encode())
+    return bodies
+
+
+async def _request(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def drive(port, bodies, connections, duration, batch):
+    requests = [
+        (f"POST /ingest HTTP/1.1\r\nHost: localhost\r\nAuthorization: Bearer {TOKEN}\r\n"
+         f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+        for body in bodies
+    ]
+    latencies, statuses = [], {}
+    accepted = 0
+    deadline = time.perf_counter() + duration
+    counter = iter(range(10**9))
+
+    async def worker():
+        nonlocal accepted
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            while time.perf_counter() < deadline:
+                i = next(counter)
+                if i >= len(requests):
+                    return
+                t0 = time.perf_counter()
+                status, _ = await _request(reader, writer, requests[i])
+                latencies.append(time.perf_counter() - t0)
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 202:
+                    accepted += batch
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    elapsed = time.perf_counter() - t0
+    lat = np.array(latencies) * 1000
+    return {
+        "requests": len(lat),
+        "statuses": statuses,
+        "accepted_readings": accepted,
+        "readings_per_s": round(accepted / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p99_ms": round(float(np.percentile(lat, 99)), 2),
+    }
+
+
+async def debug(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        _, body = await _request(reader, writer, b"GET /debug HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    finally:
+        writer.close()
+    return json.loads(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=50, help="readings per request")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--flush-rows", type=int, default=5000)
+    parser.add_argument("--flush-s", type=float, default=2.0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        import main as api
+        uvicorn.run(api.app, host="127.0.0.1", port=args.port, log_level="warning")
+        return
+
+    store_dir = tempfile.mkdtemp(prefix="ingest_store_")
+    seed = build_store(pd.read_csv(os.path.join(ROOT, "live_data.csv")), "Columnar Store")
+    write_store(seed, store_dir)
+    bodies = make_batches(args.devices, args.batch, count=4000)
+
+    proc, port = serve(store_dir, args.flush_rows, args.flush_s)
+    try:
+        result = asyncio.run(drive(port, bodies, args.connections, args.duration, args.batch))
+        time.sleep(args.flush_s + 1)
+        result["ingest"] = asyncio.run(debug(port))["ingest"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    stored = open_store(store_dir).rows
+    result["store_rows"] = stored
+    result["all_persisted"] = stored == seed.rows + result["accepted_readings"]
+    shutil.rmtree(store_dir, ignore_errors=True)
+    config = {k: v for k, v in vars(args).items() if k not in ("serve", "port")}
+    print(json.dumps({"config": config, "result": result}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Load test: /stream fan-out to many idle Server-Sent Events subscribers.
+
+The API is run under uvicorn (DATA_SOURCE=store) on a temporary columnar
+store built from live_data.csv with the newest `--new-rows` readings of every
+device held back. Then:
+ 1. `--clients` SSE connections are opened (half for one device, half for all)
+    and left idle; server RSS is sampled
+ 2. a new store generation with the held-back rows is published; the time
+    until every client has received its `readings` frames is measured
+ 3. one client reconnects with the Last-Event-ID it had before step 2 and
+    must be sent exactly the held-back rows (resume delta)
+
+Usage: python benchmarks/load_test_stream.py [--clients 2000] [--new-rows 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "api"))
+from columnar_store import write_store
+from store import build_store
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def serve(store_dir):
+    port = free_port()
+    env = dict(os.environ, DATA_SOURCE="store", DATA_STORE_DIR=store_dir)
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(port)], env=env)
+    for _ in range(200):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return proc, port
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+# ========================
+# SSE CLIENT
+# ========================
+class Client:
+    def __init__(self, port, device=None, last_event_id=None):
+        self.port = port
+        self.device = device
+        self.last_event_id = last_event_id
+        self.rows = 0
+        self.got_readings = asyncio.Event()
+        self.synced = asyncio.Event()
+
+    async def run(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        path = "/stream" + (f"?device_id={self.device}" if self.device else "")
+        head = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: text/event-stream\r\n"
+        if self.last_event_id:
+            head += f"Last-Event-ID: {self.last_event_id}\r\n"
+        writer.write((head + "\r\n").encode())
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+        buf = b""
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                buf += chunk
+                # Chunked transfer framing is stripped by just scanning for SSE frames
+                while b"\n\n" in buf:
+                    frame, buf = buf.split(b"\n\n", 1)
+                    self._frame(frame)
+        finally:
+            writer.close()
+
+    def _frame(self, frame):
+        event, data = None, None
+        for line in frame.split(b"\n"):
+            if line.startswith(b"event: "):
+                event = line[7:].decode()
+            elif line.startswith(b"data: "):
+                data = line[6:]
+            elif line.startswith(b"id: "):
+                self.last_event_id = line[4:].decode()
+        if event == "readings":
+            self.rows += len(json.loads(data)["rows"])
+        elif event == "sync":
+            # A sync closes each batch: all readings of the swap are in
+            self.synced.set()
+            if self.rows:
+                self.got_readings.set()
+
+
+async def drive(port, clients, devices, new_rows, publish):
+    subs = [Client(port, devices[0] if i % 2 else None) for i in range(clients)]
+    tasks = [asyncio.create_task(c.run()) for c in subs]
+    t0 = time.perf_counter()
+    await asyncio.wait_for(asyncio.gather(*(c.synced.wait() for c in subs)), 120)
+    connect_s = time.perf_counter() - t0
+    token = subs[0].last_event_id
+    idle_rss = rss_mb(publish.pid)
+    await asyncio.sleep(2)
+
+    t0 = time.perf_counter()
+    await asyncio.to_thread(publish)
+    written = time.perf_counter()
+    await asyncio.wait_for(asyncio.gather(*(c.got_readings.wait() for c in subs)), 120)
+    fanout_s = time.perf_counter() - written
+
+    expected_all = new_rows * len(devices)
+    ok = all(c.rows == (new_rows if c.device else expected_all) for c in subs)
+
+    resumed = Client(port, last_event_id=token)
+    task = asyncio.create_task(resumed.run())
+    await asyncio.wait_for(resumed.synced.wait(), 30)
+    await asyncio.sleep(0.5)
+    task.cancel()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, task, return_exceptions=True)
+    return {
+        "clients": clients,
+        "connect_all_s": round(connect_s, 2),
+        "server_rss_mb_idle": idle_rss,
+        "fanout_to_all_s": round(fanout_s, 3),
+        "rows_correct": ok,
+        "resume_rows": resumed.rows,
+        "resume_expected": expected_all,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--new-rows", type=int, default=3, help="readings per device published live")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        import main as api
+        uvicorn.run(api.app, host="127.0.0.1", port=args.port, log_level="warning", backlog=4096)
+        return
+
+    full = build_store(pd.read_csv(os.path.join(ROOT, "live_data.csv")), "Columnar Store")
+    df = pd.read_csv(os.path.join(ROOT, "live_data.csv"))
+    device_col = full.device_col
+    df["_ts"] = pd.to_datetime(df["Timestamp"], dayfirst=True).astype("int64")
+    df = df.sort_values("_ts")
+    held = df.groupby(device_col).tail(args.new_rows).index
+    devices = sorted(df[device_col].astype(str).str.strip().unique())
+
+    store_dir = tempfile.mkdtemp(prefix="stream_store_")
+    write_store(build_store(df.drop(index=held).drop(columns="_ts"), "Columnar Store"), store_dir)
+    proc, port = serve(store_dir)
+
+    def publish():
+        write_store(full, store_dir)
+    publish.pid = proc.pid
+
+    try:
+        result = asyncio.run(drive(port, args.clients, devices, args.new_rows, publish))
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(store_dir, ignore_errors=True)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: pipeline stages and HTTP endpoints on a synthetic fleet.
+
+A fleet of `--devices` × `--days` readings (benchmarks/fleet.py, the
+live_data.csv schema) is generated, then:
+ - stages:    each step of the ingest/API pipeline is timed in-process,
+              pytest-benchmark style (warm-up, then rounds until `--min-time`),
+              reporting min/median/mean/p95/stddev and peak traced memory
+ - endpoints: the API runs under uvicorn against a local stand-in for GitHub
+              raw serving the fleet CSV; each endpoint is driven by
+              `--concurrency` keep-alive clients for `--duration` s, reporting
+              throughput, latency percentiles and server RSS
+ - cold_start: `import main` time and spawn-to-first-response of fresh API
+              processes, with and without the bundled snapshot
+              (benchmarks/bench_cold_start.py)
+
+Results can be saved as JSON and compared against an earlier run; metrics
+that got worse by more than `--tolerance` are listed and the exit code is 1.
+
+Usage:
+  python benchmarks/run_suite.py [--devices 20] [--days 7] [--save results.json]
+  python benchmarks/run_suite.py --compare results.json [--tolerance 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT, "api"))
+from aggregate import bucket_aggregate, lttb_downsample, parse_resolution
+from alert_rules import evaluate
+from columnar_store import open_store, write_store
+from fleet import make_fleet
+from load_test_fetch import drive, start_raw_server
+from retention import Retention
+from serialize import columnar_json, records_json
+from store import build_store
+from summary import SummaryTable
+from timeparse import parse_timestamps
+
+MAX_RECORDS = 200       # per-device export size in update_sheet_v4.py
+
+
+# ========================
+# IN-PROCESS STAGES
+# ========================
+def bench(fn, min_time=1.0, max_rounds=100):
+    """Timing stats (ms) over repeated calls plus peak traced memory (MB) of one call."""
+    fn()        # warm-up (imports, caches, page faults)
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_rounds and (len(times) < 3 or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    ms = np.array(times) * 1000
+    return {
+        "rounds": len(ms),
+        "min_ms": round(float(ms.min()), 3),
+        "median_ms": round(float(np.median(ms)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "stddev_ms": round(float(ms.std()), 3),
+        "ops_per_s": round(1000 / float(np.median(ms)), 2),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+def stages(raw, workdir, min_time):
+    df = pd.read_csv(BytesIO(raw))
+    store = build_store(df, "bench")
+    device = store.device_list[len(store.device_list) // 2]
+    last = int(store.sorted_ts[-1])
+    week_ago = last - 7 * 86400 * 10**9
+    store_dir = os.path.join(workdir, "store")
+    write_store(store, store_dir)
+
+    def export_per_device():
+        # The update_sheet_v4.py per-device CSV loop
+        for name, part in df.groupby("Device ID"):
+            part.head(MAX_RECORDS).to_csv(os.path.join(workdir, f"live_data_{name}.csv"), index=False)
+
+    cases = {
+        "read_csv": lambda: pd.read_csv(BytesIO(raw)),
+        "parse_timestamps (detect)": lambda: parse_timestamps(df["Timestamp"], key="bench", formats={}),
+        "build_store": lambda: build_store(df, "bench"),
+        "alerts.evaluate": lambda: evaluate(df, device_col="Device ID", ts=store.ts),
+        "export_per_device_csv": export_per_device,
+        "write_store": lambda: write_store(store, store_dir),
+        "open_store": lambda: open_store(store_dir),
+        "json one device 7d": lambda: records_json(store, store.query(device, week_ago, None)),
+        "json all (columnar)": lambda: columnar_json(store, store.time_order),
+        "aggregate 1h all devices": lambda: bucket_aggregate(store, store.device_list, store.sensor_columns,
+                                                             parse_resolution("1h")),
+        "lttb 500 one device": lambda: lttb_downsample(store, [device], store.sensor_columns, 500),
+        "summary.update (full)": lambda: SummaryTable().update(store),
+        "retention.update (full)": lambda: Retention().update(store),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = bench(fn, min_time)
+        r = results[name]
+        print(f"   {name:<28} median {r['median_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+              f"peak {r['peak_mb']:>7.1f} MB  ({r['rounds']} rounds)")
+    return results, device, last
+
+
+# ========================
+# HTTP ENDPOINTS
+# ========================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid, field="VmRSS"):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def serve(raw_url):
+    port = free_port()
+    env = dict(os.environ, DATA_SOURCE="github", BACKGROUND_REFRESH="1")
+    proc = subprocess.Popen([sys.executable, __file__, "--serve", "--raw-url", raw_url, "--port", str(port)], env=env)
+    for _ in range(600):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def endpoints(raw, device, last_ns, concurrency, duration):
+    day_start = pd.Timestamp(last_ns).floor("D").isoformat()
+    paths = [
+        "/devices",
+        f"/data/json?device_id={device}&start={day_start}",
+        f"/data/json?device_id={device}&limit=1000&format=columnar",
+        f"/data/aggregate?device_id={device}&resolution=1h",
+        "/data/aggregate?resolution=1h",
+        f"/data/aggregate?device_id={device}&mode=lttb&points=500",
+        "/summary",
+        f"/summary?device_id={device}",
+        f"/data/rollup?device_id={device}&tier=1h",
+    ]
+    raw_server, url = start_raw_server(raw, 0.0)
+    proc, base = serve(url)
+    results = {}
+    try:
+        # The first dataset load and listener bootstrap happen in the lifespan
+        results["_server"] = {"rss_mb_idle": rss_mb(proc.pid)}
+        for path in paths:
+            r = asyncio.run(drive(base, path, concurrency, duration))
+            r["server_rss_mb"] = rss_mb(proc.pid)
+            results[path] = r
+            print(f"   {path:<60} {r['rps']:>8.1f} req/s  p50 {r['p50_ms']} ms  p99 {r['p99_ms']} ms  "
+                  f"errors {r['errors']}")
+        results["_server"]["peak_rss_mb"] = rss_mb(proc.pid, "VmHWM")
+    finally:
+        proc.terminate()
+        proc.wait()
+        raw_server.shutdown()
+    return results
+
+
+# ========================
+# RESULTS
+# ========================
+def meta(args):
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    try:
+        import orjson
+        orjson_version = orjson.__version__
+    except ImportError:
+        orjson_version = None
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git": rev,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "orjson": orjson_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k in ("devices", "days", "interval", "concurrency",
+                                                                  "duration", "min_time", "cold_runs",
+                                                                  "cold_latency")},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Metrics that regressed by more than `tolerance` (lower is better except req/s)."""
+    regressions = []
+    checks = [("stages", "median_ms", False), ("stages", "peak_mb", False),
+              ("endpoints", "p50_ms", False), ("endpoints", "p99_ms", False), ("endpoints", "rps", True),
+              ("cold_start", "median_ms", False)]
+    print(f"\n📊 vs baseline {baseline['meta'].get('git')} ({baseline['meta'].get('created')}):")
+    for section, metric, higher_better in checks:
+        for name, result in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name, {}).get(metric)
+            new = result.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            worse = ratio < 1 - tolerance if higher_better else ratio > 1 + tolerance
+            if worse:
+                regressions.append({"section": section, "name": name, "metric": metric, "baseline": old, "current": new})
+            print(f"   {'❌' if worse else '  '} {section:<9} {name:<60} {metric:<9} {old:>10} → {new:>10} ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--interval", type=int, default=60, help="seconds between readings per device")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds of rounds per stage")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5, help="seconds of load per endpoint")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--cold-runs", type=int, default=3, help="fresh processes per cold start case (0 = skip)")
+    parser.add_argument("--cold-latency", type=float, default=0.3, help="GitHub raw latency for cold starts (s)")
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--raw-url", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        import main as api
+        api.data_cache.url_fn = lambda: args.raw_url
+        uvicorn.run(api.app, host="127.0.0.1", port=args.port, log_level="warning")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        t0 = time.perf_counter()
+        fleet = make_fleet(args.devices, args.days, args.interval)
+        raw = fleet.to_csv(index=False).encode()
+        print(f"🧪 Fleet: {args.devices} devices × {args.days} days every {args.interval}s → "
+              f"{len(fleet):,} rows, {len(raw) / 2**20:.1f} MB CSV ({time.perf_counter() - t0:.1f}s)")
+        del fleet
+        print("⚙️ Pipeline stages")
+        results = {"meta": meta(args)}
+        results["stages"], device, last_ns = stages(raw, workdir, args.min_time)
+        if not args.skip_http:
+            print("🌐 Endpoints")
+            results["endpoints"] = endpoints(raw, device, last_ns, args.concurrency, args.duration)
+        if args.cold_runs:
+            from bench_cold_start import cold_start     # imports this module (free_port)
+
+            print("🧊 Cold start")
+            results["cold_start"] = cold_start(raw, args.cold_runs, args.cold_latency)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results["regressions"] = regressions
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"💾 Saved {args.save}")
+    if regressions:
+        print(f"❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
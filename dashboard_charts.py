@@ -0,0 +1,218 @@
+"""
+Per-device trend charts for the dashboard: render in parallel, publish only what changed.
+
+- Charts are drawn with the object-oriented Figure API (no pyplot global
+  state), so they can be rendered in a process pool.
+- Each chart is keyed by a hash of the data it plots; if the hash matches the
+  last run (chart_cache.json) the chart is not re-rendered.
+- Uploads compare the PNG's git blob SHA against the SHAs already in the
+  repo (one directory listing instead of a GET per file) and skip identical
+  files. Changed blobs are created concurrently over one pooled session and
+  committed together as a single commit via the Git Data API, which avoids
+  the 409 conflicts of parallel contents-API PUTs on one branch.
+"""
+
+import base64
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CACHE_FILE = "chart_cache.json"
+RENDER_VERSION = 1          # bump when the chart layout changes to force re-rendering
+UPLOAD_WORKERS = 8
+
+
+def load_cache(path=CACHE_FILE):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def blob_sha(content):
+    """SHA git (and the GitHub API) reports for a file with these bytes."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+# ========================
+# RENDERING
+# ========================
+def chart_spec(device, series, title=None):
+    """Plain, picklable description of a chart: {title, series: {label: [values]}}."""
+    return {
+        "title": title or f"{device} - Recent Trends",
+        "series": {label: [None if v != v else float(v) for v in values] for label, values in series.items()},
+    }
+
+
+def spec_hash(spec):
+    body = json.dumps([RENDER_VERSION, spec], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def render_chart(spec, path):
+    """Draw one chart to `path` (runs in a worker process); returns the PNG bytes."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(6, 3))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    markers = iter("osd^v*")
+    for label, values in spec["series"].items():
+        ax.plot([float("nan") if v is None else v for v in values], marker=next(markers, "o"), label=label)
+    ax.set_title(spec["title"])
+    ax.set_xlabel("Reading Index (older → newer)")
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    # Fixed metadata so identical data gives byte-identical PNGs
+    fig.savefig(path, metadata={"Software": None})
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def render_charts(specs, out_dir, cache, remote_shas=None, workers=None):
+    """Render charts whose data changed; returns {name: png bytes or None}.
+
+    `specs` is {file name: spec}. A chart is skipped when its data hash is
+    unchanged and either the local file or the remote copy still matches;
+    skipped charts map to None (their bytes are not needed).
+    """
+    remote_shas = remote_shas or {}
+    os.makedirs(out_dir, exist_ok=True)
+    results = {}
+    todo = []
+    for name, spec in specs.items():
+        h = spec_hash(spec)
+        entry = cache.get(name, {})
+        path = os.path.join(out_dir, name)
+        if entry.get("data_hash") == h and (os.path.exists(path) or remote_shas.get(name) == entry.get("blob_sha")):
+            results[name] = None
+            continue
+        todo.append((name, spec, path, h))
+
+    if len(todo) > 1 and (workers or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pngs = list(pool.map(render_chart, [t[1] for t in todo], [t[2] for t in todo], chunksize=4))
+    else:
+        pngs = [render_chart(spec, path) for _, spec, path, _ in todo]
+
+    for (name, _, _, h), png in zip(todo, pngs):
+        cache[name] = {"data_hash": h, "blob_sha": blob_sha(png)}
+        results[name] = png
+    return results
+
+
+# ========================
+# GITHUB UPLOAD (Git Data API)
+# ========================
+class GitHubAssets:
+    def __init__(self, repo, token, branch="main", api_url="https://api.github.com",
+                 workers=UPLOAD_WORKERS, timeout=(3.05, 30)):
+        self.repo = repo
+        self.branch = branch
+        self.base = f"{api_url.rstrip('/')}/repos/{repo}"
+        self.workers = workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"})
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.requests = 0
+
+    def _call(self, method, path, **kwargs):
+        self.requests += 1
+        r = self.session.request(method, f"{self.base}{path}", timeout=self.timeout, **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+    def raw_url(self, path_in_repo):
+        return f"https://raw.githubusercontent.com/{self.repo}/{self.branch}/{path_in_repo}"
+
+    def remote_shas(self, directory):
+        """{file name: blob sha} for one directory of the branch ({} if it does not exist)."""
+        try:
+            listing = self._call("GET", f"/contents/{directory}", params={"ref": self.branch})
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return {}
+            raise
+        return {item["name"]: item["sha"] for item in listing if item.get("type") == "file"}
+
+    def _create_blob(self, content):
+        data = {"content": base64.b64encode(content).decode("ascii"), "encoding": "base64"}
+        return self._call("POST", "/git/blobs", json=data)["sha"]
+
+    def commit_files(self, files, message):
+        """Commit {path in repo: bytes} to the branch in one commit; returns the commit sha."""
+        if not files:
+            return None
+        paths = list(files)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            shas = list(pool.map(self._create_blob, [files[p] for p in paths]))
+
+        head = self._call("GET", f"/git/ref/heads/{self.branch}")["object"]["sha"]
+        base_tree = self._call("GET", f"/git/commits/{head}")["tree"]["sha"]
+        tree = self._call("POST", "/git/trees", json={
+            "base_tree": base_tree,
+            "tree": [{"path": p, "mode": "100644", "type": "blob", "sha": s} for p, s in zip(paths, shas)],
+        })["sha"]
+        commit = self._call("POST", "/git/commits", json={"message": message, "tree": tree, "parents": [head]})["sha"]
+        self._call("PATCH", f"/git/refs/heads/{self.branch}", json={"sha": commit})
+        return commit
+
+    def close(self):
+        self.session.close()
+
+
+def publish_charts(specs, out_dir, assets_dir, cache, uploader=None, message="Update dashboard charts", workers=None):
+    """Render changed charts and upload the ones that differ from the repo.
+
+    Returns ({name: chart url or None}, {"rendered": n, "uploaded": n}).
+    """
+    remote = {}
+    if uploader is not None:
+        try:
+            remote = uploader.remote_shas(assets_dir)
+        except requests.RequestException as e:
+            print(f"⚠️ Could not list {assets_dir} on GitHub: {type(e).__name__}")
+            uploader = None
+
+    pngs = render_charts(specs, out_dir, cache, remote, workers)
+    rendered = sum(png is not None for png in pngs.values())
+
+    changed = {}
+    if uploader is not None:
+        for name, png in pngs.items():
+            if remote.get(name) == cache[name]["blob_sha"]:
+                continue
+            if png is None:
+                with open(os.path.join(out_dir, name), "rb") as f:
+                    png = f.read()
+            changed[f"{assets_dir}/{name}"] = png
+        try:
+            uploader.commit_files(changed, message)
+        except requests.RequestException as e:
+            print(f"⚠️ Failed to upload charts to GitHub: {type(e).__name__}")
+            uploader = None
+
+    urls = {}
+    for name in specs:
+        urls[name] = uploader.raw_url(f"{assets_dir}/{name}") if uploader is not None else None
+    return urls, {"rendered": rendered, "uploaded": len(changed) if uploader is not None else 0}
@@ -1,8 +1,16 @@
-export default function InsightBox({ text }) {
+export default function InsightBox({ text, flags }) {
   return (
     <div className="p-4 mb-4 bg-blue-100 rounded-xl shadow-md">
       <h2 className="font-semibold">AI Summary</h2>
-      <p className="text-gray-700">{text}</p>
+      {flags && flags.length > 0 ? (
+        <ul className="text-gray-700">
+          {flags.map((flag) => (
+            <li key={`${flag.kind}-${flag.column}`}>{flag.text}</li>
+          ))}
+        </ul>
+      ) : (
+        <p className="text-gray-700">{text}</p>
+      )}
     </div>
   );
 }
@@ -8,6 +8,13 @@ import DateRangeSelector from "./components/DateRangeSelector";
 import UpdateStatus from "./components/UpdateStatus";
 import ZoomModal from "./components/ZoomModal";
 
+// "DD/MM/YYYY HH:MM:SS" (the backend's timestamp format) -> Date, or null
+function parseTimestamp(text) {
+  const parts = (text || "").split(/[\s/:]/);
+  if (parts.length < 6) return null;
+  return new Date(parts[2], parts[1] - 1, parts[0], parts[3], parts[4], parts[5]);
+}
+
 export default function Home() {
   const [data, setData] = useState([]);
   const [columns, setColumns] = useState([]);
@@ -15,6 +22,8 @@ export default function Home() {
   const [selectedDevice, setSelectedDevice] = useState("");
   const [days, setDays] = useState(null); // null = All Time
   const [zoomedChart, setZoomedChart] = useState(null); // { title: string, data: [] }
+  const [insight, setInsight] = useState(null); // { text, flags } from /api/insights
+  const [liveUpdates, setLiveUpdates] = useState(false); // /api/stream only runs on long-lived servers
 
   // 1. Fetch Devices on Mount
   useEffect(() => {
@@ -34,6 +43,12 @@ export default function Home() {
       }
     }
     fetchDevices();
+
+    // Serverless deployments have no stream: don't keep an EventSource reconnecting to it
+    fetch("/api/")
+      .then(res => (res.ok ? res.json() : {}))
+      .then(json => setLiveUpdates(Boolean(json.live_updates)))
+      .catch(() => setLiveUpdates(false));
   }, []);
 
   // 2. Fetch Data when Device or Days Changes
@@ -66,6 +81,49 @@ export default function Home() {
     fetchData();
   }, [selectedDevice, days]);
 
+  // 3. Insights (anomalies, trends, stuck sensors, heap leaks) for the selected device
+  async function fetchInsight(device) {
+    try {
+      const params = new URLSearchParams();
+      if (device) params.append("device_id", device);
+      const res = await fetch(`/api/insights?${params.toString()}`);
+      if (res.ok) {
+        const json = await res.json();
+        const entry = device ? (json.devices || [])[0] : null;
+        setInsight({ text: json.text, flags: entry ? entry.flags : [] });
+      }
+    } catch (error) {
+      console.error("Error fetching insights:", error);
+    }
+  }
+
+  useEffect(() => {
+    fetchInsight(selectedDevice);
+  }, [selectedDevice]);
+
+  // 4. Live updates: append rows pushed by /api/stream instead of re-fetching
+  useEffect(() => {
+    if (!liveUpdates || typeof EventSource === "undefined") return;
+    const params = new URLSearchParams();
+    if (selectedDevice) params.append("device_id", selectedDevice);
+    // EventSource reconnects with Last-Event-ID on its own, so only the delta is resent
+    const source = new EventSource(`/api/stream?${params.toString()}`);
+    source.addEventListener("readings", (event) => {
+      const { rows } = JSON.parse(event.data);
+      // Keep the list to the selected range: drop readings that fell out of the last `days`
+      const cutoff = days ? Date.now() - days * 86400000 : null;
+      const inRange = row => {
+        if (cutoff === null) return true;
+        const ts = parseTimestamp(row.Timestamp);
+        return ts === null || ts.getTime() >= cutoff;
+      };
+      setData(prev => prev.concat(rows).filter(inRange));
+      // New readings have been folded into the insights server-side
+      fetchInsight(selectedDevice);
+    });
+    return () => source.close();
+  }, [selectedDevice, days, liveUpdates]);
+
   // Extract labels (timestamps) 
   // Pass FULL string so Zoom/Tooltip can show date. ChartCard will slice it for axis.
   const labels = data.map(d => d.Timestamp || "");
@@ -74,14 +132,7 @@ export default function Home() {
   // Note: We need a valid Date object for UpdateStatus. 
   // If format is DD/MM/YYYY HH:MM:SS, JS Date constructor might fail in some browsers.
   // Ideally backend should send ISO. But let's try to parse or just current time if fail.
-  let validLastUpdated = null;
-  if (lastUpdated) {
-    const parts = lastUpdated.split(/[\s/:]/); // simple split
-    // parts: [28, 09, 2025, 05, 36, 18]
-    if (parts.length >= 6) {
-      validLastUpdated = new Date(parts[2], parts[1] - 1, parts[0], parts[3], parts[4], parts[5]);
-    }
-  }
+  const validLastUpdated = lastUpdated ? parseTimestamp(lastUpdated) : null;
 
   // Helper to get data series for a specific metric
   const getDataFor = (keyword) => {
@@ -129,7 +180,10 @@ export default function Home() {
         </div>
       </div>
 
-      <InsightBox text={`Viewing real-time data for ${selectedDevice || "all devices"}. Click any chart to zoom.`} />
+      <InsightBox
+        text={insight?.text || `Viewing real-time data for ${selectedDevice || "all devices"}. Click any chart to zoom.`}
+        flags={insight?.flags}
+      />
 
       {data.length > 0 && (
         <div className="card-grid">
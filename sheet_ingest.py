@@ -0,0 +1,181 @@
+"""
+Incremental Google Sheets ingestion.
+
+Instead of `get_all_values()` on the whole tab every run, a cursor (last row
+read + its timestamp, per tab) is persisted between runs and only rows after
+it are fetched, using ranged reads (e.g. "A1201:M1700") in bounded batches.
+
+The sheet is accessed through a small source interface so the ingester can
+run against a local fake:
+    tabs()                      -> list of tab titles (oldest first)
+    header(tab)                 -> header row
+    last_row(tab)               -> index of the last non-empty row (1-based)
+    read(tab, first, last, ncols) -> rows first..last (trailing blanks may be trimmed)
+"""
+
+import json
+import os
+
+CURSOR_FILE = "ingest_cursor.json"
+BATCH_ROWS = 500            # rows per ranged read
+BOOTSTRAP_ROWS = 1000       # rows taken from the end of a tab seen for the first time
+
+
+def column_letter(n):
+    """1 -> A, 13 -> M, 27 -> AA."""
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def is_blank(row):
+    return not any(str(cell).strip() for cell in row)
+
+
+# ========================
+# SHEET SOURCES
+# ========================
+class GspreadSource:
+    """Live Google Sheet via an authorized gspread Spreadsheet."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._sheets = {}
+
+    def _ws(self, tab):
+        if tab not in self._sheets:
+            self._sheets[tab] = self.doc.worksheet(tab)
+        return self._sheets[tab]
+
+    def tabs(self):
+        worksheets = self.doc.worksheets()
+        self._sheets.update({ws.title: ws for ws in worksheets})
+        return [ws.title for ws in worksheets]
+
+    def header(self, tab):
+        return self._ws(tab).row_values(1)
+
+    def last_row(self, tab):
+        # Column A (Timestamp) only: far cheaper than the whole grid
+        return len(self._ws(tab).col_values(1))
+
+    def read(self, tab, first, last, ncols):
+        return self._ws(tab).get(f"A{first}:{column_letter(ncols)}{last}")
+
+
+class FakeSheetSource:
+    """In-memory stand-in: {tab title: [header, row, row, ...]}."""
+
+    def __init__(self, tabs):
+        self.sheets = tabs
+        self.reads = []     # (tab, first, last) of every ranged read
+
+    def tabs(self):
+        return list(self.sheets)
+
+    def header(self, tab):
+        return list(self.sheets[tab][0])
+
+    def last_row(self, tab):
+        rows = self.sheets[tab]
+        while rows and is_blank(rows[-1]):
+            rows = rows[:-1]
+        return len(rows)
+
+    def read(self, tab, first, last, ncols):
+        self.reads.append((tab, first, last))
+        rows = [list(r[:ncols]) for r in self.sheets[tab][first - 1:last]]
+        while rows and is_blank(rows[-1]):
+            rows.pop()
+        return rows
+
+
+# ========================
+# CURSOR
+# ========================
+def load_cursor(path=CURSOR_FILE):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"tab": None, "tabs": {}}
+
+
+def save_cursor(cursor, path=CURSOR_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(cursor, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ========================
+# INGESTION
+# ========================
+def pick_tab(tabs, preferred):
+    """Preferred tab if it exists, otherwise the newest (last) one."""
+    return preferred if preferred in tabs else tabs[-1]
+
+
+def _read_tab(source, tab, state, batch_rows, bootstrap_rows):
+    """New rows of one tab after state["last_row"]; returns (header, rows, state)."""
+    header = source.header(tab)
+    ncols = len(header)
+    new_rows = []
+
+    if state is not None and state.get("last_timestamp") is not None:
+        # Re-read the cursor row to make sure the sheet was not edited/shifted
+        check = source.read(tab, state["last_row"], state["last_row"], ncols)
+        if not check or (check[0] or [""])[0] != state["last_timestamp"]:
+            print(f"⚠️ Cursor for '{tab}' no longer matches row {state['last_row']}; re-reading tail.")
+            state = None
+
+    # Read up to the last row known now; rows appended meanwhile are picked up next run.
+    # Short or empty batches don't end the loop: reads trim trailing blanks, so a blank
+    # block in the middle of the tab looks just like the end of it
+    last = source.last_row(tab)
+    if state is None:
+        state = {"last_row": max(1, last - bootstrap_rows), "last_timestamp": None}
+
+    first = state["last_row"] + 1
+    while first <= last:
+        batch = source.read(tab, first, first + batch_rows - 1, ncols)
+        for offset, row in enumerate(batch):
+            if is_blank(row):
+                continue
+            row = list(row) + [""] * (ncols - len(row))
+            new_rows.append(row)
+            state = {"last_row": first + offset, "last_timestamp": row[0]}
+        first += batch_rows
+
+    return header, new_rows, state
+
+
+def fetch_new_rows(source, cursor, preferred_tab, batch_rows=BATCH_ROWS, bootstrap_rows=BOOTSTRAP_ROWS):
+    """Rows added since the cursor, across a tab rollover if one happened.
+
+    Returns (header, rows, tab, cursor). `cursor` is updated in place and
+    should be saved once the rows have been persisted.
+    """
+    tabs = source.tabs()
+    if not tabs:
+        return None, [], None, cursor
+    tab = pick_tab(tabs, preferred_tab)
+    header, rows = None, []
+
+    # Rollover: finish the previous tab before moving on to the new one
+    previous = cursor.get("tab")
+    if previous and previous != tab and previous in tabs and previous in cursor["tabs"]:
+        header, rows, cursor["tabs"][previous] = _read_tab(
+            source, previous, cursor["tabs"][previous], batch_rows, bootstrap_rows)
+        if rows:
+            print(f"📥 Drained {len(rows)} remaining rows from previous tab '{previous}'.")
+
+    tab_header, tab_rows, cursor["tabs"][tab] = _read_tab(
+        source, tab, cursor["tabs"].get(tab), batch_rows, bootstrap_rows)
+    if header is not None and rows and header != tab_header:
+        # Align the drained rows to the current tab's columns by name
+        positions = {name: i for i, name in enumerate(header)}
+        rows = [[r[positions[h]] if h in positions else "" for h in tab_header] for r in rows]
+    cursor["tab"] = tab
+    return tab_header, rows + tab_rows, tab, cursor
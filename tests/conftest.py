@@ -0,0 +1,34 @@
+"""Shared test setup: the API modules (api/) and the update scripts (repo root) import each
+other as top-level modules, the way api/main.py and update_sheet_v4.py run them."""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "api"))
+
+
+# Settings main.py would otherwise pick up from the environment or the checkout
+MAIN_ENV = ("DATA_SOURCE", "DATA_STORE_DIR", "BUNDLED_SNAPSHOT", "COLD_START_SNAPSHOT", "INGEST_TOKEN",
+            "SHARED_DATASET", "RETENTION_FILE")
+
+
+@pytest.fixture
+def load_main(monkeypatch, tmp_path):
+    """Import a fresh api/main.py under the given environment (DATA_STORE_DIR defaults to tmp_path)."""
+
+    def load(**env):
+        for name in MAIN_ENV:
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("DATA_STORE_DIR", str(tmp_path))
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        sys.modules.pop("main", None)
+        return importlib.import_module("main")
+
+    yield load
+    sys.modules.pop("main", None)
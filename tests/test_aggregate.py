@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate import bucket_aggregate, lttb_downsample, lttb_indices, parse_resolution
+from store import build_store, format_ts
+
+COL = "Temperature (°C)"
+
+
+def fleet():
+    """Two devices, one reading a minute with a gap of empty buckets and some missing values."""
+    rng = np.random.default_rng(0)
+    minutes = np.r_[0:50, 120:180]           # no readings between 00:50 and 02:00
+    ts = pd.Timestamp("2025-11-01") + pd.to_timedelta(np.repeat(minutes, 2), unit="min")
+    temp = rng.normal(25, 3, len(ts)).round(2)
+    temp[::7] = np.nan
+    return pd.DataFrame({
+        "Timestamp": ts.strftime("%d/%m/%Y %H:%M:%S"),
+        "Device ID": ["farm-01", "farm-02"] * len(minutes),
+        COL: temp,
+    }), ts
+
+
+@pytest.mark.parametrize("resolution", ["5min", "1h"])
+def test_buckets_match_pandas_resample(resolution):
+    df, ts = fleet()
+    store = build_store(df, "test")
+    out = bucket_aggregate(store, ["farm-01", "farm-02"], [COL], parse_resolution(resolution))
+    assert sorted(out) == ["farm-01", "farm-02"]
+
+    for device, got in out.items():
+        rows = df.assign(_ts=ts)[df["Device ID"] == device].set_index("_ts")[COL].astype(np.float32)
+        want = rows.resample(resolution, origin="epoch").agg(["min", "mean", "max", "size"])
+        want = want[want["size"] > 0]           # empty buckets are left out, not sent as nulls
+        assert got["time"] == format_ts(want.index.to_numpy("datetime64[ns]").view(np.int64))
+        assert got["count"] == want["size"].tolist()
+        series = got["series"][COL]
+        for stat in ("min", "mean", "max"):
+            expected = [None if v != v else round(v, 5) for v in want[stat].astype(np.float64).tolist()]
+            assert series[stat] == pytest.approx(expected, abs=1e-4), stat
+    assert "01/11/2025 01:00:00" not in out["farm-01"]["time"]
+
+
+def test_lttb_keeps_the_ends_and_returns_n_points():
+    rng = np.random.default_rng(1)
+    x = np.cumsum(rng.integers(1, 100, 1000))
+    y = rng.normal(size=1000)
+    for n in (3, 10, 137, 999):
+        keep = lttb_indices(x, y, n)
+        assert len(keep) == n
+        assert keep[0] == 0 and keep[-1] == 999
+        assert (np.diff(keep) > 0).all()
+    assert lttb_indices(x, y, 5000).tolist() == list(range(1000))
+
+
+def test_lttb_keeps_spikes():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 10.0
+    assert 500 in lttb_indices(x, y, 20)
+
+
+def test_lttb_downsample_per_device():
+    df, _ = fleet()
+    store = build_store(df, "test")
+    out = lttb_downsample(store, ["farm-01", "farm-02"], [COL], 20)
+    for device in ("farm-01", "farm-02"):
+        series = out[device]["series"][COL]
+        assert len(series["time"]) == len(series["value"]) == 20
+        assert None not in series["value"]       # missing readings are skipped, not plotted
@@ -0,0 +1,75 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from alert_notify import NORMAL_TEXT, TelegramNotifier, load_state, notify, save_state
+
+
+@pytest.fixture
+def telegram():
+    """Local stand-in for the Bot API: answers with the queued status codes, then 200."""
+    calls, statuses = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            calls.append((time.monotonic(), parse_qs(body.decode())["text"][0]))
+            status = statuses.pop(0) if statuses else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", calls, statuses
+    server.shutdown()
+
+
+def test_retries_with_backoff_until_accepted(telegram):
+    url, calls, statuses = telegram
+    statuses.extend([503, 429])
+    notifier = TelegramNotifier("token", "chat", api_url=url, retries=3, backoff=0.05)
+    assert notifier.send("hello")
+    assert len(calls) == 3
+    gaps = [b[0] - a[0] for a, b in zip(calls, calls[1:])]
+    # urllib3 retries the first failure at once, then waits backoff * 2 ** (n - 1)
+    assert gaps[1] >= 0.09
+
+
+def test_gives_up_after_the_retry_budget(telegram):
+    url, calls, statuses = telegram
+    statuses.extend([503] * 5)
+    notifier = TelegramNotifier("token", "chat", api_url=url, retries=2, backoff=0)
+    assert not notifier.send("hello")
+    assert len(calls) == 3
+
+
+def test_state_advances_only_when_delivered(telegram, tmp_path):
+    url, calls, statuses = telegram
+    path = str(tmp_path / "alert_state.json")
+    notifier = TelegramNotifier("token", "chat", api_url=url, retries=0, backoff=0)
+    statuses.append(500)
+    alerting = {"farm-01": "🌡️ High Temp", "farm-02": NORMAL_TEXT}
+
+    state = load_state(path)
+    assert notify(notifier, state, alerting, now=1000) == []
+    save_state(state, path)
+    assert load_state(path) == {}
+
+    # Retried on the next run, then persisted
+    state = load_state(path)
+    assert notify(notifier, state, alerting, now=1060) == ["🔴 farm-01: 🌡️ High Temp"]
+    save_state(state, path)
+    assert load_state(path)["farm-01"] == {"status": "🌡️ High Temp", "last_sent": 1060}
+
+    # Unchanged alert within the cooldown: nothing is sent
+    state = load_state(path)
+    assert notify(notifier, state, alerting, now=2000) == []
+    assert len(calls) == 2
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from alert_rules import ALERT, NORMAL_TEXT, evaluate
+
+
+def test_labels_only_for_combinations_that_occur_with_many_rules():
+    rules = [{"metric": f"m{i}", "column": "value", "op": ">", "threshold": float(i), "label": f"L{i}"}
+             for i in range(70)]
+    frame = {"value": np.array([-1.0, 0.5, 65.5])}
+    result = evaluate(frame, rules)
+    assert result.status[0] == NORMAL_TEXT
+    assert result.status[1] == "L0"
+    assert result.status[2] == " | ".join(f"L{i}" for i in range(66))
+
+
+def test_threshold_override_applies_to_one_device():
+    frame = {"Device ID": np.array(["farm-01", "Farm_02"], dtype=object), "Temperature": np.array([31.0, 31.0])}
+    result = evaluate(frame, overrides={"farm-02": {"temperature": {"threshold": 32}}}, device_col="Device ID")
+    assert result.levels["temperature"].tolist() == [ALERT, 1]
+
+
+@pytest.mark.parametrize("override", [{"temperature": {"min_readings": 3}}, {"humidity": {"threshold": 1}}])
+def test_unsupported_overrides_are_rejected(override):
+    frame = {"Device ID": np.array(["farm-01"], dtype=object), "Temperature": np.array([31.0])}
+    with pytest.raises(ValueError):
+        evaluate(frame, overrides={"farm-01": override}, device_col="Device ID")
+
+
+def levels(values, rule, devices=None, ts=None):
+    frame = {"Temperature": np.array(values, dtype=float)}
+    if devices is not None:
+        frame["Device ID"] = np.array(devices, dtype=object)
+    result = evaluate(frame, [rule], device_col="Device ID" if devices is not None else None, ts=ts)
+    return (result.levels["temp"] == ALERT).tolist()
+
+
+RULE = {"metric": "temp", "column": "temperature", "op": ">", "threshold": 30.0, "label": "🌡️"}
+
+
+def test_reading_at_the_default_temperature_threshold_is_an_alert():
+    result = evaluate({"Temperature": np.array([29.9, 30.0])})
+    assert result.levels["temperature"].tolist() == [1, ALERT]
+
+
+def test_hysteresis_latches_until_the_clear_level_is_crossed():
+    rule = {**RULE, "clear": 28.0}
+    a = [25, 31, 29, 29.5, 27, 29, 31]
+    b = [29, 29, 31, 25]        # above clear right after farm-01's alert: must not inherit the latch
+    assert levels(a + b, rule, ["farm-01"] * len(a) + ["farm-02"] * len(b)) == \
+        [False, True, True, True, False, False, True] + [False, False, True, False]
+
+
+def test_min_readings_counts_each_device_run_separately():
+    rule = {**RULE, "min_readings": 3}
+    a = [31, 31, 25, 31, 31, 31, 31]
+    b = [31, 31, 31]            # follows a breaching run of farm-01
+    assert levels(a + b, rule, ["farm-01"] * len(a) + ["farm-02"] * len(b)) == \
+        [False, False, False, False, False, True, True] + [False, False, True]
+
+
+def test_min_duration_uses_each_device_clock_in_input_order():
+    rule = {**RULE, "min_duration_s": 120}
+    # Interleaved rows of two devices, one a minute apart each, out of time order
+    minute = 60 * 10**9
+    ts = np.array([0, 0, 1, 1, 2, 2, 3, 3]) * minute
+    values = [31, 31, 31, 25, 31, 31, 25, 31]
+    devices = ["farm-01", "farm-02"] * 4
+    order = np.array([7, 0, 5, 2, 4, 1, 6, 3])
+    got = levels(np.array(values)[order], rule, np.array(devices, dtype=object)[order], ts[order])
+    # farm-01 breaches from minute 0 to 2 (alert at 2), farm-02 from minute 2 to 3 (never 2 minutes)
+    expected = [False, False, False, False, True, False, False, False]
+    assert got == np.array(expected)[order].tolist()
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from shared_dataset import write_snapshot
+from store import build_store
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+# Fresh interpreter: import the API, answer one /data/json request, write timings and what got imported
+# to sys.argv[1] (stdout also gets the failed background revalidation's warning)
+FIRST_REQUEST = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+main.data_cache.url_fn = lambda: "http://127.0.0.1:9/live_data.csv"    # closed port: the revalidation fails fast
+t1 = time.perf_counter()
+response = TestClient(main.app).get("/data/json", params={"device_id": "farm-02", "limit": 10})
+t2 = time.perf_counter()
+with open(sys.argv[1], "w") as f:
+    json.dump({"status": response.status_code, "source": response.headers.get("x-data-source"),
+               "rows": len(response.json()), "import_s": t1 - t0, "request_s": t2 - t1,
+               "pandas": "pandas" in sys.modules}, f)
+"""
+
+
+def test_first_response_is_served_from_the_bundled_snapshot(tmp_path):
+    frame = pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(40)],
+        "Device ID": ["farm-01", "farm-02"] * 20,
+        "Temperature (°C)": np.arange(40, dtype=float),
+    })
+    snap = str(tmp_path / "dataset.snap")
+    write_snapshot(build_store(frame, "Bundled Snapshot"), snap)
+
+    env = {k: v for k, v in os.environ.items() if k not in ("INGEST_TOKEN", "SHARED_DATASET", "DATA_SOURCE")}
+    env.update(DATA_STORE_DIR=str(tmp_path), BUNDLED_SNAPSHOT=snap, COLD_START_SNAPSHOT="1")
+    report = tmp_path / "first_request.json"
+    out = subprocess.run([sys.executable, "-c", FIRST_REQUEST, str(report)], cwd=API_DIR, env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(report.read_text())
+
+    assert result["status"] == 200
+    assert result["source"] == "Bundled Snapshot"
+    assert result["rows"] == 10
+    # Mapped, not parsed: no pandas on the way to the first response, and no network wait
+    assert not result["pandas"]
+    assert result["request_s"] < 1.0
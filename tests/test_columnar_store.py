@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from columnar_store import append_store, open_store, read_manifest, write_store
+from store import build_store
+
+
+def frame(devices, minutes):
+    return pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in minutes],
+        "Device ID": devices,
+        "Temperature (°C)": np.array(minutes, dtype=float),
+    })
+
+
+def test_devices_that_sanitize_alike_keep_their_own_partitions(tmp_path):
+    root = str(tmp_path / "data_store")
+    manifest = write_store(build_store(frame(["farm 01", "farm/01", "farm 01"], [0, 1, 2]), "test"), root)
+    assert len(set(manifest["devices"].values())) == 2
+
+    store = open_store(root)
+    assert store.rows == 3
+    for device, temps in (("farm 01", [0.0, 2.0]), ("farm/01", [1.0])):
+        index = store.query(device)
+        assert store.data["Temperature (°C)"][index].tolist() == temps
+        assert set(store.data["Device ID"][index]) == {device}
+
+
+def test_append_reuses_the_device_directory(tmp_path):
+    root = str(tmp_path / "data_store")
+    write_store(build_store(frame(["farm 01", "farm/01"], [0, 1]), "test"), root)
+    manifest = append_store(build_store(frame(["farm/01", "farm 02"], [5, 6]), "test"), root)
+    devices = manifest["devices"]
+    assert len(set(devices.values())) == 3
+    assert {p["path"] for p in manifest["partitions"]} == {os.path.join(devices[d], "month=2025-11")
+                                                           for d in devices}
+
+    store = open_store(root)
+    assert store.rows == 4
+    assert store.data["Temperature (°C)"][store.query("farm/01")].tolist() == [1.0, 5.0]
+
+
+def test_previous_generation_is_kept_unless_asked(tmp_path):
+    root = str(tmp_path / "data_store")
+    store = build_store(frame(["farm-01"], [0]), "test")
+    write_store(store, root)
+    write_store(store, root)
+    assert sorted(n for n in os.listdir(root) if n.startswith("gen-")) == ["gen-000001", "gen-000002"]
+    write_store(store, root, keep_previous=False)
+    assert [n for n in os.listdir(root) if n.startswith("gen-")] == [read_manifest(root)["dir"]]
@@ -0,0 +1,101 @@
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from dashboard_charts import GitHubAssets, blob_sha, chart_spec, publish_charts
+
+
+@pytest.fixture
+def github():
+    """Minimal Git Data API of one repo: {path: blob sha} on the branch, plus a request log."""
+    repo = {"files": {}, "head": 0, "pending": None}
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self):
+            path = self.path.split("?")[0].removeprefix("/repos/owner/repo")
+            calls.append((self.command, path))
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            if path.startswith("/contents/"):
+                prefix = path[len("/contents/"):] + "/"
+                listing = [{"name": p[len(prefix):], "sha": s, "type": "file"}
+                           for p, s in repo["files"].items() if p.startswith(prefix)]
+                return self._reply(200, listing) if listing else self._reply(404, {})
+            if path == "/git/blobs":
+                return self._reply(201, {"sha": blob_sha(base64.b64decode(body["content"]))})
+            if path == "/git/ref/heads/main":
+                return self._reply(200, {"object": {"sha": f"c{repo['head']}"}})
+            if path.startswith("/git/commits/"):
+                return self._reply(200, {"tree": {"sha": "tree"}})
+            if path == "/git/trees":
+                repo["pending"] = {e["path"]: e["sha"] for e in body["tree"]}
+                return self._reply(201, {"sha": "new-tree"})
+            if path == "/git/commits":
+                return self._reply(201, {"sha": f"c{repo['head'] + 1}"})
+            if path == "/git/refs/heads/main":
+                repo["head"] += 1
+                repo["files"].update(repo.pop("pending"))
+                return self._reply(200, {})
+            self._reply(404, {})
+
+        do_GET = do_POST = do_PATCH = _handle
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", repo, calls
+    server.shutdown()
+
+
+def specs():
+    return {f"{d}.png": chart_spec(d, {"Temp": [20, 21, 22]}) for d in ("farm-01", "farm-02")}
+
+
+def test_changed_charts_go_up_in_one_commit(github, tmp_path):
+    url, repo, calls = github
+    assets = GitHubAssets("owner/repo", "token", api_url=url)
+    cache, out = {}, str(tmp_path / "charts")
+
+    urls, counts = publish_charts(specs(), out, "assets", cache, assets, workers=1)
+    assert counts == {"rendered": 2, "uploaded": 2}
+    assert urls["farm-01.png"].endswith("/owner/repo/main/assets/farm-01.png")
+    assert sorted(repo["files"]) == ["assets/farm-01.png", "assets/farm-02.png"]
+    assert [c for c in calls if c[1] == "/git/commits"] == [("POST", "/git/commits")]
+    assert calls.count(("POST", "/git/blobs")) == 2
+
+
+def test_unchanged_charts_are_not_rendered_or_uploaded(github, tmp_path):
+    url, repo, calls = github
+    assets = GitHubAssets("owner/repo", "token", api_url=url)
+    cache, out = {}, str(tmp_path / "charts")
+    publish_charts(specs(), out, "assets", cache, assets, workers=1)
+    calls.clear()
+
+    # Same data, and the local PNGs are gone (fresh CI checkout): the remote SHAs still match
+    for name in specs():
+        (tmp_path / "charts" / name).unlink()
+    _, counts = publish_charts(specs(), out, "assets", cache, assets, workers=1)
+    assert counts == {"rendered": 0, "uploaded": 0}
+    assert calls == [("GET", "/contents/assets")]
+
+    # One device's data changed: only that chart is rendered, and it is the only blob of the commit
+    new = dict(specs(), **{"farm-02.png": chart_spec("farm-02", {"Temp": [30, 31, 32]})})
+    _, counts = publish_charts(new, out, "assets", cache, assets, workers=1)
+    assert counts == {"rendered": 1, "uploaded": 1}
+    assert calls.count(("POST", "/git/blobs")) == 1
+    assert calls.count(("POST", "/git/commits")) == 1
+    assert repo["head"] == 2
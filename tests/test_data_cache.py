@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from data_cache import DataCache
+from refresher import BackgroundRefresher
+
+
+def failing_cache(fallback=None, retry_s=60.0):
+    cache = DataCache(lambda: "http://127.0.0.1:9/live_data.csv", lambda content, source: content,
+                      fallback=fallback, retry_s=retry_s)
+    cache.calls = 0
+
+    def fetch():
+        cache.calls += 1
+        raise urllib.error.URLError("connection refused")
+
+    cache._fetch = fetch
+    return cache
+
+
+def test_fallback_error_does_not_escape_get():
+    def broken():
+        raise ValueError("corrupt local copy")
+
+    cache = failing_cache(fallback=broken)
+    assert cache.get() is None
+    assert "fallback failed: corrupt local copy" in cache.stats()["last_error"]
+
+
+def test_failed_cold_start_is_not_retried_on_every_request():
+    cache = failing_cache()
+    for _ in range(5):
+        assert cache.get() is None
+    assert cache.calls == 1
+    assert cache.stats()["retry_in_s"] > 0
+
+    cache.failed_at -= 61       # retry interval elapsed
+    cache.get()
+    assert cache.calls == 2
+
+
+def test_fallback_value_is_served_after_a_failed_fetch():
+    cache = failing_cache(fallback=lambda: "local")
+    assert cache.get() == "local"
+
+
+@pytest.fixture
+def slow_raw():
+    """Local stand-in for GitHub raw: every GET takes 0.3 s and is counted."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            time.sleep(0.3)
+            self.send_response(200)
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"data")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/live_data.csv", hits
+    server.shutdown()
+
+
+@pytest.mark.parametrize("refresher_first", [False, True])
+def test_requests_and_refresher_share_one_fetch(slow_raw, refresher_first):
+    url, hits = slow_raw
+    cache = DataCache(lambda: url, lambda content, source: content)
+    refresher = BackgroundRefresher(cache)
+
+    async def tick():
+        refresher.client = refresher._connect()
+        try:
+            return await refresher.refresh()
+        finally:
+            await refresher.client.aclose()
+
+    readers = [threading.Thread(target=cache.get) for _ in range(4)]
+    if refresher_first:
+        loop = threading.Thread(target=asyncio.run, args=(tick(),))
+        loop.start()
+        time.sleep(0.1)
+        for t in readers:
+            t.start()
+        loop.join()
+    else:
+        for t in readers:
+            t.start()
+        time.sleep(0.1)
+        assert asyncio.run(tick()) is False     # a request is fetching: the tick is skipped
+    for t in readers:
+        t.join()
+    assert len(hits) == 1
+    assert cache.value == b"data"
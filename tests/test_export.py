@@ -0,0 +1,99 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from columnar_store import write_store
+from export import Exporter, export_columns, fingerprint
+from shared_dataset import open_snapshot, write_snapshot
+from store import build_store
+
+
+def frame(status="ok"):
+    return pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(6)],
+        "Device ID": ["farm-01", "farm-02"] * 3,
+        "Temperature (°C)": np.arange(6, dtype=float),
+        "Status": ["ok", "ok", status, "ok", "ok", "ok"],
+    })
+
+
+def test_fingerprint_covers_text_columns(tmp_path):
+    a, b = build_store(frame(), "test"), build_store(frame("fault"), "test")
+    assert fingerprint(a) != fingerprint(b)
+    assert fingerprint(a) == fingerprint(build_store(frame(), "test"))
+
+    # Dictionary-encoded columns of a mapped snapshot too
+    for name, store in (("a.snap", a), ("b.snap", b)):
+        write_snapshot(store, str(tmp_path / name))
+    assert fingerprint(open_snapshot(str(tmp_path / "a.snap"))) != fingerprint(open_snapshot(str(tmp_path / "b.snap")))
+
+
+def test_etag_covers_every_selected_row():
+    store = build_store(frame(), "test")
+    exporter = Exporter(chunk_rows=2)
+    columns = export_columns(store)
+    index = np.array([0, 1, 2, 3, 4, 5])
+    reordered = np.array([0, 2, 1, 3, 4, 5])     # same length, first and last row
+    assert exporter.etag(store, index, columns, "csv") != exporter.etag(store, reordered, columns, "csv")
+    assert exporter.etag(store, index, columns, "csv") == exporter.etag(store, index.copy(), columns, "csv")
+
+
+def readings():
+    """Two devices' readings in time order, with a missing value and text needing CSV quoting."""
+    return pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(9)],
+        "Device ID": ["farm-01", "farm-02", "farm-03"] * 3,
+        "Temperature (°C)": [27.8, np.nan, 1.5, 2.25, 3.0, 4.0, 5.5, 6.0, 7.0],
+        "Status": ["ok", None, "fan, pump", "ok", "ok", "ok", "x", "ok", "ok"],
+    })
+
+
+def export_client(load_main, tmp_path):
+    write_store(build_store(readings(), "test"), str(tmp_path))
+    main = load_main(DATA_SOURCE="store", EXPORT_CHUNK_ROWS="2")
+    return TestClient(main.app), main.exporter
+
+
+def test_streamed_exports_match_a_pandas_export(load_main, tmp_path):
+    client, _ = export_client(load_main, tmp_path)
+    expected = readings()
+
+    csv = client.get("/data/export", params={"format": "csv"})
+    assert csv.text == expected.to_csv(index=False, lineterminator="\n")
+
+    ndjson = client.get("/data/export", params={"format": "ndjson"})
+    pd.testing.assert_frame_equal(pd.read_json(io.StringIO(ndjson.text), lines=True, dtype=False,
+                                               convert_dates=False),
+                                  expected)
+
+    pytest.importorskip("pyarrow")
+    parquet = client.get("/data/export", params={"format": "parquet"})
+    table = pd.read_parquet(io.BytesIO(parquet.content))
+    assert list(table["Timestamp"]) == list(pd.to_datetime(expected["Timestamp"], format="%d/%m/%Y %H:%M:%S"))
+    pd.testing.assert_frame_equal(table.drop(columns="Timestamp"), expected.drop(columns="Timestamp"),
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+def test_resume_sends_the_exact_tail(load_main, tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    client, exporter = export_client(load_main, tmp_path)
+    url = f"/data/export?format={fmt}"
+
+    # No download has completed: the size is unknown, so Range gets the full body
+    first = client.get(url, headers={"Range": "bytes=10-"})
+    assert first.status_code == 200 and "content-range" not in first.headers
+    body, etag = first.content, first.headers["etag"]
+    assert exporter.stats()["unsized_ranges"] == 1
+
+    for start in (1, 10, len(body) // 2, len(body) - 1):
+        part = client.get(url, headers={"Range": f"bytes={start}-", "If-Range": etag})
+        assert part.status_code == 206
+        assert part.headers["content-range"] == f"bytes {start}-{len(body) - 1}/{len(body)}"
+        assert part.content == body[start:]
+    assert client.get(url).headers["content-length"] == str(len(body))
+    assert client.get(url, headers={"Range": f"bytes={len(body)}-"}).status_code == 416
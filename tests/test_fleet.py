@@ -0,0 +1,52 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from benchmarks import fleet
+from benchmarks.fleet import HEADER, device_names, make_fleet
+from timeparse import parse_timestamps
+
+
+@pytest.mark.parametrize("devices, days, interval", [(3, 1, 60), (12, 0.5, 300)])
+def test_fleet_has_the_requested_devices_rows_and_columns(devices, days, interval):
+    df = make_fleet(devices, days, interval, dropout=0)
+    per_device = int(days * 86400 // interval)
+    assert list(df.columns) == HEADER
+    assert sorted(df["Device ID"].unique()) == device_names(devices)
+    # No dropped readings: every device has them all, less at most one offline hour
+    counts = df["Device ID"].value_counts()
+    assert counts.max() <= per_device
+    assert counts.min() >= per_device - 3600 // interval
+
+
+def test_dropout_removes_about_that_share_of_readings():
+    full = int(1 * 86400 // 60) * 20
+    rows = len(make_fleet(20, 1, 60, dropout=0.1, seed=1))
+    assert 0.8 * full < rows < 0.95 * full
+
+
+def test_timestamps_parse_in_order_and_calendar_columns_agree():
+    df = make_fleet(4, 2, 60, start="2025-12-31")
+    ts = pd.to_datetime(df["Timestamp"], format="%d/%m/%Y %H:%M:%S")
+    assert ts.is_monotonic_increasing
+    # Each device starts on its own phase (< one interval) with jitter (< 10% of one)
+    assert ts.min() >= pd.Timestamp("2025-12-31")
+    assert ts.max() < pd.Timestamp("2026-01-02") + pd.Timedelta(seconds=2 * 60)
+    assert (parse_timestamps(df["Timestamp"].tolist(), key="fleet") == ts.to_numpy("datetime64[ns]").view("int64")).all()
+    assert (df["Month"] == ts.dt.strftime("%b")).all()
+    assert (df["Month-Year"] == ts.dt.strftime("%b-%Y")).all()
+    assert (df["Year"] == ts.dt.year).all()
+
+
+def test_same_seed_same_fleet():
+    pd.testing.assert_frame_equal(make_fleet(3, 0.25, seed=7), make_fleet(3, 0.25, seed=7))
+
+
+def test_cli_writes_a_readable_csv(tmp_path, monkeypatch):
+    out = tmp_path / "fleet.csv"
+    monkeypatch.setattr(sys, "argv", ["fleet.py", "--devices", "5", "--days", "0.25", "--out", str(out)])
+    fleet.main()
+    df = pd.read_csv(out)
+    assert list(df.columns) == HEADER
+    assert df["Device ID"].nunique() == 5
@@ -0,0 +1,129 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import ingest
+from columnar_store import open_store
+from ingest import BufferFull, Ingestor, IngestError, RingBuffer, validate
+from store import cutoff_ns, format_ts
+
+NOW = cutoff_ns(datetime(2025, 11, 1, 12, 0, 0))
+
+
+def errors(payload):
+    with pytest.raises(IngestError) as e:
+        validate(payload, now_ns=NOW)
+    return e.value.errors
+
+
+def test_short_keys_and_csv_names_are_the_same_columns():
+    cols, ts = validate([
+        {"device_id": "farm-01", "temp": "21.5", "humidity": 40, "aqi": 12, "smoke": " Clear "},
+        {"Device ID": "farm-02", "Temperature (°C)": 22.0, "Humidity (%)": None, "AQI Status": "Good"},
+    ], now_ns=NOW)
+    assert list(cols["Device ID"]) == ["farm-01", "farm-02"]
+    assert list(cols["Temperature (°C)"]) == [21.5, 22.0]
+    assert cols["Humidity (%)"][0] == 40 and np.isnan(cols["Humidity (%)"][1])
+    assert list(cols["Smoke Status"]) == ["Clear", None]
+    assert list(ts) == [NOW, NOW]
+
+
+def test_a_single_object_or_a_readings_wrapper_is_accepted():
+    assert len(validate({"device": "farm-01"}, now_ns=NOW)[1]) == 1
+    assert len(validate({"readings": [{"id": "a"}, {"id": "b"}]}, now_ns=NOW)[1]) == 2
+
+
+def test_timestamps_are_local_wall_clock(monkeypatch):
+    monkeypatch.setenv("TZ", "Asia/Kolkata")
+    time.tzset()
+    try:
+        _, ts = validate([
+            {"device_id": "a", "timestamp": "01/11/2025 08:30:00"},
+            {"device_id": "a", "ts": 1761985800},          # 2025-11-01 08:30:00 UTC
+            {"device_id": "a", "ts": 1761985800000},       # same instant in ms
+            {"device_id": "a"},
+        ])
+        received = cutoff_ns(datetime.now())
+    finally:
+        monkeypatch.delenv("TZ")
+        time.tzset()
+    assert format_ts(ts[:3]) == ["01/11/2025 08:30:00", "01/11/2025 14:00:00", "01/11/2025 14:00:00"]
+    # Stamped on receipt in the same naive local convention, not UTC
+    assert abs(int(ts[3]) - received) < 60 * 10**9
+
+
+@pytest.mark.parametrize("payload, error", [
+    ([{"temperature": 20}], {"index": 0, "field": "Device ID", "error": "required"}),
+    ([{"device_id": "a", "temperature": "warm"}], {"index": 0, "field": "temperature", "error": "not a number"}),
+    ([{"device_id": "a", "humidity": 120}], {"index": 0, "field": "humidity", "error": "out of range (0, 100)"}),
+    ([{"device_id": "a", "pressure": 1}], {"index": 0, "field": "pressure", "error": "unknown field"}),
+    ([{"device_id": "a", "health": "x" * 65}],
+     {"index": 0, "field": "health", "error": "longer than 64 characters"}),
+    ([{"device_id": "a", "timestamp": "not a date"}], {"index": 0, "field": "Timestamp", "error": "unparseable"}),
+    (["farm-01"], {"index": 0, "error": "reading must be an object"}),
+    ([], {"index": None, "error": "expected a reading object or a non-empty list"}),
+])
+def test_invalid_readings_are_reported_by_index(payload, error):
+    assert error in errors(payload)
+
+
+def test_boolean_is_not_a_number():
+    assert errors([{"device_id": "a", "temperature": True}])[0]["error"] == "not a number"
+
+
+def test_batch_limit(monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_BATCH", 3)
+    assert len(validate([{"id": "a"}] * 3, now_ns=NOW)[1]) == 3
+    assert errors([{"id": "a"}] * 4) == [{"index": None, "error": "at most 3 readings per request"}]
+
+
+def test_ring_buffer_refuses_overflow_and_wraps_after_release():
+    buffer = RingBuffer(capacity=4)
+    cols, ts = validate([{"id": f"d{i}", "temp": i} for i in range(3)], now_ns=NOW)
+    buffer.append(cols, ts)
+    with pytest.raises(BufferFull):
+        buffer.append(cols, ts)
+    assert len(buffer) == 3     # the refused batch left nothing behind
+
+    _, _, end = buffer.peek(limit=2)
+    buffer.release(end)
+    buffer.append(cols, ts + 1)  # wraps around the end of the arrays
+    pending, pending_ts, _ = buffer.peek()
+    assert list(pending["Device ID"]) == ["d2", "d0", "d1", "d2"]
+    assert list(pending["Temperature (°C)"]) == [2, 0, 1, 2]
+    assert list(pending_ts) == [NOW, NOW + 1, NOW + 1, NOW + 1]
+
+
+def test_flush_writes_pending_rows_behind_the_requests(tmp_path):
+    ingestor = Ingestor(str(tmp_path), capacity=10)
+    assert ingestor.flush() == 0
+    ingestor.add([{"id": "farm-01", "temp": 20.5, "timestamp": "01/11/2025 00:00:00"},
+                  {"id": "farm-02", "temp": 21.0, "timestamp": "01/11/2025 00:01:00"}])
+    assert len(ingestor.buffer) == 2
+    assert ingestor.flush() == 2
+    ingestor.add({"id": "farm-01", "temp": 22.5, "timestamp": "01/11/2025 00:02:00"})
+    assert ingestor.flush() == 1
+    assert len(ingestor.buffer) == 0
+
+    store = open_store(str(tmp_path))
+    rows = store.records(store.query("farm-01"))
+    assert [(r["Timestamp"], r["Temperature (°C)"]) for r in rows] == [
+        ("01/11/2025 00:00:00", 20.5), ("01/11/2025 00:02:00", 22.5)]
+    assert ingestor.stats()["flushed_rows"] == 3
+
+
+def test_rejected_requests_are_counted_and_buffer_nothing(tmp_path):
+    ingestor = Ingestor(str(tmp_path))
+    with pytest.raises(IngestError):
+        ingestor.add([{"id": "a"}, {"temp": 1}])
+    assert ingestor.stats()["rejected_requests"] == 1
+    assert len(ingestor.buffer) == 0
+
+
+def test_ingest_serves_the_store_unless_told_otherwise(load_main, capsys):
+    assert load_main(INGEST_TOKEN="secret").DATA_SOURCE == "store"
+    assert capsys.readouterr().out.count("does not serve") == 0
+    assert load_main(INGEST_TOKEN="secret", DATA_SOURCE="github").DATA_SOURCE == "github"
+    assert "DATA_SOURCE=github does not serve" in capsys.readouterr().out
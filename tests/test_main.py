@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from columnar_store import write_store
+from store import build_store
+
+
+def test_ingest_route_exists_only_with_a_token(load_main):
+    client = TestClient(load_main().app)
+    assert client.post("/ingest", json={}).status_code == 404
+
+    client = TestClient(load_main(INGEST_TOKEN="secret").app)
+    assert client.post("/ingest", json={}).status_code == 401
+
+
+def served_store(load_main, tmp_path):
+    """main.py serving a small columnar store, without running the lifespan (as on serverless)."""
+    frame = pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(6)],
+        "Device ID": ["farm-01", "farm-02"] * 3,
+        "Temperature (°C)": np.arange(6, dtype=float),
+    })
+    write_store(build_store(frame, "test"), str(tmp_path))
+    return TestClient(load_main(DATA_SOURCE="store").app)
+
+
+def test_retention_is_fed_on_request_without_lifespan(load_main, tmp_path):
+    client = served_store(load_main, tmp_path)
+    recent = client.get("/data/recent", params={"device_id": "farm-01"})
+    assert recent.status_code == 200
+    assert recent.json()["series"]["Temperature (°C)"] == [0.0, 2.0, 4.0]
+    rollup = client.get("/data/rollup").json()
+    assert sorted(rollup["devices"]) == ["farm-01", "farm-02"]
+
+
+def test_summary_is_fed_on_request_without_lifespan(load_main, tmp_path):
+    client = served_store(load_main, tmp_path)
+    devices = client.get("/summary").json()["devices"]
+    assert [d["device"] for d in devices] == ["farm-01", "farm-02"]
+
+
+def test_insights_are_fed_on_request_without_lifespan(load_main, tmp_path):
+    client = served_store(load_main, tmp_path)
+    body = client.get("/insights").json()
+    assert [d["device"] for d in body["devices"]] == ["farm-01", "farm-02"]
+    assert body["text"]
+
+
+def test_insights_without_data_have_no_summary_line(load_main, tmp_path):
+    client = TestClient(load_main(DATA_SOURCE="store").app)
+    assert client.get("/insights").json() == {"text": None, "devices": []}
@@ -0,0 +1,93 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import metrics
+from columnar_store import write_store
+from store import build_store
+
+NAME = r"[a-zA-Z_:][a-zA-Z0-9_:]*"
+LABEL = rf'{NAME}="(?:[^"\\\n]|\\[\\"n])*"'
+SAMPLE = re.compile(rf"^({NAME})(\{{{LABEL}(?:,{LABEL})*\}})? (-?[0-9.e+-]+|\+Inf|NaN)$")
+COMMENT = re.compile(rf"^# (HELP {NAME} .*|TYPE {NAME} (counter|gauge|histogram))$")
+
+
+@pytest.fixture
+def client(load_main, tmp_path):
+    if not metrics.ENABLED:
+        pytest.skip("METRICS=0")
+    frame = pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(6)],
+        "Device ID": ["farm-01", "farm-02"] * 3,
+        "Temperature (°C)": np.arange(6, dtype=float),
+    })
+    write_store(build_store(frame, "test"), str(tmp_path))
+    return TestClient(load_main(DATA_SOURCE="store").app)
+
+
+def samples(text):
+    """{(name, labels dict): value} from exposition text, checking every line's syntax."""
+    out = {}
+    assert text.endswith("\n")
+    for line in text.rstrip("\n").split("\n"):
+        if line.startswith("#"):
+            assert COMMENT.match(line), line
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name, labels, value = match.groups()
+        pairs = dict(re.findall(rf'({NAME})="((?:[^"\\]|\\.)*)"', labels or ""))
+        out[name, tuple(sorted(pairs.items()))] = float(value)
+    return out
+
+
+def test_metrics_is_valid_exposition_with_route_templates(client):
+    # The registry is process-wide: compare against what earlier tests left in it
+    before = samples(client.get("/metrics").text)
+    client.get("/data/json", params={"device_id": "farm-01", "days": 30})
+    client.get("/data/json", params={"device_id": "farm-02"})
+    client.get("/no/such/device/farm-01")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    series = samples(response.text)
+
+    changed = [dict(labels) for (name, labels), value in series.items() if value != before.get((name, labels))]
+    routes = {labels["route"] for labels in changed if "route" in labels}
+    templates = {route.path for route in client.app.routes}
+    # One label per route template: no query strings, device ids or unknown paths
+    assert routes <= templates | {"unmatched", "background"}
+    assert {"/data/json", "unmatched"} <= routes
+    assert "farm-01" not in response.text
+
+    requests = {dict(labels)["status"]: value - before.get((name, labels), 0) for (name, labels), value in series.items()
+                if name == "api_request_seconds_count" and dict(labels)["route"] == "/data/json"}
+    assert requests == {"200": 2.0}
+    stages = {dict(labels)["stage"] for name, labels in series
+              if name == "api_stage_seconds_count" and dict(labels)["route"] == "/data/json"}
+    assert {"filter", "serialize"} <= stages
+
+
+def test_histogram_buckets_are_cumulative(client):
+    client.get("/data/json")
+    series = samples(client.get("/metrics").text)
+    buckets = {}
+    for (name, labels), value in series.items():
+        if name == "api_request_seconds_bucket":
+            le = dict(labels)["le"]
+            key = tuple(p for p in labels if p[0] != "le")
+            buckets.setdefault(key, []).append((float(le), value))
+    assert buckets
+    for key, counts in buckets.items():
+        values = [v for _, v in sorted(counts)]
+        assert values == sorted(values)
+        assert values[-1] == series["api_request_seconds_count", key]
+
+
+def test_server_timing_on_data_json(client):
+    header = client.get("/data/json", params={"device_id": "farm-01"}).headers["server-timing"]
+    entries = dict(re.fullmatch(r"(\w+);dur=(\d+\.\d{2})", part.strip()).groups() for part in header.split(","))
+    assert {"filter", "serialize", "app"} <= set(entries)
+    assert float(entries["app"]) >= max(float(v) for k, v in entries.items() if k != "app")
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from serialize import MIN_COMPRESS_BYTES, brotli, columnar_json, encoded_response, records_json
+from store import build_store
+
+
+def store():
+    return build_store(pd.DataFrame({
+        "Timestamp": ["01/11/2025 00:00:00", "01/11/2025 00:01:00", "01/11/2025 00:02:00"],
+        "Device ID": ["farm-01", "farm-01", "farm-02"],
+        "Temperature (°C)": [27.8, np.nan, 21.3],
+        "Status": ["ok", None, "fault"],
+    }), "test")
+
+
+def test_records_and_columnar_carry_the_same_values():
+    s = store()
+    index = s.query(None)
+    records = json.loads(records_json(s, index))
+    columns = json.loads(columnar_json(s, index))
+    assert set(columns) == set(records[0]) - {"_source"}
+    for col, values in columns.items():
+        assert values == [r[col] for r in records], col
+    assert {r["_source"] for r in records} == {"test"}
+
+
+def test_nan_is_null_and_float32_keeps_its_short_form():
+    s = store()
+    index = s.query(None)
+    assert s.data["Temperature (°C)"].dtype == np.float32
+    for body in (records_json(s, index), columnar_json(s, index)):
+        assert b"27.8," in body and b"27.799999" not in body
+        assert b"NaN" not in body
+    assert json.loads(columnar_json(s, index))["Temperature (°C)"] == [27.8, None, 21.3]
+    assert [r["Status"] for r in json.loads(records_json(s, index))] == ["ok", None, "fault"]
+
+
+@pytest.mark.parametrize("accept, coding", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("gzip", "gzip"),
+    ("identity", None),
+    ("", None),
+])
+def test_encoding_negotiation_prefers_br_then_gzip(accept, coding):
+    if coding == "br" and brotli is None:
+        pytest.skip("brotli is optional")
+    body = b'{"x":"' + b"a" * MIN_COMPRESS_BYTES + b'"}'
+    response = encoded_response(body, accept)
+    assert response.headers.get("content-encoding") == coding
+    assert response.headers["vary"] == "Accept-Encoding"
+    decode = {"br": brotli.decompress, "gzip": gzip.decompress, None: bytes}[coding]
+    assert decode(response.body) == body
+
+
+def test_small_bodies_are_not_compressed():
+    assert "content-encoding" not in encoded_response(b"{}", "br, gzip").headers
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_dataset
+from shared_dataset import DictColumn, SharedDataset, open_snapshot, publish, read_pointer, write_snapshot
+from store import build_store
+
+
+def frame(minutes=6, status="ok"):
+    return pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{m:02d}:00" for m in range(minutes)],
+        "Device ID": ["farm-01", "farm-02"] * (minutes // 2),
+        "Temperature (°C)": np.linspace(20, 25, minutes),
+        "Light (Lux)": np.arange(minutes) * 10,
+        "Status": [status, None] + ["ok"] * (minutes - 2),
+    })
+
+
+def rows(store, device=None):
+    return store.records(store.query(device))
+
+
+def test_snapshot_round_trips_numeric_and_text_columns(tmp_path):
+    store = build_store(frame(), "test")
+    write_snapshot(store, str(tmp_path / "a.snap"))
+    mapped = open_snapshot(str(tmp_path / "a.snap"))
+
+    assert isinstance(mapped.data["Status"], DictColumn)
+    assert isinstance(mapped.data[mapped.device_col], DictColumn)
+    assert mapped.data["Temperature (°C)"].dtype == np.float32
+    assert mapped.data["Light (Lux)"].dtype == store.data["Light (Lux)"].dtype
+    assert mapped.columns == store.columns and mapped.source == "test"
+    for device in (None, "farm-01", "Farm_02"):
+        assert rows(mapped, device) == rows(store, device)
+    # Missing text (NaN in the built store) maps to code -1 -> None
+    assert list(mapped.data["Status"]) == [None if v != v else v for v in store.data["Status"]]
+    assert (mapped.data["Status"].codes == -1).sum() == 1
+
+    # A mapped store re-published as is keeps its dictionary codes
+    write_snapshot(mapped, str(tmp_path / "b.snap"))
+    again = open_snapshot(str(tmp_path / "b.snap"))
+    assert rows(again) == rows(store)
+    assert np.array_equal(again.data["Status"].codes, mapped.data["Status"].codes)
+
+
+def test_publish_keeps_the_current_and_previous_generation(tmp_path):
+    root = str(tmp_path / "shared")
+    for minutes in (2, 4, 6):
+        generation = publish(build_store(frame(minutes), "test"), root)
+    assert generation == 3
+    assert read_pointer(root) == {"generation": 3, "file": "gen-000003.snap"}
+    assert sorted(f for f in os.listdir(root) if f.startswith("gen-")) == ["gen-000002.snap", "gen-000003.snap"]
+    # A worker still on the previous generation can keep mapping it
+    assert open_snapshot(os.path.join(root, "gen-000002.snap")).rows == 4
+
+
+class Loader:
+    def __init__(self, store):
+        self.store = store
+        self.calls = 0
+
+    def get(self):
+        self.calls += 1
+        return self.store
+
+    def stats(self):
+        return {"calls": self.calls}
+
+
+@pytest.mark.skipif(shared_dataset.fcntl is None, reason="no cross-process lock on this platform")
+def test_second_instance_attaches_as_a_follower(tmp_path, capsys):
+    root = str(tmp_path / "shared")
+    leader_loader, follower_loader = Loader(build_store(frame(4), "test")), Loader(None)
+    leader = SharedDataset(leader_loader, root, ttl=0)
+    follower = SharedDataset(follower_loader, root, ttl=0, wait_s=1)
+
+    assert leader.get().rows == 4
+    assert follower.get().rows == 4
+    assert leader.stats()["leader"] and not follower.stats()["leader"]
+    assert follower_loader.calls == 0 and follower.stats()["loader"] is None
+    assert follower.stats()["generation"] == 1
+
+    # A new dataset is published by the leader and picked up by the follower
+    leader_loader.store = build_store(frame(6), "test")
+    leader.get()
+    assert follower.get().rows == 6 and follower.generation == 2
+    assert follower.stats()["publishes"] == 0 and follower.stats()["attaches"] == 2
+    assert capsys.readouterr().out == ""
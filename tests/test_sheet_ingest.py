@@ -0,0 +1,56 @@
+from sheet_ingest import FakeSheetSource, fetch_new_rows, load_cursor, save_cursor
+
+HEADER = ["Timestamp", "Device ID", "Temperature (°C)"]
+
+
+def rows(first, last, device="farm-01"):
+    return [[f"ts{i}", device, str(i)] for i in range(first, last + 1)]
+
+
+def test_blank_block_does_not_stop_ingestion():
+    sheet = [HEADER] + rows(1, 3) + [["", "", ""]] * 12 + rows(4, 6)
+    source = FakeSheetSource({"Sheet1": sheet})
+    _, new, _, cursor = fetch_new_rows(source, load_cursor("missing.json"), "Sheet1", batch_rows=5)
+    assert [r[0] for r in new] == [f"ts{i}" for i in range(1, 7)]
+    assert cursor["tabs"]["Sheet1"] == {"last_row": len(sheet), "last_timestamp": "ts6"}
+
+
+def test_cursor_resumes_after_the_last_row(tmp_path):
+    sheet = [HEADER] + rows(1, 4)
+    source = FakeSheetSource({"Sheet1": sheet})
+    path = str(tmp_path / "cursor.json")
+    _, new, _, cursor = fetch_new_rows(source, load_cursor(path), "Sheet1", batch_rows=3)
+    assert len(new) == 4
+    save_cursor(cursor, path)
+
+    sheet.extend(rows(5, 6))
+    source.reads.clear()
+    _, new, _, cursor = fetch_new_rows(source, load_cursor(path), "Sheet1", batch_rows=3)
+    # Only the cursor row (checked) and the new rows are read, and nothing is returned twice
+    assert [r[0] for r in new] == ["ts5", "ts6"]
+    assert source.reads == [("Sheet1", 5, 5), ("Sheet1", 6, 8)]
+
+    _, new, _, _ = fetch_new_rows(source, cursor, "Sheet1", batch_rows=3)
+    assert new == []
+
+
+def test_edited_cursor_row_rereads_the_tail():
+    sheet = [HEADER] + rows(1, 4)
+    source = FakeSheetSource({"Sheet1": sheet})
+    _, _, _, cursor = fetch_new_rows(source, load_cursor("missing.json"), "Sheet1")
+    sheet[4] = ["edited", "farm-01", "0"]
+    _, new, _, _ = fetch_new_rows(source, cursor, "Sheet1", bootstrap_rows=2)
+    assert [r[0] for r in new] == ["ts3", "edited"]
+
+
+def test_rollover_drains_the_previous_tab_first():
+    old = [HEADER] + rows(1, 2)
+    source = FakeSheetSource({"Jan": old})
+    _, _, _, cursor = fetch_new_rows(source, load_cursor("missing.json"), "Sheet1")
+    assert cursor["tab"] == "Jan"
+
+    old.extend(rows(3, 3))
+    source.sheets["Feb"] = [HEADER] + rows(4, 5, "farm-02")
+    _, new, tab, cursor = fetch_new_rows(source, cursor, "Sheet1")
+    assert tab == "Feb" and cursor["tab"] == "Feb"
+    assert [r[0] for r in new] == ["ts3", "ts4", "ts5"]
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from store import DataStore, build_store, cutoff_ns, index_len, page
+
+
+def frame(devices):
+    return pd.DataFrame({
+        "Timestamp": [f"01/11/2025 00:{i:02d}:00" for i in range(len(devices))],
+        "Device ID": devices,
+        "Temperature (°C)": np.arange(len(devices), dtype=float),
+    })
+
+
+def test_spellings_of_one_device_share_a_slice():
+    store = build_store(frame(["Farm_01", "farm-01", "Farm_01", "farm-02"]), "test")
+    index = store.query("farm-01")
+    assert store.data["Temperature (°C)"][index].tolist() == [0.0, 1.0, 2.0]
+    assert store.query("Farm_01") == index
+    assert store.device_list == ["Farm_01", "farm-02"]
+    assert store.data["Device ID"][index].tolist() == ["Farm_01", "farm-01", "Farm_01"]
+
+
+def test_datastore_merges_codes_assembled_from_different_spellings():
+    # Rows sorted by (code, time) under two codes that normalize to one device
+    ts = np.array([3, 1, 2], dtype=np.int64)
+    data = {"v": np.array([30.0, 10.0, 20.0])}
+    store = DataStore(["v"], data, ts, "Device ID", ["Farm_01", "farm-01"], np.array([0, 1, 1], dtype=np.int32),
+                      "test")
+    assert store.devices == ["Farm_01"]
+    assert store.data["v"][store.query("farm_01")].tolist() == [10.0, 20.0, 30.0]
+    assert store.data["v"][store.query(None)].tolist() == [10.0, 20.0, 30.0]
+
+
+def fleet(seed=0, rows=300):
+    """Shuffled readings of three devices under several spellings, unique timestamps."""
+    rng = np.random.default_rng(seed)
+    ts = pd.Timestamp("2025-11-01") + pd.to_timedelta(rng.permutation(rows) * 61, unit="s")
+    spellings = ["farm-01", "Farm_01", "farm-02", "FARM-02", "greenhouse-03"]
+    return pd.DataFrame({
+        "Timestamp": ts.strftime("%d/%m/%Y %H:%M:%S"),
+        "Device ID": rng.choice(spellings, rows),
+        "Temperature (°C)": rng.normal(25, 3, rows).round(2),
+    }), ts
+
+
+def expected(df, ts, device=None, start=None, end=None):
+    """The old DataFrame filter: device by normalized id, inclusive time bounds, oldest first."""
+    keep = np.ones(len(df), dtype=bool)
+    if device is not None:
+        keep &= (df["Device ID"].str.lower().str.replace("_", "-") == device.lower().replace("_", "-")).to_numpy()
+    if start is not None:
+        keep &= ts >= start
+    if end is not None:
+        keep &= ts <= end
+    # Compared in float32, the dtype the store keeps sensor columns in
+    return df.assign(_ts=ts)[keep].sort_values("_ts")["Temperature (°C)"].to_numpy(np.float32).tolist()
+
+
+@pytest.mark.parametrize("device", [None, "farm-01", "FARM_01", "farm-02", "greenhouse-03", "unknown"])
+def test_query_matches_a_pandas_filter(device):
+    df, ts = fleet()
+    store = build_store(df, "test")
+    start, end = ts.sort_values()[[40, 250]]
+    for bounds in [(None, None), (start, None), (None, end), (start, end)]:
+        ns = [pd.Timestamp(b).value if b is not None else None for b in bounds]
+        got = store.data["Temperature (°C)"][store.query(device, *ns)].tolist()
+        assert got == expected(df, ts, device, *bounds), bounds
+
+
+def test_days_cutoff_is_inclusive_at_the_boundary():
+    df, ts = fleet(1)
+    now = ts.max().to_pydatetime()
+    cutoff = now - timedelta(days=0.1)
+    boundary = pd.Timestamp(cutoff)
+    # A reading exactly at the cutoff is kept
+    df.loc[len(df)] = [boundary.strftime("%d/%m/%Y %H:%M:%S"), "farm-01", 99.0]
+    ts = ts.append(pd.DatetimeIndex([boundary]))
+    store = build_store(df, "test")
+    got = store.data["Temperature (°C)"][store.query("farm-01", cutoff_ns(cutoff))].tolist()
+    assert got == expected(df, ts, "farm-01", boundary)
+    assert 99.0 in got
+
+
+@pytest.mark.parametrize("device", [None, "farm-02"])
+def test_pages_continue_where_the_previous_one_stopped(device):
+    df, ts = fleet(2)
+    store = build_store(df, "test")
+    index = store.query(device)
+    pages, offset = [], 0
+    while True:
+        part = page(index, offset, 17)
+        if index_len(part) == 0:
+            break
+        pages.extend(store.data["Temperature (°C)"][part].tolist())
+        offset += 17
+    assert pages == expected(df, ts, device)
+    assert index_len(page(index, index_len(index) + 5, 10)) == 0
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from store import build_store
+from stream import StreamBroker
+
+
+def dataset(minutes):
+    """Store with one reading per device per minute in `minutes`."""
+    rows = [(f"01/11/2025 00:{m:02d}:00", device, float(m))
+            for m in minutes for device in ("farm-01", "farm-02")]
+    return build_store(pd.DataFrame(rows, columns=["Timestamp", "Device ID", "Temperature (°C)"]), "test")
+
+
+def frames(queue):
+    out = []
+    while not queue.empty():
+        out.append(queue.get_nowait())
+    return out
+
+
+def parse(frame):
+    """SSE frame bytes -> (event, id, data)."""
+    fields = dict(line.split(": ", 1) for line in frame.decode("utf-8").strip().split("\n"))
+    return fields.get("event"), fields.get("id"), json.loads(fields["data"])
+
+
+def temperatures(frame):
+    return [row["Temperature (°C)"] for row in parse(frame)[2]["rows"]]
+
+
+def test_subscribers_get_new_rows_of_their_devices_then_a_sync():
+    async def run():
+        broker = StreamBroker(lambda: None)
+        broker.publish(dataset(range(2)))
+        one, _ = broker.subscribe(["Farm_01"])
+        every, _ = broker.subscribe()
+        assert broker.publish(dataset(range(4))) == 2
+        return frames(one.queue), frames(every.queue)
+
+    one, every = asyncio.run(run())
+    assert [parse(f)[0] for f in one] == ["readings", "sync"]
+    assert parse(one[0])[2]["device"] == "farm-01"
+    assert temperatures(one[0]) == [2.0, 3.0]
+    assert [parse(f)[2].get("device") for f in every] == ["farm-01", "farm-02", None]
+    # The sync id is the newest timestamp of the dataset
+    assert int(parse(one[-1])[1]) == dataset(range(4)).sorted_ts[-1]
+
+
+def test_fresh_client_replay_is_only_a_sync_token():
+    async def run():
+        broker = StreamBroker(lambda: None)
+        broker.publish(dataset(range(3)))
+        sub, store = broker.subscribe()
+        return broker.replay(store, sub, None)
+
+    (frame,) = asyncio.run(run())
+    assert parse(frame)[0] == "sync"
+
+
+def test_last_event_id_resumes_with_only_the_missed_rows():
+    async def run():
+        broker = StreamBroker(lambda: None)
+        broker.publish(dataset(range(2)))
+        sub, _ = broker.subscribe(["farm-02"])
+        broker.publish(dataset(range(3)))
+        token = int(parse(frames(sub.queue)[-1])[1])
+        # Client disconnects; two more minutes arrive while it is away
+        broker.unsubscribe(sub)
+        broker.publish(dataset(range(5)))
+        again, store = broker.subscribe(["farm-02"])
+        return broker.replay(store, again, token)
+
+    replay = asyncio.run(run())
+    assert [parse(f)[0] for f in replay] == ["readings", "sync"]
+    assert parse(replay[0])[2]["device"] == "farm-02"
+    assert temperatures(replay[0]) == [3.0, 4.0]
+
+
+def test_slow_consumer_is_dropped_with_a_final_event():
+    async def run():
+        broker = StreamBroker(lambda: None, queue_size=3)
+        broker.publish(dataset(range(1)))
+        slow, _ = broker.subscribe()
+        for n in range(2, 5):
+            broker.publish(dataset(range(n)))
+        sent = [frame async for frame in broker.events(slow, heartbeat=0.01)]
+        return broker, slow, sent
+
+    broker, slow, sent = asyncio.run(run())
+    assert slow.dropped and slow not in broker.subscribers
+    assert broker.stats()["dropped"] == 1
+    # retry hint, then straight to the drop: the backlog was discarded
+    assert sent[0].startswith(b"retry: ")
+    assert [parse(f)[0] for f in sent[1:]] == ["dropped"]
+
+
+def test_stream_is_off_without_the_lifespan(load_main, tmp_path):
+    client = TestClient(load_main(DATA_SOURCE="store").app)
+    assert client.get("/").json()["live_updates"] is False
+    assert client.get("/stream").status_code == 503
+    assert client.get("/debug").json()["stream"]["running"] is False
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import timeparse
+from timeparse import LAYOUT_CACHE, NAT, parse_timestamps
+
+
+def ns(text):
+    return pd.Timestamp(text).value
+
+
+def test_zero_padded_values_take_the_fixed_width_path():
+    formats = {}
+    out = parse_timestamps(["01/11/2025 00:14:00", "02/11/2025 13:05:09", ""], key="padded", formats=formats)
+    assert out.tolist() == [ns("2025-11-01 00:14:00"), ns("2025-11-02 13:05:09"), NAT]
+    assert formats["padded"] == "%d/%m/%Y %H:%M:%S"
+    assert LAYOUT_CACHE[("padded", "%d/%m/%Y %H:%M:%S")] is not None
+
+
+def test_unpadded_values_are_parsed_and_not_retried_as_fixed_width(monkeypatch):
+    values = ["1/11/2025 0:14:00", "2/11/2025 13:05:09", "12/11/2025 9:00:00"]
+    expected = [ns("2025-11-01 00:14:00"), ns("2025-11-02 13:05:09"), ns("2025-11-12 09:00:00")]
+    formats = {}
+    assert parse_timestamps(values, key="unpadded", formats=formats).tolist() == expected
+    assert formats["unpadded"] == "%d/%m/%Y %H:%M:%S"
+    assert LAYOUT_CACHE[("unpadded", "%d/%m/%Y %H:%M:%S")] is None
+
+    # Later calls go straight to the format parser, no digit decoding or inference
+    def fail(*args):
+        raise AssertionError("unexpected fallback")
+    monkeypatch.setattr(timeparse, "_parse_fixed", fail)
+    monkeypatch.setattr(timeparse, "_infer", fail)
+    assert parse_timestamps(np.array(values, dtype=object), key="unpadded", formats=formats).tolist() == expected
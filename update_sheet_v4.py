@@ -15,14 +15,25 @@ Requirements:
 
 import os
 import re
-import base64
+import sys
 import json
 from datetime import datetime, timedelta
 import pandas as pd
 import gspread
 from google.oauth2.service_account import Credentials
-import matplotlib.pyplot as plt
 import requests
+from alert_notify import TelegramNotifier, load_state, notify, save_state
+from dashboard_charts import GitHubAssets, chart_spec, load_cache, publish_charts, save_cache
+from sheet_ingest import GspreadSource, fetch_new_rows, load_cursor, save_cursor
+
+# Shared dataset modules live next to the API
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+from alert_rules import OK, indicator, load_rules
+from alert_rules import evaluate as evaluate_alerts
+from columnar_store import MANIFEST, read_frame, write_store
+from shared_dataset import BUNDLED_SNAPSHOT, write_snapshot
+from store import build_store, cutoff_ns
+from timeparse import NAT, parse_timestamps
 
 # ========================
 # CONFIGURATION
@@ -33,8 +44,16 @@ START_ROW = 2
 REMOVE_COLUMN = "eCO₂ (ppm)"
 
 MAX_RECORDS = 200                 # limit per device
+LOCAL_STORE = "live_data.csv"     # CSV export the deployed API pulls from GitHub Raw
+DATA_STORE_DIR = "data_store"     # columnar store (see api/columnar_store.py)
+CURSOR_FILE = "ingest_cursor.json"  # last row read per sheet tab
+DERIVED_COLUMNS = ["Alert_Status", "Last_Updated_UTC"]
+TS_COLUMN = "_ts"                 # parsed Timestamp (int64 epoch ns), never written to CSV
 ALERT_TEMP = 30.0                 # °C
 ALERT_AQI = 600.0                 # AQI threshold (>= triggers alert)
+# Optional rule file (per-metric thresholds, warning bands, per-device overrides,
+# hysteresis/min-duration — see api/alert_rules.py); defaults use the values above
+ALERT_RULES_FILE = "alert_rules.json"
 
 # GitHub settings (from env)
 GITHUB_REPO = os.getenv("GITHUB_REPOSITORY")      # e.g. "Naveen359-G/iot-sensor-dashboard"
@@ -44,9 +63,15 @@ GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 # Telegram alerts (from env)
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+ALERT_STATE_FILE = "alert_state.json"   # last notified status per device
+ALERT_COOLDOWN_S = float(os.getenv("ALERT_COOLDOWN_S", 24 * 3600))  # repeat unchanged alerts after this
+
+GITHUB_BRANCH = os.getenv("GITHUB_REF_NAME", "main")
 
 # Where to store images in repo (path inside repo)
 GITHUB_ASSETS_PATH = "assets/iot_dashboards"      # will create/update files here
+CHART_CACHE_FILE = "chart_cache.json"             # data hash + blob sha of each chart
 
 # Marker for the comment so we can find & update it
 MARKER = "<!-- IoT_SENSOR_DASHBOARD -->"
@@ -58,63 +83,20 @@ SCOPES = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
 creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
 gc = gspread.authorize(creds)
 
+ALERT_RULES, ALERT_OVERRIDES = load_rules(ALERT_RULES_FILE, defaults=[
+    # >=: a reading at the threshold is 🔴 in the README table, so it is High Temp too
+    {"metric": "temperature", "column": "temperature", "op": ">=", "threshold": ALERT_TEMP,
+     "warn_ratio": 0.8, "label": "🌡️ High Temp"},
+    {"metric": "aqi", "column": "aqi value", "op": ">=", "threshold": ALERT_AQI,
+     "warn_ratio": 0.8, "label": "🌫️ High AQI"},
+])
+
 # ========================
 # HELPER FUNCTIONS
 # ========================
-def colorize_indicator(value, threshold, unit=""):
-    try:
-        val = float(value)
-    except Exception:
-        return f"🔸 {value}{unit}"
-
-    if val >= threshold:
-        return f"🔴 **{val}{unit}**"
-    elif val >= threshold * 0.8:
-        return f"🟠 {val}{unit}"
-    else:
-        return f"🟢 {val}{unit}"
-
-def generate_alert_text(temp, aqi):
-    alerts = []
-    try:
-        if float(temp) > ALERT_TEMP:
-            alerts.append("🌡️ High Temp")
-    except Exception:
-        pass
-    try:
-        if float(aqi) >= ALERT_AQI:
-            alerts.append("🌫️ High AQI")
-    except Exception:
-        pass
-    return " | ".join(alerts) if alerts else "✅ Normal"
-
 def gh_headers(token):
     return {"Authorization": f"token {token}", "Accept": "application/vnd.github.v3+json"}
 
-def gh_upload_file(repo, path_in_repo, content_bytes, token, commit_message="Add asset"):
-    api_url = f"https://api.github.com/repos/{repo}/contents/{path_in_repo}"
-    headers = gh_headers(token)
-
-    # Check if file already exists
-    get_resp = requests.get(api_url, headers=headers)
-    data = {
-        "message": commit_message,
-        "content": base64.b64encode(content_bytes).decode("utf-8"),
-    }
-    if get_resp.status_code == 200:
-        get_json = get_resp.json()
-        sha = get_json.get("sha")
-        data["sha"] = sha
-
-    put_resp = requests.put(api_url, headers=headers, json=data)
-    if put_resp.status_code in (200, 201):
-        branch_guess = "main"
-        raw_url = f"https://raw.githubusercontent.com/{repo}/{branch_guess}/{path_in_repo}"
-        return raw_url
-    else:
-        print(f"⚠️ Failed to upload {path_in_repo} to GitHub ({put_resp.status_code}): {put_resp.text}")
-        return None
-
 def find_existing_dashboard_comment(repo, issue_number, token):
     base_comments_url = f"https://api.github.com/repos/{repo}/issues/{issue_number}/comments"
     r = requests.get(base_comments_url, headers=gh_headers(token))
@@ -148,71 +130,66 @@ def update_or_create_issue_comment(repo, issue_number, token, body_md):
             return False
 
 # ========================
-# TELEGRAM ALERT FUNCTION
-# ========================
-def send_telegram_alert(message):
-    if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
-        return
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "Markdown"}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"⚠️ Telegram alert failed: {e}")
-
-# ========================
-# LOAD SHEET DATA (Dynamic Latest Tab)
+# LOAD SHEET DATA (Incremental, Dynamic Latest Tab)
 # ========================
+# Only rows after the persisted cursor are fetched (ranged reads in batches);
+# they are appended to the local store (live_data.csv) below.
+cursor = load_cursor(CURSOR_FILE)
 try:
     doc = gc.open_by_key(os.environ["GOOGLE_SHEET_ID"])
-    try:
-        sheet = doc.worksheet(SHEET_NAME)
-        current_tab_name = SHEET_NAME
-    except Exception:
-        sheet = doc.worksheets()[-1] 
-        current_tab_name = sheet.title
-
+    headers, new_rows, current_tab_name, cursor = fetch_new_rows(GspreadSource(doc), cursor, SHEET_NAME)
     print(f"📁 Opening sheet: '{current_tab_name}'")
-    # Fetch all values
-    all_values = sheet.get_all_values()
 except Exception as e:
     print(f"❌ Error accessing Google Sheet: {e}")
     exit(1)
 
 
-if not all_values:
+if not headers:
     print("⚠️ Sheet is empty!")
     exit(0)
 
-# Identify headers (Row 1)
-headers = all_values[0]
-
-# Filter out empty rows (where all data columns are empty)
-# This prevents taking "empty rows" from the bottom of a large sheet
-all_values = [r for r in all_values if any(cell.strip() for cell in r)]
-
-# Take the LATEST 1000 records (plus the header)
-MAX_HISTORY = 1000
-if len(all_values) > MAX_HISTORY:
-    # We want header + the last 999 records if total is > 1000
-    # Actually, user wants "last 1000 readings", so header + last 1000 rows
-    rows = [headers] + all_values[-1000:] if all_values[0] != headers else [headers] + all_values[-1001:]
-    # Simplest: keep header, then take last 1000 of the DATA rows
-    data_rows = all_values[1:]
-    rows = [headers] + data_rows[-1000:]
-else:
-    rows = all_values
-
-df = pd.DataFrame(rows[1:], columns=headers)
-print(f"📥 Fetched {len(df)} non-empty rows from tab '{current_tab_name}'.")
-
+new_df = pd.DataFrame(new_rows, columns=headers)
+print(f"📥 Fetched {len(new_df)} new rows from tab '{current_tab_name}'.")
 
+if new_df.empty and (os.path.exists(LOCAL_STORE) or os.path.exists(os.path.join(DATA_STORE_DIR, MANIFEST))):
+    save_cursor(cursor, CURSOR_FILE)
+    print("✅ No new readings since last run; nothing to update.")
+    exit(0)
 
 # ========================
 # NORMALIZE COLUMN NAMES
 # ========================
 # Strip spaces and standardize for internal logic
-df.columns = [c.strip().replace(" ", "_").replace("(", "").replace(")", "") for c in df.columns]
+def normalize_columns(columns):
+    return [c.strip().replace(" ", "_").replace("(", "").replace(")", "") for c in columns]
+
+new_df.columns = normalize_columns(new_df.columns)
+
+# Parse timestamps once: new rows with the format detected for their tab (kept
+# in the cursor), stored rows come with their epoch values from the store
+ts_formats = cursor.setdefault("ts_formats", {})
+if "Timestamp" in new_df.columns:
+    new_df[TS_COLUMN] = parse_timestamps(new_df["Timestamp"], key=current_tab_name, formats=ts_formats)
+else:
+    new_df[TS_COLUMN] = NAT
+
+# Append to the local store, dropping columns this script derives on every run
+df = new_df
+stored_df = None
+if os.path.exists(os.path.join(DATA_STORE_DIR, MANIFEST)):
+    stored_df = read_frame(DATA_STORE_DIR, ts_column=TS_COLUMN)
+elif os.path.exists(LOCAL_STORE):
+    stored_df = pd.read_csv(LOCAL_STORE, dtype=str, keep_default_na=False)
+    stored_df[TS_COLUMN] = (parse_timestamps(stored_df["Timestamp"], key=LOCAL_STORE, formats=ts_formats)
+                            if "Timestamp" in stored_df.columns else NAT)
+if stored_df is not None:
+    stored_df.columns = normalize_columns(stored_df.columns)
+    stored_df = stored_df.drop(columns=[c for c in DERIVED_COLUMNS if c in stored_df.columns])
+    df = pd.concat([stored_df, new_df], ignore_index=True)
+    device_key = next((c for c in df.columns if "device" in c.lower() and "health" not in c.lower()), None)
+    key_cols = [c for c in ("Timestamp", device_key) if c in df.columns]
+    df = df.drop_duplicates(subset=key_cols or None, keep="last").reset_index(drop=True)
+    print(f"🗄️ Local store: {len(stored_df)} stored + {len(new_df)} new → {len(df)} rows")
 
 
 # ========================
@@ -224,18 +201,9 @@ norm_remove = REMOVE_COLUMN.replace(" ", "_").replace("(", "").replace(")", "")
 if norm_remove in filtered_df.columns:
     filtered_df.drop(columns=[norm_remove], inplace=True)
 
-if "Timestamp" in filtered_df.columns:
-    # Robust conversion for sorting
-    try:
-        temp_dt = pd.to_datetime(filtered_df["Timestamp"], dayfirst=True, errors="coerce")
-        if temp_dt.isna().sum() > len(temp_dt) * 0.5:
-            temp_dt = pd.to_datetime(filtered_df["Timestamp"], dayfirst=False, errors="coerce")
-        filtered_df["_dt_sort"] = temp_dt
-        filtered_df = filtered_df.sort_values(by="_dt_sort", ascending=False).reset_index(drop=True)
-        filtered_df.drop(columns=["_dt_sort"], inplace=True)
-    except Exception:
-        # Fallback to string sort if all else fails
-        filtered_df = filtered_df.sort_values(by="Timestamp", ascending=False).reset_index(drop=True)
+# Newest first (unparseable timestamps are NAT and sort last)
+filtered_df[TS_COLUMN] = filtered_df[TS_COLUMN].astype("int64")
+filtered_df = filtered_df.sort_values(by=TS_COLUMN, ascending=False, kind="stable").reset_index(drop=True)
 
 print(f"📊 DATA DISCOVERY:")
 if not filtered_df.empty:
@@ -258,10 +226,16 @@ if not filtered_df.empty and "Timestamp" in filtered_df.columns:
     print(f"   - Latest Timestamp: {filtered_df['Timestamp'].iloc[0]}")
 
 
-def compute_alert_row(r):
-    return generate_alert_text(r.get("Temperature_°C"), r.get("AQI_Value"))
-
-filtered_df["Alert_Status"] = filtered_df.apply(compute_alert_row, axis=1)
+# Vectorized rule evaluation over whole columns (per device, oldest → newest)
+alert_device_col = next((c for c in filtered_df.columns if "device" in c.lower()), None)
+alerts = evaluate_alerts(filtered_df, ALERT_RULES, ALERT_OVERRIDES, device_col=alert_device_col,
+                         ts=filtered_df[TS_COLUMN].to_numpy())
+filtered_df["Alert_Status"] = alerts.status
+# Per-metric levels (OK / WARN / ALERT) for the dashboard; not written to the CSVs
+LEVEL_COLUMNS = [f"_level_{metric}" for metric in alerts.levels]
+INTERNAL_COLUMNS = [TS_COLUMN] + LEVEL_COLUMNS
+for metric, level in alerts.levels.items():
+    filtered_df[f"_level_{metric}"] = level
 
 # Find device column dynamically
 device_col = next((c for c in filtered_df.columns if "device" in c.lower()), "Device_ID")
@@ -278,77 +252,73 @@ filtered_df = filtered_df[filtered_df[device_col].notna() & (filtered_df[device_
 # --- 90-DAY RETENTION POLICY ---
 # (Keeping it enabled since we fixed the parsing)
 if "Timestamp" in filtered_df.columns:
-    try:
-        temp_dt = pd.to_datetime(filtered_df["Timestamp"], dayfirst=True, errors="coerce")
-        if temp_dt.isna().sum() > len(temp_dt) * 0.5:
-            temp_dt = pd.to_datetime(filtered_df["Timestamp"], dayfirst=False, errors="coerce")
-        filtered_df["_dt"] = temp_dt
-        cutoff_date = datetime.now() - timedelta(days=90)
-        filtered_df = filtered_df[filtered_df["_dt"] >= cutoff_date].copy()
-        filtered_df.drop(columns=["_dt"], inplace=True)
-    except Exception as e:
-        print(f"⚠️ Retention filter failed: {e}")
-
-# Save the MASTER file (for API/Dashboard consumption)
-filtered_df.to_csv("live_data.csv", index=False)
-print(f"✅ Saved master live_data.csv ({len(filtered_df)} records)")
+    cutoff = cutoff_ns(datetime.now() - timedelta(days=90))
+    filtered_df = filtered_df[filtered_df[TS_COLUMN] >= cutoff].copy()
+
+# Save the MASTER store (columnar) plus the CSV export (for API/Dashboard consumption)
+export_df = filtered_df.drop(columns=INTERNAL_COLUMNS)
+master_store = build_store(export_df, "Columnar Store", ts=filtered_df[TS_COLUMN].to_numpy())
+# Older generations are dropped: nothing maps them here, and the job commits data_store/
+write_store(master_store, DATA_STORE_DIR, keep_previous=False)
+# Same rows as one mappable file, bundled with the API deployment for fast cold starts
+write_snapshot(master_store, os.path.join(DATA_STORE_DIR, BUNDLED_SNAPSHOT))
+export_df.to_csv(LOCAL_STORE, index=False)
+save_cursor(cursor, CURSOR_FILE)
+print(f"✅ Saved master {DATA_STORE_DIR}/ and {LOCAL_STORE} ({len(filtered_df)} records)")
 
 device_groups = filtered_df.groupby(device_col)
 summary_rows = []
 markdown_device_sections = []
+device_statuses = {}
 
-os.makedirs("assets_local", exist_ok=True)
+device_frames = [(device, device_df.head(MAX_RECORDS).copy()) for device, device_df in device_groups]
+chart_specs = {}
 
-for device, device_df in device_groups:
-    device_df = device_df.head(MAX_RECORDS).copy()
-    
+for device, device_df in device_frames:
     # Sanitize device name for filenames (replace slashes/spaces with underscores)
     safe_device = re.sub(r'[^a-zA-Z0-9_\-]', '_', str(device))
     csv_name = f"live_data_{safe_device}.csv"
-    device_df.to_csv(csv_name, index=False)
+    device_df.drop(columns=INTERNAL_COLUMNS).to_csv(csv_name, index=False)
     print(f"✅ Saved {csv_name} ({len(device_df)} records)")
 
+    last_n = device_df.head(10)[::-1]
+    series = {}
+    if "Temperature_°C" in last_n.columns:
+        series["Temperature (°C)"] = pd.to_numeric(last_n["Temperature_°C"], errors="coerce").tolist()
+    if "AQI_Value" in last_n.columns:
+        series["AQI Value"] = pd.to_numeric(last_n["AQI_Value"], errors="coerce").tolist()
+    chart_specs[f"sensor_trends_{device}.png"] = chart_spec(
+        device, series, f"{device} - Recent Trends (Last {len(last_n)} Readings)")
 
+# ========================
+# CHARTS (parallel render, upload only changed PNGs)
+# ========================
+chart_cache = load_cache(CHART_CACHE_FILE)
+assets = GitHubAssets(GITHUB_REPO, GITHUB_TOKEN, GITHUB_BRANCH) if GITHUB_TOKEN and GITHUB_REPO else None
+chart_urls, chart_stats = publish_charts(
+    chart_specs, "assets_local", GITHUB_ASSETS_PATH, chart_cache, assets,
+    message=f"Update dashboard charts - {datetime.utcnow().isoformat()}",
+)
+if assets is not None:
+    assets.close()
+save_cache(chart_cache, CHART_CACHE_FILE)
+print(f"📈 Charts: {chart_stats['rendered']}/{len(chart_specs)} rendered, {chart_stats['uploaded']} uploaded")
+
+for device, device_df in device_frames:
     latest = device_df.iloc[0]
-    last_n = device_df.head(10)[["Temperature_°C", "AQI_Value"]].copy()[::-1]
+    chart_name = f"sensor_trends_{device}.png"
+    chart_local_path = os.path.join("assets_local", chart_name)
+    chart_raw_url = chart_urls.get(chart_name)
 
-    plt.figure(figsize=(6, 3))
-    if "Temperature_°C" in last_n.columns:
-        plt.plot(last_n["Temperature_°C"].values, marker="o", label="Temperature (°C)")
-    if "AQI_Value" in last_n.columns:
-        plt.plot(last_n["AQI_Value"].values, marker="s", label="AQI Value")
-    plt.title(f"{device} - Recent Trends (Last {len(last_n)} Readings)")
-    plt.xlabel("Reading Index (older → newer)")
-    plt.grid(True, alpha=0.3)
-    plt.legend()
-    plt.tight_layout()
-
-    chart_local_path = os.path.join("assets_local", f"sensor_trends_{device}.png")
-    plt.savefig(chart_local_path)
-    plt.close()
-    print(f"📈 Chart saved locally → {chart_local_path}")
-
-    chart_raw_url = None
-    if GITHUB_TOKEN and GITHUB_REPO:
-        with open(chart_local_path, "rb") as f:
-            content_bytes = f.read()
-        path_in_repo = f"{GITHUB_ASSETS_PATH}/sensor_trends_{device}.png"
-        commit_msg = f"Update sensor_trends_{device}.png - {datetime.utcnow().isoformat()}"
-        chart_raw_url = gh_upload_file(GITHUB_REPO, path_in_repo, content_bytes, GITHUB_TOKEN, commit_msg)
-        if chart_raw_url:
-            print(f"✅ Uploaded chart to repo → {chart_raw_url}")
-
-    temp_display = colorize_indicator(latest.get("Temperature_°C", "N/A"), ALERT_TEMP, "°C")
+    temp_display = indicator(latest.get("Temperature_°C", "N/A"), latest.get("_level_temperature", OK), "°C")
     hum_display = f"💧 {latest.get('Humidity_%', 'N/A')}"
     light_display = f"💡 {latest.get('Light', 'N/A')}"
-    aqi_display = colorize_indicator(latest.get("AQI_Value", "N/A"), ALERT_AQI)
+    aqi_display = indicator(latest.get("AQI_Value", "N/A"), latest.get("_level_aqi", OK))
     aqi_status = latest.get("AQI_Status", "N/A")
     device_health = latest.get("Device_Health", "N/A")
     overall_alert = latest.get("Alert_Status", "✅ Normal")
 
-    # Send Telegram alert only if it flips to 🔴
-    if "🔴" in temp_display or "🔴" in aqi_display:
-        send_telegram_alert(f"⚠️ Alert for {device}: {overall_alert}")
+    device_statuses[device] = overall_alert
 
     chart_md = f"![Sensor Trends]({chart_raw_url})" if chart_raw_url else f"![Sensor Trends](./{chart_local_path})"
 
@@ -384,6 +354,17 @@ _Last updated (UTC): **{filtered_df['Last_Updated_UTC'].iloc[0]}**_
         "Alert": overall_alert
     })
 
+# ========================
+# TELEGRAM ALERTS (state changes only, one batched message)
+# ========================
+alert_state = load_state(ALERT_STATE_FILE)
+notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_URL) if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID else None
+sent_lines = notify(notifier, alert_state, device_statuses, cooldown_s=ALERT_COOLDOWN_S)
+if notifier is not None:
+    notifier.close()
+    save_state(alert_state, ALERT_STATE_FILE)
+print(f"📣 Telegram: {len(sent_lines)} alert change(s) sent")
+
 # ========================
 # WRITE summary CSV
 # ========================